@@ -0,0 +1,352 @@
+# api.py
+"""
+Service HTTP local de valorisation (bibliothèque standard, sans Streamlit).
+
+Expose la valorisation du portefeuille, les poids par catégorie, les signaux de momentum
+et l'historique enregistré, pour les autres outils internes. Toutes les requêtes partagent
+le même cache : les cotations viennent du fournisseur (core.fournisseurs, cache mémoire
+avec TTL) et chaque valorisation est réutilisée pendant TTL_VALORISATION secondes, quel
+que soit le nombre de clients. L'historique est lu dans portfolio.db (historical_data_manager).
+
+Routes (GET) :
+    /sante
+    /valorisation?devise=EUR
+    /categories?devise=EUR
+    /signaux
+    /historique?debut=AAAA-MM-JJ&fin=AAAA-MM-JJ&granularite=auto|jour|semaine|mois
+    /metrics (métriques du processus au format texte Prometheus, voir core.metriques)
+
+Les réponses sont envoyées par morceaux (Transfer-Encoding: chunked), en JSON par défaut ou
+en Arrow IPC avec ?format=arrow (ou l'en-tête Accept: application/vnd.apache.arrow.stream).
+En Arrow, les totaux de /valorisation sont transmis dans les en-têtes X-Total-*.
+
+Usage : python api.py portefeuille.xlsx [--port 8502] [--rejeu marche.json]
+"""
+
+import argparse
+import json
+import math
+import os
+import threading
+import time
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+
+import core
+from core.fournisseurs import FournisseurRejeu, FournisseurYahoo
+
+HOTE = "127.0.0.1" # Service local uniquement
+PORT = 8502
+TTL_VALORISATION = 60 # Secondes
+LIGNES_PAR_MORCEAU = 500 # Lignes JSON sérialisées par morceau envoyé
+TAILLE_MORCEAU_ARROW = 64 * 1024
+
+TYPE_JSON = "application/json; charset=utf-8"
+TYPE_ARROW = "application/vnd.apache.arrow.stream"
+
+COLONNES_POSITIONS = ["Ticker", "shortName", "Catégories", "Devise", "Quantité", "Acquisition", "currentPrice",
+                      "Variation Jour (%)", "Valeur_conv", "Valeur_Actuelle_conv", "Valeur_H52_conv", "Valeur_LT_conv",
+                      "Gain/Perte", "Gain/Perte (%)", "Momentum (%)", "Z-Score"]
+COLONNES_SIGNAUX = ["Ticker", "shortName", "Momentum (%)", "Z-Score", "Signal", "Action", "Justification"]
+
+
+class RequeteInvalide(ValueError):
+    """Paramètre de requête invalide (réponse 400)."""
+
+
+class ServiceValorisation:
+    """
+    Portefeuille source, fournisseur de marché et cache des valorisations, partagés par
+    tous les threads du serveur. Le fichier du portefeuille est relu s'il a été modifié.
+
+    Le verrou du cache n'est tenu que pour lire et publier une valorisation : les appels au
+    fournisseur (qui regroupe lui-même les téléchargements simultanés d'une même clé) se font
+    hors verrou, un échec de cache ne bloque donc pas les autres requêtes.
+    """
+
+    def __init__(self, source, fournisseur, ttl=TTL_VALORISATION):
+        self.source = source # Chemin de fichier, URL CSV ou DataFrame
+        self.fournisseur = fournisseur
+        self.ttl = ttl
+        self._verrou = threading.Lock() # Cache des valorisations
+        self._verrou_source = threading.Lock() # Relecture du portefeuille
+        self._portefeuille = None
+        self._version = None
+        self._etat_source = None # core.source_distante.EtatSource (source URL)
+        self._verification = 0.0
+        self._valorisations = {} # devise -> (horodatage, version, Valorisation)
+        self.nb_valorisations = 0
+
+    def portefeuille(self):
+        """DataFrame du portefeuille, relu seulement si le fichier (ou la feuille publiée) a changé."""
+        if isinstance(self.source, pd.DataFrame):
+            return self.source, 0
+        with self._verrou_source:
+            return self._relire_portefeuille()
+
+    def _relire_portefeuille(self):
+        if self.source.startswith(("http://", "https://")):
+            # Requête conditionnelle au plus une fois par TTL ; la version est l'empreinte du contenu
+            if self._etat_source is None or time.monotonic() - self._verification >= self.ttl:
+                from core.source_distante import charger_si_modifie
+                self._etat_source, _ = charger_si_modifie(self.source, self._etat_source)
+                self._verification = time.monotonic()
+            return self._etat_source.df, self._etat_source.empreinte
+        version = os.path.getmtime(self.source)
+        if version != self._version:
+            from cli import charger_fichier
+            self._portefeuille, self._version = charger_fichier(self.source), version
+        return self._portefeuille, self._version
+
+    def valorisation(self, devise):
+        """Valorisation en devise cible, recalculée au plus une fois par TTL (ou si le portefeuille change)."""
+        devise = devise.strip().upper()
+        df, version = self.portefeuille()
+        with self._verrou:
+            entree = self._valorisations.get(devise)
+        if entree is not None and entree[1] == version and time.monotonic() - entree[0] < self.ttl:
+            return entree[2]
+
+        ticker_col = core.colonne_ticker(df)
+        tickers = df[ticker_col].dropna().astype(str).unique().tolist() if ticker_col else []
+        valorisation = core.valoriser_portefeuille(
+            df, devise,
+            self.fournisseur.taux_change(devise),
+            self.fournisseur.cotations(tickers),
+            self.fournisseur.momentums(tickers),
+        )
+        with self._verrou:
+            self._valorisations[devise] = (time.monotonic(), version, valorisation)
+            self.nb_valorisations += 1
+        return valorisation
+
+
+def poids_categories(valorisation):
+    """Valeur actuelle et poids (%) par catégorie, en devise cible."""
+    positions = valorisation.positions
+    par_categorie = positions.groupby("Catégories", sort=True, observed=True)["Valeur_Actuelle_conv"].sum(min_count=1).fillna(0.0)
+    total = par_categorie.sum()
+    return pd.DataFrame({
+        "Catégorie": par_categorie.index,
+        "Valeur Actuelle": par_categorie.to_numpy(),
+        "Poids (%)": (par_categorie / total * 100).to_numpy() if total else 0.0,
+    })
+
+
+def signaux(valorisation):
+    """Signal de momentum par ticker (une ligne par ticker)."""
+    positions = valorisation.positions
+    colonnes = [c for c in COLONNES_SIGNAUX if c in positions.columns]
+    return positions[colonnes].drop_duplicates(subset=colonnes[:1]).reset_index(drop=True)
+
+
+def _date_param(parametres, nom):
+    valeur = parametres.get(nom)
+    if not valeur:
+        return None
+    try:
+        return date.fromisoformat(valeur)
+    except ValueError:
+        raise RequeteInvalide(f"Paramètre '{nom}' invalide : {valeur} (AAAA-MM-JJ attendu).")
+
+
+def _nombre_json(valeur):
+    """Flottant sérialisable en JSON strict (NaN et infinis deviennent null)."""
+    return None if valeur is None or (isinstance(valeur, float) and not math.isfinite(valeur)) else valeur
+
+
+class GestionnaireAPI(BaseHTTPRequestHandler):
+    """Routes GET du service ; self.server.service est le ServiceValorisation partagé."""
+
+    protocol_version = "HTTP/1.1" # Connexions persistantes et réponses chunked
+    server_version = "BEAMValorisation/1.0"
+
+    def log_message(self, format, *args):
+        if getattr(self.server, "journaliser", False):
+            super().log_message(format, *args)
+
+    def do_GET(self):
+        self._flux_ouvert = False
+        url = urlparse(self.path)
+        parametres = {cle: valeurs[-1] for cle, valeurs in parse_qs(url.query).items()}
+        route = ROUTES.get(url.path.rstrip("/") or "/")
+        if route is None:
+            return self._envoyer_erreur(404, f"Route inconnue : {url.path}")
+        try:
+            route(self, parametres)
+        except RequeteInvalide as e:
+            self._envoyer_erreur(400, str(e))
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True # Client parti avant la fin de la réponse
+        except Exception as e:
+            self._envoyer_erreur(500, f"{type(e).__name__}: {e}")
+
+    # --- Réponses ---
+
+    def _format_arrow(self, parametres):
+        format_demande = parametres.get("format")
+        if format_demande not in (None, "json", "arrow"):
+            raise RequeteInvalide(f"Format inconnu : {format_demande} (json ou arrow).")
+        return format_demande == "arrow" or (format_demande is None and TYPE_ARROW in self.headers.get("Accept", ""))
+
+    def _debut_flux(self, type_contenu, entetes=None):
+        self._flux_ouvert = True
+        self.send_response(200)
+        self.send_header("Content-Type", type_contenu)
+        self.send_header("Transfer-Encoding", "chunked")
+        for nom, valeur in (entetes or {}).items():
+            self.send_header(nom, str(valeur))
+        self.end_headers()
+
+    def _morceau(self, donnees):
+        if isinstance(donnees, str):
+            donnees = donnees.encode("utf-8")
+        if donnees:
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(donnees), donnees))
+
+    def _fin_flux(self):
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _envoyer_json(self, contenu, code=200):
+        corps = json.dumps(contenu, ensure_ascii=False, default=str).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", TYPE_JSON)
+        self.send_header("Content-Length", str(len(corps)))
+        self.end_headers()
+        self.wfile.write(corps)
+
+    def _envoyer_erreur(self, code, message):
+        if self._flux_ouvert:
+            # En-têtes déjà envoyés : pas de nouvelle réponse dans le corps chunked. La connexion
+            # est fermée sans morceau final, le client voit une réponse incomplète.
+            self.log_error("Réponse interrompue (%d) : %s", code, message)
+            self.close_connection = True
+            return
+        try:
+            self._envoyer_json({"erreur": message}, code)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def _envoyer_table(self, df, parametres, entete=None, cle="lignes"):
+        """
+        Envoie un DataFrame par morceaux : en Arrow IPC, ou en JSON {**entete, cle: [lignes]}
+        sérialisé LIGNES_PAR_MORCEAU lignes à la fois.
+        """
+        entete = entete or {}
+        if self._format_arrow(parametres):
+            from utils import dataframe_to_arrow_ipc
+            flux = dataframe_to_arrow_ipc(df)
+            entetes = {f"X-{nom.capitalize()}": valeur for nom, valeur in entete.items() if not isinstance(valeur, (dict, list))}
+            entetes.update({f"X-Total-{nom.capitalize()}": valeur for nom, valeur in entete.get("totaux", {}).items()})
+            self._debut_flux(TYPE_ARROW, entetes)
+            for i in range(0, len(flux), TAILLE_MORCEAU_ARROW):
+                self._morceau(flux[i:i + TAILLE_MORCEAU_ARROW])
+            return self._fin_flux()
+
+        self._debut_flux(TYPE_JSON)
+        debut = json.dumps(entete, ensure_ascii=False, default=str)[:-1]
+        self._morceau(f"{debut}{', ' if entete else ''}\"{cle}\": [")
+        for i in range(0, len(df), LIGNES_PAR_MORCEAU):
+            # to_json écrit les NaN en null et les dates en ISO
+            lignes = df.iloc[i:i + LIGNES_PAR_MORCEAU].to_json(orient="records", force_ascii=False, date_format="iso")[1:-1]
+            self._morceau(("," if i else "") + lignes)
+        self._morceau("]}")
+        self._fin_flux()
+
+    # --- Routes ---
+
+    def route_sante(self, parametres):
+        self._envoyer_json({"statut": "ok", "valorisations_calculees": self.server.service.nb_valorisations})
+
+    def route_valorisation(self, parametres):
+        valorisation = self.server.service.valorisation(parametres.get("devise", "EUR"))
+        positions = valorisation.positions[[c for c in COLONNES_POSITIONS if c in valorisation.positions.columns]]
+        entete = {
+            "date": valorisation.date_valorisation.isoformat(),
+            "devise": valorisation.devise,
+            "totaux": {nom: _nombre_json(v) for nom, v in zip(["acquisition", "actuel", "h52", "lt"], valorisation.totaux())},
+            "alertes": [alerte.message for alerte in valorisation.alertes],
+        }
+        self._envoyer_table(positions, parametres, entete, cle="positions")
+
+    def route_categories(self, parametres):
+        valorisation = self.server.service.valorisation(parametres.get("devise", "EUR"))
+        self._envoyer_table(poids_categories(valorisation), parametres, {"devise": valorisation.devise}, cle="categories")
+
+    def route_signaux(self, parametres):
+        valorisation = self.server.service.valorisation(parametres.get("devise", "EUR"))
+        self._envoyer_table(signaux(valorisation), parametres, cle="signaux")
+
+    def route_metriques(self, parametres):
+        from core.metriques import exposition_texte, TYPE_CONTENU
+        corps = exposition_texte().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", TYPE_CONTENU)
+        self.send_header("Content-Length", str(len(corps)))
+        self.end_headers()
+        self.wfile.write(corps)
+
+    def route_historique(self, parametres):
+        from historical_data_manager import load_historical_series
+        granularite = parametres.get("granularite", "auto")
+        if granularite not in ("auto", "jour", "semaine", "mois"):
+            raise RequeteInvalide(f"Granularité inconnue : {granularite}.")
+        df, granularite = load_historical_series(_date_param(parametres, "debut"), _date_param(parametres, "fin"), granularite)
+        self._envoyer_table(df, parametres, {"granularite": granularite}, cle="historique")
+
+
+ROUTES = {
+    "/sante": GestionnaireAPI.route_sante,
+    "/valorisation": GestionnaireAPI.route_valorisation,
+    "/categories": GestionnaireAPI.route_categories,
+    "/signaux": GestionnaireAPI.route_signaux,
+    "/historique": GestionnaireAPI.route_historique,
+    "/metrics": GestionnaireAPI.route_metriques,
+}
+
+
+def creer_serveur(service, hote=HOTE, port=PORT, journaliser=False):
+    """Crée le serveur (un thread par connexion) ; port=0 choisit un port libre."""
+    serveur = ThreadingHTTPServer((hote, port), GestionnaireAPI)
+    serveur.daemon_threads = True
+    serveur.service = service
+    serveur.journaliser = journaliser
+    return serveur
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Service HTTP local de valorisation du portefeuille")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("fichier", nargs="?", help="Portefeuille Excel (.xlsx, .xls) ou CSV")
+    source.add_argument("--url", help="URL Google Sheets publiée au format CSV")
+    parser.add_argument("--hote", default=HOTE, help=f"Adresse d'écoute (défaut : {HOTE})")
+    parser.add_argument("--port", type=int, default=PORT, help=f"Port d'écoute (défaut : {PORT})")
+    parser.add_argument("--rejeu", help="Rejoue un enregistrement JSON de données de marché (aucun accès réseau)")
+    parser.add_argument("--ttl", type=float, default=TTL_VALORISATION, help="Durée de réutilisation d'une valorisation (s)")
+    parser.add_argument("--base", default=None, help="URL SQLAlchemy de la base (défaut : storage.DATABASE_URL)")
+    args = parser.parse_args()
+
+    if args.base:
+        import storage
+        storage.reinitialiser(args.base)
+    if args.rejeu:
+        fournisseur = FournisseurRejeu.depuis_fichier(args.rejeu)
+    else:
+        from instruments import obtenir_instrument
+        fournisseur = FournisseurYahoo(instruments=obtenir_instrument) # Registre des instruments (portfolio.db)
+    service = ServiceValorisation(args.url or args.fichier, fournisseur, args.ttl)
+    serveur = creer_serveur(service, args.hote, args.port, journaliser=True)
+    print(f"Service de valorisation sur http://{args.hote}:{serveur.server_address[1]}/ (Ctrl+C pour arrêter)")
+    try:
+        serveur.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        serveur.server_close()
+
+
+if __name__ == "__main__":
+    main()
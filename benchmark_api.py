@@ -0,0 +1,159 @@
+# benchmark_api.py
+"""
+Test de charge du service de valorisation (api.py), entièrement en local.
+
+Le service est démarré dans ce processus sur un port libre, avec un portefeuille synthétique,
+le fournisseur de rejeu (core.fournisseurs.FournisseurRejeu, aucun accès réseau) et une base
+temporaire contenant plusieurs années de totaux quotidiens. Des clients concurrents (connexions
+HTTP persistantes) interrogent les routes pendant la durée demandée ; le script affiche le débit,
+les latences p50 / p95 / p99 et la taille des réponses par route et par format.
+
+Usage : python benchmark_api.py [--clients 16] [--duree 5] [--lignes 200] [--latence-rejeu 0.2]
+La base de test est créée dans un répertoire temporaire ; portfolio.db n'est pas modifiée.
+"""
+
+import argparse
+import contextlib
+import http.client
+import io
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+import storage
+import historical_data_manager
+from api import ServiceValorisation, creer_serveur
+from core.fournisseurs import FournisseurRejeu
+
+# (chemin, poids dans le tirage des requêtes)
+SCENARIO = [
+    ("/valorisation?devise=EUR", 4),
+    ("/valorisation?devise=EUR&format=arrow", 2),
+    ("/categories?devise=EUR", 2),
+    ("/signaux", 2),
+    ("/historique?granularite=auto", 1),
+    ("/historique?debut={debut}&format=arrow", 1),
+]
+
+
+def _portefeuille(nb_lignes, graine=0):
+    rng = np.random.default_rng(graine)
+    return pd.DataFrame({
+        "Ticker": [f"T{i % max(nb_lignes * 3 // 4, 1)}" for i in range(nb_lignes)], # Quelques tickers en double
+        "Quantité": rng.integers(1, 1000, nb_lignes).astype(float),
+        "Acquisition": rng.uniform(1, 200, nb_lignes).round(2),
+        "Devise": rng.choice(["EUR", "USD", "GBP", "CHF", "JPY"], nb_lignes),
+        "Categories": rng.choice(["Minières", "Asie", "Energie", "Santé", "Tech"], nb_lignes),
+        "Objectif_LT": rng.uniform(1, 300, nb_lignes).round(2),
+    })
+
+
+def _remplir_historique(nb_annees):
+    fin = date.today()
+    dates = pd.bdate_range(fin - timedelta(days=365 * nb_annees), fin)
+    valeurs = 100000 * np.exp(np.cumsum(np.random.default_rng(1).normal(0, 0.01, len(dates))))
+    historical_data_manager.save_daily_totals_bulk(pd.DataFrame({
+        "Date": dates.date, "Valeur Acquisition": 90000.0, "Valeur Actuelle": valeurs,
+        "Valeur H52": valeurs.max(), "Valeur LT": 150000.0, "Devise": "EUR",
+    }))
+
+
+def executer(nb_clients, duree, nb_lignes, latence_rejeu, ttl):
+    """Démarre le service, lance les clients et retourne {chemin: mesures}."""
+    repertoire = tempfile.mkdtemp(prefix="beam_api_")
+    storage.reinitialiser(f"sqlite:///{os.path.join(repertoire, 'api.db')}")
+    with contextlib.redirect_stdout(io.StringIO()):
+        _remplir_historique(5)
+
+    df = _portefeuille(nb_lignes)
+    fournisseur = FournisseurRejeu.synthetique(df["Ticker"].unique(), latence=latence_rejeu)
+    service = ServiceValorisation(df, fournisseur, ttl=ttl)
+    serveur = creer_serveur(service, port=0)
+    port = serveur.server_address[1]
+    threading.Thread(target=serveur.serve_forever, daemon=True).start()
+
+    debut_historique = (date.today() - timedelta(days=90)).isoformat()
+    chemins = [chemin.format(debut=debut_historique) for chemin, _ in SCENARIO]
+    poids = [p for _, p in SCENARIO]
+    mesures = {chemin: {"latences": [], "octets": 0, "erreurs": 0} for chemin in chemins}
+    verrou = threading.Lock()
+    arret = threading.Event()
+
+    def client(graine):
+        rng = random.Random(graine)
+        connexion = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        while not arret.is_set():
+            chemin = rng.choices(chemins, poids)[0]
+            debut = time.perf_counter()
+            try:
+                connexion.request("GET", chemin)
+                reponse = connexion.getresponse()
+                corps = reponse.read()
+                ok = reponse.status == 200
+            except (OSError, http.client.HTTPException):
+                ok, corps = False, b""
+                connexion.close()
+                connexion = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+            latence = time.perf_counter() - debut
+            with verrou:
+                m = mesures[chemin]
+                if ok:
+                    m["latences"].append(latence)
+                    m["octets"] = len(corps)
+                else:
+                    m["erreurs"] += 1
+        connexion.close()
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(nb_clients)]
+    # historical_data_manager imprime des messages DEBUG à chaque lecture : ils sont masqués pendant la mesure
+    with contextlib.redirect_stdout(io.StringIO()):
+        for t in threads:
+            t.start()
+        time.sleep(duree)
+        arret.set()
+        for t in threads:
+            t.join()
+    serveur.shutdown()
+    serveur.server_close()
+    storage.Engine.dispose()
+    return mesures, service.nb_valorisations
+
+
+def _centile(valeurs, q):
+    return float(np.percentile(valeurs, q)) * 1000 if valeurs else float("nan")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de charge du service de valorisation (api.py)")
+    parser.add_argument("--clients", type=int, default=16, help="Nombre de clients concurrents")
+    parser.add_argument("--duree", type=float, default=5.0, help="Durée du test en secondes")
+    parser.add_argument("--lignes", type=int, default=200, help="Nombre de lignes du portefeuille synthétique")
+    parser.add_argument("--latence-rejeu", type=float, default=0.2,
+                        help="Latence simulée de chaque appel au fournisseur de rejeu (s)")
+    parser.add_argument("--ttl", type=float, default=60.0, help="TTL des valorisations du service (s)")
+    args = parser.parse_args()
+
+    mesures, nb_valorisations = executer(args.clients, args.duree, args.lignes, args.latence_rejeu, args.ttl)
+
+    total = sum(len(m["latences"]) for m in mesures.values())
+    print(f"{args.clients} clients, {args.duree:.0f} s, portefeuille de {args.lignes} lignes, "
+          f"latence de rejeu {args.latence_rejeu * 1000:.0f} ms\n")
+    print(f"{'Route':<44}{'Req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'Octets':>10}{'Erreurs':>9}")
+    for chemin, m in mesures.items():
+        lat = m["latences"]
+        print(f"{chemin[:43]:<44}{len(lat) / args.duree:>9.1f}{_centile(lat, 50):>9.1f}{_centile(lat, 95):>9.1f}"
+              f"{_centile(lat, 99):>9.1f}{m['octets']:>10}{m['erreurs']:>9}")
+    toutes = [l for m in mesures.values() for l in m["latences"]]
+    print(f"\nTotal : {total / args.duree:.1f} req/s, p50 {statistics.median(toutes) * 1000 if toutes else float('nan'):.1f} ms ; "
+          f"{nb_valorisations} valorisation(s) calculée(s) pour {total} requêtes (cache partagé).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+# benchmark_google_sheets.py
+"""
+Rechargement conditionnel d'un portefeuille publié en CSV, contre un serveur local qui imite
+la publication Google Sheets (aucun accès réseau).
+
+Le serveur de remplacement (ServeurFeuille) sert un CSV avec ETag et Last-Modified et répond
+304 aux requêtes conditionnelles dont les validateurs correspondent ; avec --sans-validateurs,
+il ne les envoie pas (l'empreinte du contenu prend alors le relais côté client).
+
+Le script compare :
+- le rechargement complet d'origine (pd.read_csv sur l'URL, à chaque fois) ;
+- core.source_distante.charger_si_modifie sur une feuille inchangée (304, ou empreinte identique) ;
+- un rechargement après modification (quantités changées, tickers ajoutés et retirés), avec
+  les différences ligne à ligne calculées par comparer_portefeuilles.
+
+Usage :
+    python benchmark_google_sheets.py [--lignes 500] [--repetitions 50] [--sans-validateurs]
+    python benchmark_google_sheets.py --servir portefeuille.csv [--port 8504]
+        (sert le fichier, relu à chaque requête, pour tester l'onglet Paramètres avec
+        l'URL http://127.0.0.1:8504/pub?output=csv)
+"""
+
+import argparse
+import hashlib
+import os
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+from core.source_distante import charger_si_modifie, comparer_portefeuilles
+
+
+class ServeurFeuille(ThreadingHTTPServer):
+    """Serveur local servant un CSV comme une feuille publiée (validateurs HTTP optionnels)."""
+
+    def __init__(self, contenu=b"", port=0, validateurs=True, fichier=None):
+        super().__init__(("127.0.0.1", port), _GestionnaireFeuille)
+        self.daemon_threads = True
+        self.validateurs = validateurs
+        self.fichier = fichier # Relu à chaque requête s'il est indiqué
+        self.nb_complets = 0
+        self.nb_non_modifies = 0
+        self.publier(contenu)
+
+    def publier(self, contenu):
+        """Remplace le contenu servi (nouvel ETag et nouvelle date de modification)."""
+        if contenu != getattr(self, "contenu", None):
+            self.contenu = contenu
+            self.etag = f'"{hashlib.sha1(contenu).hexdigest()}"'
+            self.derniere_modification = formatdate(time.time(), usegmt=True)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/pub?output=csv"
+
+
+class _GestionnaireFeuille(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        serveur = self.server
+        if serveur.fichier:
+            with open(serveur.fichier, "rb") as f:
+                serveur.publier(f.read())
+        if serveur.validateurs and (
+                self.headers.get("If-None-Match") == serveur.etag
+                or (self.headers.get("If-None-Match") is None
+                    and self.headers.get("If-Modified-Since") == serveur.derniere_modification)):
+            serveur.nb_non_modifies += 1
+            self.send_response(304)
+            self.send_header("ETag", serveur.etag)
+            self.end_headers()
+            return
+        serveur.nb_complets += 1
+        self.send_response(200)
+        self.send_header("Content-Type", "text/csv; charset=utf-8")
+        self.send_header("Content-Length", str(len(serveur.contenu)))
+        if serveur.validateurs:
+            self.send_header("ETag", serveur.etag)
+            self.send_header("Last-Modified", serveur.derniere_modification)
+        self.end_headers()
+        self.wfile.write(serveur.contenu)
+
+
+def _portefeuille(nb_lignes, graine=0):
+    rng = np.random.default_rng(graine)
+    return pd.DataFrame({
+        "Ticker": [f"T{i}" for i in range(nb_lignes)],
+        "Quantité": rng.integers(1, 1000, nb_lignes).astype(float),
+        "Acquisition": rng.uniform(1, 200, nb_lignes).round(2),
+        "Devise": rng.choice(["EUR", "USD", "GBP", "CHF"], nb_lignes),
+        "Catégories": rng.choice(["Minières", "Asie", "Energie", "Matériaux"], nb_lignes),
+        "Objectif_LT": rng.uniform(1, 300, nb_lignes).round(2),
+    })
+
+
+def _csv(df):
+    return df.to_csv(index=False).encode("utf-8")
+
+
+def _duree_moyenne(fonction, repetitions):
+    debut = time.perf_counter()
+    for _ in range(repetitions):
+        fonction()
+    return (time.perf_counter() - debut) / repetitions * 1000
+
+
+def executer(nb_lignes, repetitions, validateurs):
+    df = _portefeuille(nb_lignes)
+    serveur = ServeurFeuille(_csv(df), validateurs=validateurs)
+    threading.Thread(target=serveur.serve_forever, daemon=True).start()
+    url = serveur.url
+
+    complet = _duree_moyenne(lambda: pd.read_csv(url), repetitions)
+
+    etat, _ = charger_si_modifie(url)
+    avant = (serveur.nb_complets, serveur.nb_non_modifies)
+    conditionnel = _duree_moyenne(lambda: charger_si_modifie(url, etat), repetitions)
+    reponses = (serveur.nb_complets - avant[0], serveur.nb_non_modifies - avant[1])
+
+    # Modification de la feuille : 3 quantités changées, 2 tickers ajoutés, 1 retiré
+    df_modifie = df.copy()
+    df_modifie.loc[df_modifie.index[:3], "Quantité"] += 10
+    df_modifie = pd.concat([df_modifie.iloc[1:], pd.DataFrame({
+        "Ticker": ["NOUVEAU1", "NOUVEAU2"], "Quantité": [5.0, 8.0], "Acquisition": [10.0, 20.0],
+        "Devise": ["JPY", "EUR"], "Catégories": ["Asie", "Energie"], "Objectif_LT": [15.0, 30.0],
+    })], ignore_index=True)
+    serveur.publier(_csv(df_modifie))
+    df_precedent = etat.df
+    debut = time.perf_counter()
+    etat, modifie = charger_si_modifie(url, etat)
+    diff = comparer_portefeuilles(df_precedent, etat.df)
+    apres_modification = (time.perf_counter() - debut) * 1000
+
+    serveur.shutdown()
+    serveur.server_close()
+    return complet, conditionnel, reponses, modifie, apres_modification, diff
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rechargement conditionnel d'une feuille publiée en CSV (serveur local)")
+    parser.add_argument("--lignes", type=int, default=500, help="Nombre de lignes du portefeuille synthétique")
+    parser.add_argument("--repetitions", type=int, default=50, help="Rechargements mesurés par scénario")
+    parser.add_argument("--sans-validateurs", action="store_true", help="Le serveur n'envoie ni ETag ni Last-Modified")
+    parser.add_argument("--servir", help="Sert ce fichier CSV (relu à chaque requête) au lieu de lancer la mesure")
+    parser.add_argument("--port", type=int, default=8504, help="Port du serveur avec --servir")
+    args = parser.parse_args()
+
+    if args.servir:
+        serveur = ServeurFeuille(port=args.port, fichier=os.path.abspath(args.servir), validateurs=not args.sans_validateurs)
+        print(f"Feuille servie sur {serveur.url} (Ctrl+C pour arrêter)")
+        try:
+            serveur.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return
+
+    complet, conditionnel, (nb_complets, nb_304), modifie, apres_modification, diff = executer(
+        args.lignes, args.repetitions, not args.sans_validateurs)
+    print(f"Portefeuille de {args.lignes} lignes, {args.repetitions} rechargements, "
+          f"validateurs HTTP {'absents' if args.sans_validateurs else 'présents'}\n")
+    print(f"{'Rechargement complet (pd.read_csv)':<48}{complet:>9.2f} ms")
+    print(f"{'Rechargement conditionnel, feuille inchangée':<48}{conditionnel:>9.2f} ms"
+          f"   ({nb_304} réponse(s) 304, {nb_complets} complète(s))")
+    print(f"{'Rechargement après modification + différences':<48}{apres_modification:>9.2f} ms"
+          f"   (modifiée : {'oui' if modifie else 'non'})")
+    print(f"\nDifférences : {diff.resume()}")
+    print(f"Devises ajoutées : {', '.join(diff.devises_ajoutees) or 'aucune'} ; "
+          f"tickers retirés : {', '.join(diff.tickers_retires) or 'aucun'}")
+    print(f"\nGain sur une feuille inchangée : x{complet / conditionnel:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# benchmark_ingestion.py
+"""
+Débit d'import des fichiers de positions : lecteurs pandas par défaut contre core.ingestion.
+
+Un classeur de plusieurs feuilles est généré : la feuille des positions, saisie à la française
+avec des colonnes inutilisées, puis des feuilles de transactions plus volumineuses. Le même
+contenu est aussi écrit en CSV. Pour chaque format, le script compare :
+- pd.read_excel / pd.read_csv par défaut (inférence de types, toutes les colonnes), suivis de
+  l'analyse en table canonique (core.positions) ;
+- core.ingestion.lire_portefeuille à froid (projection, types explicites, lecture en flux de
+  la seule feuille des positions ou lecture CSV par blocs), suivi de la même analyse ;
+- une seconde lecture du même fichier (cache par empreinte).
+
+Usage : python benchmark_ingestion.py [--lignes 20000] [--transactions 50000]
+Les fichiers sont créés dans un répertoire temporaire.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from core import ingestion
+from core.positions import analyser_positions
+
+
+def _nombre_fr(valeurs, decimales):
+    return [f"{v:,.{decimales}f}".replace(",", " ").replace(".", ",") for v in valeurs]
+
+
+def _positions(nb_lignes, graine=0):
+    rng = np.random.default_rng(graine)
+    df = pd.DataFrame({
+        "Ticker": [f"T{i}.PA" for i in range(nb_lignes)],
+        "Nom": [f"Société {i}" for i in range(nb_lignes)],
+        "Quantité": _nombre_fr(rng.integers(1, 5000, nb_lignes), 0),
+        "Acquisition": _nombre_fr(rng.uniform(1, 2000, nb_lignes), 2),
+        "Devise": rng.choice(["EUR", "usd", " GBP", "CHF"], nb_lignes),
+        "Categories": rng.choice(["Minières", "Asie", "Energie", "Matériaux", ""], nb_lignes),
+        "H": rng.choice(["", "0,01"], nb_lignes),
+        "LT": _nombre_fr(rng.uniform(1, 3000, nb_lignes), 2),
+    })
+    for i in range(8):
+        df[f"Commentaire {i}"] = rng.choice(["à revoir", "ok", "", "dividende"], nb_lignes)
+    return df
+
+
+def _transactions(nb_lignes, graine=1):
+    rng = np.random.default_rng(graine)
+    return pd.DataFrame({
+        "Date": pd.Timestamp("2015-01-01") + pd.to_timedelta(rng.integers(0, 3650, nb_lignes), unit="D"),
+        "Ticker": [f"T{i % 500}.PA" for i in range(nb_lignes)],
+        "Sens": rng.choice(["Achat", "Vente"], nb_lignes),
+        "Quantité": rng.integers(1, 500, nb_lignes),
+        "Prix": rng.uniform(1, 2000, nb_lignes).round(2),
+        "Frais": rng.uniform(0, 20, nb_lignes).round(2),
+    })
+
+
+def _mesurer(fonction):
+    debut = time.perf_counter()
+    resultat = fonction()
+    return resultat, time.perf_counter() - debut
+
+
+def _ligne(libelle, nb_lignes, duree):
+    debit = f"{nb_lignes / duree:,.0f}".replace(",", " ")
+    print(f"{libelle:<48}{duree * 1000:>10.0f} ms{debit:>14} lignes/s")
+
+
+def executer(chemin, nb_lignes, lecture_defaut):
+    df_defaut, duree_defaut = _mesurer(lambda: analyser_positions(lecture_defaut(chemin)))
+    _ligne("pandas par défaut + analyse", nb_lignes, duree_defaut)
+
+    lecture, duree_froid = _mesurer(lambda: analyser_positions(ingestion.lire_portefeuille(chemin).df))
+    _ligne("core.ingestion à froid + analyse", nb_lignes, duree_froid)
+
+    relecture, duree_cache = _mesurer(lambda: ingestion.lire_portefeuille(chemin))
+    _ligne("core.ingestion, même fichier (cache)", nb_lignes, duree_cache)
+
+    colonnes = ["Ticker", "Quantité", "Acquisition", "Devise", "Catégories", "Facteur_Ajustement_FX", "Objectif_LT"]
+    identiques = df_defaut[colonnes].reset_index(drop=True).astype(str).equals(lecture[colonnes].reset_index(drop=True).astype(str))
+    print(f"    {relecture.resume()} ; tables canoniques identiques : {'oui' if identiques else 'NON'}")
+    return duree_defaut / duree_froid
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Débit d'import des fichiers de positions (Excel, CSV)")
+    parser.add_argument("--lignes", type=int, default=20000, help="Lignes de la feuille des positions")
+    parser.add_argument("--transactions", type=int, default=50000, help="Lignes de chacune des deux feuilles de transactions")
+    args = parser.parse_args()
+
+    positions = _positions(args.lignes)
+    with tempfile.TemporaryDirectory() as repertoire:
+        chemin_xlsx = os.path.join(repertoire, "portefeuille.xlsx")
+        chemin_csv = os.path.join(repertoire, "portefeuille.csv")
+        print("Génération des fichiers...")
+        with pd.ExcelWriter(chemin_xlsx) as classeur:
+            positions.to_excel(classeur, sheet_name="Positions", index=False)
+            for annee in ("Transactions 2023", "Transactions 2024"):
+                _transactions(args.transactions).to_excel(classeur, sheet_name=annee, index=False)
+        positions.to_csv(chemin_csv, index=False)
+        print(f"Classeur de 3 feuilles ({os.path.getsize(chemin_xlsx) / 1e6:.1f} Mo), positions : "
+              f"{args.lignes} lignes x {len(positions.columns)} colonnes\n")
+
+        print("Excel (.xlsx)")
+        gain_xlsx = executer(chemin_xlsx, args.lignes, pd.read_excel)
+        print("\nCSV")
+        gain_csv = executer(chemin_csv, args.lignes, pd.read_csv)
+
+    print(f"\nGain à froid : x{gain_xlsx:.1f} (Excel), x{gain_csv:.1f} (CSV)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+# benchmark_startup.py
+"""
+Mesure le temps d'import au démarrage de l'application (python -X importtime) et le compare
+à des budgets suivis dans ce fichier.
+
+Les modules de démarrage sont lus dans streamlit_app.py (imports de premier niveau uniquement,
+les imports placés dans les fonctions des onglets sont différés). Le script vérifie aussi
+qu'aucune dépendance lourde réservée aux vues n'est chargée au démarrage.
+
+Usage : python benchmark_startup.py [--runs 5]
+Code de sortie 1 si un budget est dépassé ou si un module interdit est importé.
+"""
+
+import argparse
+import ast
+import os
+import statistics
+import subprocess
+import sys
+
+REPERTOIRE = os.path.dirname(os.path.abspath(__file__))
+FICHIER_APP = os.path.join(REPERTOIRE, "streamlit_app.py")
+
+# Budgets en millisecondes (temps cumulé d'import, médiane des exécutions).
+# "total" couvre l'ensemble des imports de premier niveau de streamlit_app.py.
+BUDGETS_MS = {
+    "total": 2500,
+    "streamlit": 1800,
+    "data_fetcher": 800, # Inclut pandas, que streamlit n'importe pas au démarrage
+    "data_loader": 300,
+    "tab_router": 100,
+    "streamlit_autorefresh": 200,
+}
+
+# Dépendances lourdes qui ne doivent être chargées que par les onglets qui en ont besoin
+# (hors modules déjà chargés par streamlit et pandas eux-mêmes : pandas importe par exemple pyarrow)
+MODULES_INTERDITS = ["yfinance", "matplotlib", "plotly", "sqlalchemy", "scipy", "PIL", "pyarrow"]
+
+# Vues mesurées à titre indicatif : coût supplémentaire à la première ouverture de l'onglet
+VUES = ["portfolio_display", "performance", "portfolio_journal", "taux_change", "parametres"]
+
+
+def modules_demarrage(fichier=FICHIER_APP):
+    """Retourne les modules importés au premier niveau d'un script (hors fonctions)."""
+    with open(fichier, "r", encoding="utf-8") as f:
+        arbre = ast.parse(f.read())
+    modules = []
+    for noeud in arbre.body:
+        if isinstance(noeud, ast.Import):
+            modules.extend(alias.name for alias in noeud.names)
+        elif isinstance(noeud, ast.ImportFrom) and noeud.module and noeud.level == 0:
+            modules.append(noeud.module)
+    return list(dict.fromkeys(modules))
+
+
+def mesurer_imports(modules, deja_importes=()):
+    """
+    Lance un interpréteur neuf avec -X importtime et retourne {module: temps cumulé en ms}
+    pour tous les modules chargés par l'import de 'modules' (hors 'deja_importes').
+    """
+    code = ""
+    if deja_importes:
+        code += "import " + ", ".join(deja_importes) + "; import sys; sys.stderr.write('--- MESURE ---\\n'); "
+    code += "import " + ", ".join(modules)
+    resultat = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=REPERTOIRE, capture_output=True, text=True
+    )
+    if resultat.returncode != 0:
+        raise RuntimeError(f"Échec de l'import de {modules} :\n{resultat.stderr[-2000:]}")
+
+    lignes = resultat.stderr.splitlines()
+    if deja_importes:
+        lignes = lignes[lignes.index("--- MESURE ---") + 1:]
+
+    temps = {}
+    for ligne in lignes:
+        # Format : "import time:   self [us] | cumulative | imported package"
+        if not ligne.startswith("import time:") or "imported package" in ligne:
+            continue
+        _, cumule, nom = ligne[len("import time:"):].split("|")
+        temps[nom.strip()] = int(cumule) / 1000
+    return temps
+
+
+def niveau_zero(temps, modules):
+    """Temps cumulé des modules demandés (seules les entrées de premier niveau sont sommées)."""
+    return {m: temps.get(m, 0.0) for m in modules}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du temps de démarrage de l'application")
+    parser.add_argument("--runs", type=int, default=5, help="Nombre d'exécutions (la médiane est retenue)")
+    args = parser.parse_args()
+
+    modules = modules_demarrage()
+    print(f"Modules de démarrage ({FICHIER_APP}) : {', '.join(modules)}")
+
+    mesures = []
+    modules_charges = set()
+    for _ in range(args.runs):
+        temps = mesurer_imports(modules)
+        modules_charges.update(temps)
+        par_module = niveau_zero(temps, modules)
+        par_module["total"] = sum(par_module.values())
+        mesures.append(par_module)
+
+    medianes = {cle: statistics.median(m[cle] for m in mesures) for cle in mesures[0]}
+
+    echecs = []
+    print(f"\n{'Module':<25}{'Médiane (ms)':>15}{'Budget (ms)':>15}")
+    for cle, valeur in medianes.items():
+        budget = BUDGETS_MS.get(cle)
+        depasse = budget is not None and valeur > budget
+        if depasse:
+            echecs.append(f"{cle} : {valeur:.0f} ms > {budget} ms")
+        print(f"{cle:<25}{valeur:>15.1f}{(budget if budget is not None else '-'):>15}{'  DÉPASSÉ' if depasse else ''}")
+
+    modules_socle = set(mesurer_imports(["streamlit", "pandas"]))
+    interdits = sorted(m for m in MODULES_INTERDITS if m in modules_charges - modules_socle)
+    for m in interdits:
+        echecs.append(f"{m} est importé au démarrage")
+
+    print("\nCoût supplémentaire à la première ouverture des vues :")
+    for vue in VUES:
+        try:
+            temps_vue = mesurer_imports([vue], deja_importes=modules)
+            print(f"  {vue:<23}{temps_vue.get(vue, 0.0):>15.1f} ms")
+        except RuntimeError as e:
+            print(f"  {vue:<23}{'erreur':>15} ({str(e).splitlines()[0]})")
+
+    if echecs:
+        print("\nÉCHEC :")
+        for echec in echecs:
+            print(f"  - {echec}")
+        sys.exit(1)
+    print("\nOK : budgets de démarrage respectés.")
+
+
+if __name__ == "__main__":
+    main()
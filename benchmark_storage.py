@@ -0,0 +1,141 @@
+# benchmark_storage.py
+"""
+Débit de lecture / écriture concurrentes sur la base SQLite partagée (storage.py).
+
+Un thread écrivain enregistre des snapshots quotidiens (journal + totaux) pendant que
+plusieurs threads lecteurs interrogent le journal et l'historique, comme le feraient
+plusieurs sessions Streamlit. Le test est exécuté en mode WAL (configuration de
+l'application) puis avec le journal de rollback par défaut de SQLite, pour comparaison.
+
+Usage : python benchmark_storage.py [--lecteurs 8] [--duree 5]
+La base de test est créée dans un répertoire temporaire ; portfolio.db n'est pas modifiée.
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+import storage
+import portfolio_journal
+import historical_data_manager
+
+DATE_DEBUT = date(2020, 1, 1)
+
+
+def _portefeuille(nb_lignes, graine):
+    rng = np.random.default_rng(graine)
+    return pd.DataFrame({
+        "Ticker": [f"T{i}" for i in range(nb_lignes)],
+        "Quantité": rng.integers(1, 1000, nb_lignes).astype(float),
+        "Acquisition": rng.uniform(1, 200, nb_lignes).round(2),
+        "Devise": rng.choice(["EUR", "USD", "GBP"], nb_lignes),
+        "Catégorie": rng.choice(["Minières", "Asie", "Energie"], nb_lignes),
+        "Objectif_LT": rng.uniform(1, 300, nb_lignes).round(2),
+    })
+
+
+def _ecrire_jour(jour, df):
+    d = DATE_DEBUT + timedelta(days=jour)
+    portfolio_journal.save_portfolio_snapshot(d, df, "EUR")
+    historical_data_manager.save_daily_totals(d, 1000.0 + jour, 1100.0 + jour, 1200.0, 1300.0, "EUR")
+
+
+def executer(pragmas, nb_lecteurs, duree, jours_initiaux=90, nb_lignes=50):
+    """Lance le scénario avec les pragmas donnés et retourne les mesures."""
+    repertoire = tempfile.mkdtemp(prefix="beam_bench_")
+    storage.PRAGMAS = pragmas
+    storage.reinitialiser(f"sqlite:///{os.path.join(repertoire, 'bench.db')}")
+
+    df = _portefeuille(nb_lignes, 0)
+    with contextlib.redirect_stdout(io.StringIO()):
+        for jour in range(jours_initiaux):
+            if jour % 5 == 0:
+                df.loc[random.randrange(nb_lignes), "Quantité"] += 10
+            _ecrire_jour(jour, df)
+
+    arret = threading.Event()
+    latences_ecriture, nb_lectures, erreurs = [], [0] * nb_lecteurs, []
+
+    def ecrivain():
+        jour, df_local = jours_initiaux, df.copy()
+        while not arret.is_set():
+            df_local.loc[random.randrange(nb_lignes), "Quantité"] += 1
+            debut = time.perf_counter()
+            try:
+                _ecrire_jour(jour, df_local)
+                latences_ecriture.append(time.perf_counter() - debut)
+            except Exception as e:
+                erreurs.append(f"écriture : {e}")
+            jour += 1
+
+    def lecteur(indice):
+        while not arret.is_set():
+            d = DATE_DEBUT + timedelta(days=random.randrange(jours_initiaux))
+            try:
+                portfolio_journal.has_snapshot_for_date(d)
+                portfolio_journal.load_portfolio_as_of(d)
+                # Lecture côté SQLite (sans travail Python) : c'est elle qui révèle les verrous
+                with storage.Session() as session:
+                    session.execute(text(
+                        "SELECT count(*), sum(current_value) FROM portfolio_daily_totals t "
+                        "JOIN portfolio_position_events e ON e.event_date <= t.date"
+                    )).all()
+                nb_lectures[indice] += 1
+            except Exception as e:
+                erreurs.append(f"lecture : {e}")
+
+    threads = [threading.Thread(target=ecrivain)] + [threading.Thread(target=lecteur, args=(i,)) for i in range(nb_lecteurs)]
+    # Les fonctions du journal impriment des messages DEBUG : ils sont masqués pendant la mesure
+    with contextlib.redirect_stdout(io.StringIO()) as sortie:
+        for t in threads:
+            t.start()
+        time.sleep(duree)
+        arret.set()
+        for t in threads:
+            t.join()
+    erreurs += [ligne for ligne in sortie.getvalue().splitlines() if ligne.startswith("ERREUR")]
+
+    storage.Engine.dispose()
+    return {
+        "lectures_s": sum(nb_lectures) / duree,
+        "ecritures_s": len(latences_ecriture) / duree,
+        "ecriture_p50_ms": statistics.median(latences_ecriture) * 1000 if latences_ecriture else float("nan"),
+        "ecriture_max_ms": max(latences_ecriture) * 1000 if latences_ecriture else float("nan"),
+        "erreurs": len(erreurs),
+        "exemple_erreur": erreurs[0] if erreurs else "",
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark lecture / écriture concurrentes SQLite")
+    parser.add_argument("--lecteurs", type=int, default=8, help="Nombre de threads lecteurs")
+    parser.add_argument("--duree", type=float, default=5.0, help="Durée de chaque scénario en secondes")
+    args = parser.parse_args()
+
+    scenarios = {
+        "WAL + synchronous=NORMAL": dict(storage.PRAGMAS),
+        "Journal rollback (défaut SQLite)": {"journal_mode": "DELETE", "synchronous": "FULL"},
+    }
+    print(f"{args.lecteurs} lecteurs, 1 écrivain, {args.duree:.0f} s par scénario\n")
+    print(f"{'Scénario':<36}{'Lectures/s':>12}{'Écritures/s':>13}{'Écr. p50 ms':>13}{'Écr. max ms':>13}{'Erreurs':>9}")
+    for nom, pragmas in scenarios.items():
+        r = executer(pragmas, args.lecteurs, args.duree)
+        print(f"{nom:<36}{r['lectures_s']:>12.1f}{r['ecritures_s']:>13.1f}{r['ecriture_p50_ms']:>13.1f}"
+              f"{r['ecriture_max_ms']:>13.1f}{r['erreurs']:>9}")
+        if r["exemple_erreur"]:
+            print(f"    ex. : {r['exemple_erreur'][:120]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+# cache_dependances.py
+"""
+Invalidation ciblée des caches de données (au lieu de st.cache_data.clear()).
+
+Chaque fonction cache_instrumente(dependances=...) déclare, pour ses arguments, les données
+dont dépend son résultat : ("ticker", "AAPL"), ("devise", "EUR"), ("portefeuille", empreinte).
+Chaque exécution réelle enregistre son entrée sous ces dépendances ; invalider(...) n'évince
+que les entrées concernées (clear(*args) de la fonction Streamlit, entrée par entrée).
+Les cours par ticker survivent ainsi à l'import d'un portefeuille : seules les reconstructions
+qui dépendaient de l'ancien portefeuille sont évincées.
+
+Les entrées sont identifiées par cle_arguments (empreinte des arguments, DataFrames et listes
+compris, sans dépendre des fonctions internes de Streamlit) : une nouvelle exécution remplace
+l'entrée précédente des mêmes arguments. Si un argument ne peut pas être haché, l'invalidation
+vide tout le cache de la fonction. Une entrée est oubliée à l'expiration de son ttl, quand
+Streamlit l'a lui-même évincée.
+
+Le registre est partagé par toutes les sessions du processus, comme les caches Streamlit.
+Ce module n'importe pas Streamlit.
+"""
+
+import hashlib
+import heapq
+import pickle
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+
+from core.positions import empreinte
+
+_verrou = threading.Lock()
+_entrees = {} # (nom, clé st.cache_data) -> (fonction cachée, args, kwargs, dépendances, expiration)
+_par_dependance = {} # dépendance -> ensemble de clés d'entrée
+_expirations = [] # Tas (expiration, clé d'entrée) des entrées avec ttl
+
+
+def ticker(symbole):
+    return ("ticker", str(symbole).strip())
+
+
+def devise(code):
+    return ("devise", str(code).strip().upper())
+
+
+def portefeuille(df):
+    return ("portefeuille", empreinte_portefeuille(df))
+
+
+def empreinte_portefeuille(df):
+    """Empreinte du contenu d'un DataFrame (voir core.positions.empreinte), stable d'un rerun à l'autre."""
+    return empreinte(df)
+
+
+_SCALAIRES = (type(None), bool, int, float, complex, str, bytes, date, datetime, timedelta)
+
+
+def _cle_valeur(valeur):
+    if isinstance(valeur, float):
+        return ("float", repr(valeur)) # NaN égal à lui-même
+    if isinstance(valeur, _SCALAIRES):
+        return (type(valeur).__name__, valeur)
+    if isinstance(valeur, pd.DataFrame):
+        return ("DataFrame", empreinte(valeur))
+    if isinstance(valeur, pd.Series):
+        return ("Series", str(valeur.name), empreinte(valeur.to_frame()))
+    if isinstance(valeur, (list, tuple)):
+        return (type(valeur).__name__, tuple(_cle_valeur(v) for v in valeur))
+    if isinstance(valeur, dict):
+        return ("dict", tuple((_cle_valeur(k), _cle_valeur(v)) for k, v in valeur.items()))
+    if isinstance(valeur, (set, frozenset)):
+        return (type(valeur).__name__, tuple(sorted(map(_cle_valeur, valeur), key=repr)))
+    return (type(valeur).__name__, hashlib.sha256(pickle.dumps(valeur)).hexdigest()[:16])
+
+
+def cle_arguments(args, kwargs):
+    """
+    Clé stable d'un appel, calculée sur le contenu des arguments (empreinte des DataFrames et
+    Series, parcours des listes, tuples, dictionnaires et ensembles, pickle en dernier recours).
+    None si un argument ne peut pas être haché.
+    """
+    try:
+        return _cle_valeur((tuple(args), dict(sorted(kwargs.items()))))
+    except Exception:
+        return None
+
+
+def _secondes(ttl):
+    if ttl is None:
+        return None
+    return ttl.total_seconds() if isinstance(ttl, timedelta) else float(ttl)
+
+
+def enregistrer(nom, fonction_cachee, args, kwargs, dependances, cle, ttl=None):
+    """
+    Rattache l'entrée (fonction, arguments) à ses dépendances ; remplace l'entrée de même clé
+    (cle_arguments des arguments). Sans clé (argument non hachable), les dépendances sont
+    rattachées à la fonction entière : leur invalidation vide tout son cache.
+    """
+    dependances = frozenset(dependances)
+    if not dependances:
+        return
+    maintenant = time.monotonic()
+    duree = _secondes(ttl)
+    expiration = maintenant + duree if duree is not None else None
+    with _verrou:
+        _purger(maintenant)
+        if cle is None:
+            cle, args, kwargs = (nom, None), None, None
+            ancienne = _entrees.get(cle)
+            if ancienne is not None:
+                dependances |= ancienne[3]
+        else:
+            cle = (nom, cle)
+        _retirer(cle)
+        _entrees[cle] = (fonction_cachee, args, kwargs, dependances, expiration)
+        for dependance in dependances:
+            _par_dependance.setdefault(dependance, set()).add(cle)
+        if expiration is not None:
+            heapq.heappush(_expirations, (expiration, cle))
+
+
+def _purger(maintenant):
+    """Oublie les entrées dont le ttl est écoulé (déjà évincées par Streamlit)."""
+    while _expirations and _expirations[0][0] <= maintenant:
+        expiration, cle = heapq.heappop(_expirations)
+        entree = _entrees.get(cle)
+        if entree is not None and entree[4] == expiration: # Sinon l'entrée a été réenregistrée depuis
+            _retirer(cle)
+
+
+def _retirer(cle):
+    entree = _entrees.pop(cle, None)
+    if entree is None:
+        return None
+    for dependance in entree[3]:
+        cles = _par_dependance.get(dependance)
+        if cles is not None:
+            cles.discard(cle)
+            if not cles:
+                del _par_dependance[dependance]
+    return entree
+
+
+def invalider(*dependances):
+    """
+    Évince du cache les entrées qui dépendent d'au moins une des dépendances données.
+    Returns:
+        dict: Nom de fonction -> nombre d'entrées évincées.
+    """
+    with _verrou:
+        _purger(time.monotonic())
+        cles = set().union(*(_par_dependance.get(d, set()) for d in dependances)) if dependances else set()
+        entrees = [(cle[0], _retirer(cle)) for cle in cles]
+    evincees = {}
+    for nom, (fonction_cachee, args, kwargs, _, _) in entrees:
+        if args is None:
+            fonction_cachee.clear() # Entrées non identifiables : tout le cache de la fonction
+        else:
+            fonction_cachee.clear(*args, **kwargs)
+        evincees[nom] = evincees.get(nom, 0) + 1
+    return evincees
+
+
+def invalider_portefeuille(df):
+    """Évince les entrées calculées sur ce portefeuille (reconstructions...) ; les cours par ticker sont conservés."""
+    return invalider(portefeuille(df)) if df is not None else {}
+
+
+def nb_entrees(dependance=None):
+    """Nombre d'entrées suivies (toutes, ou celles d'une dépendance)."""
+    with _verrou:
+        _purger(time.monotonic())
+        return len(_entrees) if dependance is None else len(_par_dependance.get(dependance, ()))
@@ -0,0 +1,165 @@
+# cli.py
+"""
+Valorisation du portefeuille hors navigateur, avec le noyau (core) et sans Streamlit.
+
+Charge un portefeuille (Excel, CSV ou URL Google Sheets publiée en CSV), récupère les cours,
+le momentum et les taux de change sur Yahoo Finance, affiche les totaux en devise cible et
+enregistre le snapshot quotidien du journal et les totaux du jour dans portfolio.db, comme
+le fait l'onglet Portefeuille. Avec plusieurs portefeuilles, les données de marché de l'union
+des tickers sont chargées une seule fois et c'est la vue consolidée qui est enregistrée.
+
+Usage :
+    python cli.py portefeuille.xlsx --devise EUR
+    python cli.py client_a.xlsx client_b.csv client_c.xlsx   # vue consolidée du foyer
+    python cli.py --url "https://docs.google.com/.../pub?output=csv" --json valorisation.json
+
+Planification quotidienne (cron, du lundi au vendredi à 18h30) :
+    30 18 * * 1-5  cd /chemin/vers/BEAM-Portfolio-manager && python cli.py portefeuille.xlsx >> cli.log 2>&1
+
+Code de sortie : 0 si la valorisation est complète, 1 si le portefeuille ne peut pas être chargé,
+2 si des cours ou des taux de change manquent (les totaux sont alors partiels).
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import date
+
+import pandas as pd
+
+import core
+from core.fournisseurs import FournisseurRejeu, FournisseurYahoo
+from core.modeles import ERREUR
+
+
+def charger_fichier(chemin):
+    """Lit un portefeuille Excel ou CSV (même règle que data_loader.load_data, voir core.ingestion)."""
+    from core.ingestion import lire_portefeuille
+    return lire_portefeuille(chemin).df
+
+
+def enregistrer(valorisation, forcer=False):
+    """Écrit le snapshot du journal (s'il n'existe pas encore, sauf forcer) et les totaux du jour."""
+    from portfolio_journal import has_snapshot_for_date, save_portfolio_snapshot
+    from historical_data_manager import save_daily_totals
+
+    jour = valorisation.date_valorisation
+    if forcer or not has_snapshot_for_date(jour):
+        save_portfolio_snapshot(jour, valorisation.positions, valorisation.devise)
+        print(f"Snapshot du portefeuille du {jour:%Y-%m-%d} enregistré.")
+    else:
+        print(f"Snapshot du {jour:%Y-%m-%d} déjà présent : conservé.")
+    save_daily_totals(jour, *valorisation.totaux(), valorisation.devise)
+    print(f"Totaux du {jour:%Y-%m-%d} enregistrés.")
+
+
+def exporter_json(valorisation, chemin):
+    """Écrit les totaux et les positions valorisées dans un fichier JSON."""
+    colonnes = ["Portefeuille", "Ticker", "shortName", "Quantité", "Devise", "currentPrice", "Valeur_conv",
+                "Valeur_Actuelle_conv", "Gain/Perte", "Gain/Perte (%)", "Momentum (%)", "Z-Score", "Action"]
+    positions = valorisation.positions[[c for c in colonnes if c in valorisation.positions.columns]]
+    contenu = {
+        "date": valorisation.date_valorisation.isoformat(),
+        "devise": valorisation.devise,
+        "totaux": dict(zip(["acquisition", "actuel", "h52", "lt"], valorisation.totaux())),
+        "alertes": [{"niveau": a.niveau, "message": a.message} for a in valorisation.alertes],
+        "positions": json.loads(positions.to_json(orient="records", force_ascii=False)),
+    }
+    with open(chemin, "w", encoding="utf-8") as f:
+        json.dump(contenu, f, ensure_ascii=False, indent=2)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Valorise un portefeuille et enregistre le snapshot quotidien (sans Streamlit).",
+        epilog="Exemple cron : 30 18 * * 1-5  cd /chemin/vers/app && python cli.py portefeuille.xlsx >> cli.log 2>&1",
+    )
+    parser.add_argument("fichiers", nargs="*", help="Portefeuilles Excel (.xlsx, .xls) ou CSV (plusieurs : vue consolidée)")
+    parser.add_argument("--url", action="append", default=[], help="URL Google Sheets publiée au format CSV (répétable)")
+    parser.add_argument("--devise", default="EUR", help="Devise cible (défaut : EUR)")
+    parser.add_argument("--date", type=date.fromisoformat, default=None, help="Date du snapshot, AAAA-MM-JJ (défaut : aujourd'hui)")
+    parser.add_argument("--base", default=None, help="URL SQLAlchemy de la base (défaut : storage.DATABASE_URL)")
+    parser.add_argument("--sans-ecriture", action="store_true", help="Valorise sans rien écrire dans la base")
+    parser.add_argument("--forcer", action="store_true", help="Réécrit le snapshot même s'il existe déjà pour la date")
+    parser.add_argument("--sans-momentum", action="store_true", help="Ne télécharge pas l'historique hebdomadaire (plus rapide)")
+    parser.add_argument("--rejeu", help="Rejoue un enregistrement JSON de données de marché (aucun accès réseau)")
+    parser.add_argument("--enregistrer-rejeu", help="Enregistre les données de marché téléchargées dans ce fichier JSON")
+    parser.add_argument("--json", dest="chemin_json", help="Écrit la valorisation détaillée dans ce fichier JSON")
+    args = parser.parse_args(argv)
+
+    if not args.fichiers and not args.url:
+        parser.error("indiquez au moins un fichier de portefeuille ou une --url")
+    if args.base:
+        import storage
+        storage.reinitialiser(args.base)
+
+    debut = time.perf_counter()
+    portefeuilles = {}
+    for source in args.fichiers + args.url:
+        nom = os.path.splitext(os.path.basename(source))[0] if source in args.fichiers else f"url{len(portefeuilles) + 1}"
+        try:
+            df = pd.read_csv(source) if source in args.url else charger_fichier(source)
+        except Exception as e:
+            print(f"ERREUR : chargement du portefeuille {source} impossible : {e}", file=sys.stderr)
+            return 1
+        if df is None or df.empty:
+            print(f"ERREUR : le portefeuille {source} est vide.", file=sys.stderr)
+            return 1
+        portefeuilles[nom] = df
+
+    # L'union des tickers est chargée une seule fois, quel que soit le nombre de portefeuilles
+    devise = args.devise.strip().upper()
+    tickers = core.tickers_portefeuilles(portefeuilles)
+    if args.rejeu:
+        fournisseur = FournisseurRejeu.depuis_fichier(args.rejeu)
+    elif args.sans_ecriture:
+        fournisseur = FournisseurYahoo()
+    else:
+        # Nom court et pence lus dans le registre des instruments de la base (rafraîchi chaque semaine)
+        from instruments import obtenir_instrument
+        fournisseur = FournisseurYahoo(instruments=obtenir_instrument)
+    instantane = core.charger_instantane(fournisseur, tickers, devise, args.sans_momentum)
+    if args.enregistrer_rejeu:
+        FournisseurRejeu.enregistrer(args.enregistrer_rejeu, fournisseur, tickers, devise)
+    duree_marche = time.perf_counter() - debut
+
+    resultat = core.valoriser_portefeuilles(portefeuilles, devise, instantane, date_valorisation=args.date)
+    # Un seul portefeuille : il est enregistré tel quel ; plusieurs : la vue consolidée du foyer
+    valorisation = next(iter(resultat.portefeuilles.values())) if len(portefeuilles) == 1 else resultat.consolidee
+    if len(portefeuilles) == 1:
+        valorisation.alertes[:0] = instantane.alertes
+    cotations, fx_rates = instantane.cotations, instantane.fx_rates
+
+    for alerte in valorisation.alertes:
+        print(f"{'ERREUR' if alerte.niveau == ERREUR else 'ATTENTION'} : {alerte.message}", file=sys.stderr)
+    sans_cours = [c.ticker for c in cotations.values() if pd.isna(c.cours)]
+    if sans_cours:
+        print(f"ATTENTION : pas de cours pour {', '.join(sans_cours)}", file=sys.stderr)
+
+    print(f"Valorisation du {valorisation.date_valorisation:%Y-%m-%d} ({len(portefeuilles)} portefeuille(s), "
+          f"{len(valorisation.positions)} lignes, {len(tickers)} tickers, données de marché en {duree_marche:.1f} s)")
+    if len(portefeuilles) > 1:
+        print(resultat.totaux_par_portefeuille().to_string(index=False, float_format=lambda v: f"{v:,.2f}"))
+    else:
+        for libelle, valeur in zip(["Acquisition", "Actuelle", "Haut 52 semaines", "Objectif LT"], valorisation.totaux()):
+            print(f"  {libelle:<18}{valeur:>18,.2f} {devise}")
+
+    if args.chemin_json:
+        exporter_json(valorisation, args.chemin_json)
+        print(f"Valorisation écrite dans {args.chemin_json}")
+
+    if tickers and len(sans_cours) == len(tickers):
+        # Aucune donnée de marché (réseau indisponible ?) : ne pas écrire des totaux à zéro dans l'historique
+        print("ERREUR : aucun cours disponible, rien n'est enregistré.", file=sys.stderr)
+        return 2
+
+    if not args.sans_ecriture:
+        enregistrer(valorisation, args.forcer)
+
+    return 2 if sans_cours or core.devises_sans_taux(valorisation.positions["Devise"], devise, fx_rates) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
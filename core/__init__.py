@@ -0,0 +1,28 @@
+# core/__init__.py
+"""
+Noyau de valorisation du portefeuille, indépendant de Streamlit.
+
+Les modules Streamlit (portfolio_display, data_fetcher, historical_performance_calculator)
+sont des vues sur ce noyau ; cli.py l'utilise pour valoriser un portefeuille hors navigateur.
+Les avertissements sont retournés sous forme d'Alerte au lieu d'être affichés.
+"""
+
+from core.modeles import (Alerte, AVERTISSEMENT, ERREUR, Cotation, Momentum, Valorisation,
+                          InstantaneMarche, ValorisationConsolidee)
+from core.change import convertir, convertir_colonne, devises_sans_taux
+from core.momentum import calculer_momentum, indicateurs_momentum, signal_momentum
+from core.positions import colonne_ticker, est_canonique, positions_canoniques
+from core.valorisation import preparer_positions, valoriser_portefeuille
+from core.reconstruction import reconstruire_valeur_historique, valeur_portefeuille_jour
+from core.consolidation import (charger_instantane, consolider_positions, tickers_portefeuilles,
+                                valoriser_portefeuilles)
+
+__all__ = [
+    "Alerte", "AVERTISSEMENT", "ERREUR", "Cotation", "Momentum", "Valorisation",
+    "InstantaneMarche", "ValorisationConsolidee",
+    "convertir", "convertir_colonne", "devises_sans_taux",
+    "calculer_momentum", "indicateurs_momentum", "signal_momentum",
+    "colonne_ticker", "est_canonique", "positions_canoniques", "preparer_positions", "valoriser_portefeuille",
+    "reconstruire_valeur_historique", "valeur_portefeuille_jour",
+    "charger_instantane", "consolider_positions", "tickers_portefeuilles", "valoriser_portefeuilles",
+]
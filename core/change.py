@@ -0,0 +1,103 @@
+# core/change.py
+"""Conversion de devises à partir d'un dictionnaire de taux (ou d'un taux scalaire)."""
+
+import numpy as np
+import pandas as pd
+
+from core.modeles import Alerte
+
+
+def convertir(val, source_devise, devise_cible, fx_rates_or_scalar, fx_adjustment_factor=1.0, alertes=None):
+    """
+    Convertit une valeur d'une devise source vers la devise cible en utilisant les taux de change fournis.
+    Peut accepter un dictionnaire de taux de change (clé: devise source, valeur: taux)
+    ou un taux scalaire direct.
+    Applique également un facteur d'ajustement supplémentaire au taux de change.
+    Retourne la valeur convertie et le taux utilisé (après ajustement).
+    Les avertissements sont ajoutés à 'alertes' (liste d'Alerte) si elle est fournie.
+    """
+    if pd.isnull(val):
+        return np.nan, np.nan  # Retourne NaN pour la valeur et le taux si la valeur est NaN
+
+    source_devise = str(source_devise).strip().upper()  # Nettoyer et normaliser
+    devise_cible = str(devise_cible).strip().upper()
+
+    if source_devise == devise_cible:
+        return val, 1.0  # Si c'est la même devise, pas de conversion, taux = 1.0
+
+    taux_scalar = np.nan
+    if isinstance(fx_rates_or_scalar, dict):
+        # Si c'est un dictionnaire, on cherche le taux par la devise source
+        raw_taux = fx_rates_or_scalar.get(source_devise)
+        try:
+            taux_scalar = float(raw_taux)
+        except (TypeError, ValueError):
+            taux_scalar = np.nan
+    elif isinstance(fx_rates_or_scalar, (float, int, np.floating, np.integer)):
+        # Si c'est un scalaire, on l'utilise directement
+        taux_scalar = float(fx_rates_or_scalar)
+    else:
+        _alerter(alertes, f"Type de taux de change inattendu: {type(fx_rates_or_scalar)}. Utilisation de 1.0.")
+        taux_scalar = 1.0  # Valeur par défaut si le type est inattendu
+
+    if pd.isna(taux_scalar) or taux_scalar == 0:
+        _alerter(alertes, f"Pas de conversion pour {source_devise} vers {devise_cible}: taux manquant ou invalide ({taux_scalar}).")
+        return val, np.nan  # Retourne la valeur originale et un taux NaN
+
+    # Appliquer le facteur d'ajustement au taux de change
+    if pd.notnull(fx_adjustment_factor) and fx_adjustment_factor != 0:
+        taux_scalar /= fx_adjustment_factor
+
+    return val * taux_scalar, taux_scalar  # Retourne la valeur convertie ET le taux utilisé
+
+
+def devises_sans_taux(devises, devise_cible, fx_rates):
+    """Devises utilisées (normalisées en majuscules) pour lesquelles aucun taux n'est disponible."""
+    devise_cible = str(devise_cible).strip().upper()
+    utilisees = pd.Series(devises).dropna().astype(str).str.strip().str.upper().unique().tolist()
+    return [d for d in utilisees if d != devise_cible and (fx_rates or {}).get(d) is None]
+
+
+def _alerter(alertes, message):
+    if alertes is not None:
+        alertes.append(Alerte(message))
+
+
+def convertir_colonne(valeurs, devises, devise_cible, fx_rates, facteurs=1.0, alertes=None):
+    """
+    Version vectorisée de convertir pour une colonne de valeurs : même règle ligne à ligne,
+    sans apply. Retourne (valeurs converties, taux utilisés) sous forme de Series.
+    Une seule alerte est ajoutée par devise sans taux.
+    """
+    valeurs = pd.to_numeric(pd.Series(valeurs), errors="coerce")
+    index = valeurs.index
+    if not isinstance(fx_rates, dict):
+        paires = [convertir(v, d, devise_cible, fx_rates, f, alertes)
+                  for v, d, f in zip(valeurs, pd.Series(devises, index=index), pd.Series(facteurs, index=index))]
+        return (pd.Series([p[0] for p in paires], index=index, dtype="float64"),
+                pd.Series([p[1] for p in paires], index=index, dtype="float64"))
+
+    devises = pd.Series(devises, index=index).astype(str).str.strip().str.upper()
+    facteurs = pd.to_numeric(pd.Series(facteurs, index=index), errors="coerce")
+    devise_cible = str(devise_cible).strip().upper()
+
+    taux_par_devise = {}
+    for devise in devises.unique():
+        try:
+            taux_par_devise[devise] = float(fx_rates.get(devise))
+        except (TypeError, ValueError):
+            taux_par_devise[devise] = np.nan
+    taux = devises.map(taux_par_devise).astype("float64")
+    meme_devise = devises == devise_cible
+    invalide = ~meme_devise & (taux.isna() | (taux == 0))
+
+    ajustable = facteurs.notna() & (facteurs != 0)
+    taux = taux.where(~ajustable, taux / facteurs)
+    taux = taux.where(~meme_devise, 1.0).where(~invalide, np.nan)
+    converties = valeurs.where(invalide | meme_devise, valeurs * taux)
+    taux = taux.where(valeurs.notna(), np.nan)
+
+    for devise in devises[invalide & valeurs.notna()].unique():
+        _alerter(alertes, f"Pas de conversion pour {devise} vers {devise_cible}: taux manquant ou invalide "
+                          f"({taux_par_devise.get(devise)}).")
+    return converties, taux
@@ -0,0 +1,78 @@
+# core/consolidation.py
+"""
+Valorisation de plusieurs portefeuilles nommés et vue consolidée (foyer).
+
+L'union des tickers est chargée une seule fois auprès du fournisseur, puis chaque portefeuille
+est valorisé sur ce même instantané de cotations et de taux : le nombre d'appels réseau dépend
+du nombre de tickers distincts, pas du nombre de portefeuilles.
+"""
+
+import pandas as pd
+
+from core.modeles import InstantaneMarche, ValorisationConsolidee
+from core.positions import colonne_ticker, positions_canoniques
+from core.valorisation import valoriser_portefeuille
+
+COLONNE_PORTEFEUILLE = "Portefeuille"
+
+
+def tickers_portefeuilles(portefeuilles):
+    """Union triée des tickers de plusieurs portefeuilles (dict nom -> DataFrame)."""
+    tickers = set()
+    for df in portefeuilles.values():
+        col = colonne_ticker(df)
+        if col:
+            tickers.update(df[col].dropna().astype(str))
+    return sorted(tickers)
+
+
+def charger_instantane(fournisseur, tickers, devise_cible, sans_momentum=False):
+    """Charge en un passage les taux, cotations et momentums d'une liste de tickers."""
+    fx_rates = fournisseur.taux_change(devise_cible)
+    cotations = fournisseur.cotations(tickers)
+    momentums = {} if sans_momentum else fournisseur.momentums(tickers)
+    return InstantaneMarche(devise_cible, fx_rates, cotations, momentums, list(getattr(fournisseur, "alertes", [])))
+
+
+def consolider_positions(portefeuilles):
+    """
+    Concatène les portefeuilles en un seul DataFrame, avec une colonne 'Portefeuille'.
+    La colonne des tickers est harmonisée en 'Ticker' ; le résultat est une table canonique
+    (les catégories de chaque portefeuille sont réunies).
+    """
+    frames = []
+    for nom, df in portefeuilles.items():
+        col = colonne_ticker(df)
+        df = df.rename(columns={col: "Ticker"}) if col and col != "Ticker" else df
+        frames.append(df.assign(**{COLONNE_PORTEFEUILLE: nom}))
+    if not frames:
+        return pd.DataFrame()
+    return positions_canoniques(pd.concat(frames, ignore_index=True))
+
+
+def valoriser_portefeuilles(portefeuilles, devise_cible, instantane=None, fournisseur=None, date_valorisation=None):
+    """
+    Valorise chaque portefeuille et leur consolidation sur le même instantané de marché.
+
+    Args:
+        portefeuilles (dict): Nom -> DataFrame du portefeuille.
+        devise_cible (str): Devise des totaux.
+        instantane (InstantaneMarche, optional): Données de marché déjà chargées.
+        fournisseur (optional): Fournisseur (core.fournisseurs) utilisé si instantane est absent ;
+            l'union des tickers lui est demandée en une fois.
+    Returns:
+        ValorisationConsolidee
+    """
+    if instantane is None:
+        if fournisseur is None:
+            raise ValueError("Un instantané de marché ou un fournisseur est nécessaire.")
+        instantane = charger_instantane(fournisseur, tickers_portefeuilles(portefeuilles), devise_cible)
+
+    def valoriser(df):
+        return valoriser_portefeuille(df, devise_cible, instantane.fx_rates, instantane.cotations,
+                                      instantane.momentums, date_valorisation)
+
+    par_portefeuille = {nom: valoriser(df) for nom, df in portefeuilles.items()}
+    consolidee = valoriser(consolider_positions(portefeuilles))
+    consolidee.alertes[:0] = instantane.alertes
+    return ValorisationConsolidee(par_portefeuille, consolidee, instantane)
@@ -0,0 +1,189 @@
+# core/fournisseurs.py
+"""
+Fournisseurs de données de marché pour le noyau : cotations, momentum et taux de change.
+
+- FournisseurYahoo : téléchargements Yahoo Finance en parallèle (core.yahoo), gardés en
+  mémoire pendant 'ttl' secondes et partagés par tous les appelants du processus.
+- FournisseurRejeu : rejoue un enregistrement JSON (aucun accès réseau), pour les tests
+  de charge, les démonstrations et le travail hors ligne.
+
+Les deux exposent la même interface : taux_change(devise), cotations(tickers), momentums(tickers).
+FournisseurYahoo accepte un registre des instruments (fonction ticker -> Instrument, par exemple
+instruments.obtenir_instrument) : nom court et pence n'y sont alors plus redemandés à .info.
+"""
+
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+
+import numpy as np
+
+from core import metriques
+from core.modeles import Cotation, Momentum
+
+NB_THREADS = 8 # Téléchargements Yahoo parallèles
+TTL_COTATIONS = 600 # Secondes, comme fetch_yahoo_data / fetch_fx_rates
+TTL_MOMENTUM = 3600 # L'historique hebdomadaire varie peu dans la journée
+
+# Réponses Yahoo inutilisables, comptées en erreur dans les métriques (core.metriques)
+ERREURS_YAHOO = {
+    "cotation": lambda cotation: cotation.cours is None or np.isnan(cotation.cours),
+    "momentum": lambda momentum: momentum.signal in ("Manquant", "Erreur"),
+    "fx": lambda taux: any(v is None for v in taux.values()),
+}
+
+
+class FournisseurYahoo:
+    """
+    Cotations, momentum et taux Yahoo Finance avec cache mémoire partagé (thread-safe).
+    Les tickers absents du cache (ou expirés) sont téléchargés en parallèle, une seule fois
+    même si plusieurs threads les demandent en même temps.
+    """
+
+    def __init__(self, ttl_cotations=TTL_COTATIONS, ttl_momentum=TTL_MOMENTUM, nb_threads=NB_THREADS, instruments=None):
+        self.instruments = instruments # ticker -> Instrument ou None (registre des instruments)
+        self.ttl = {"cotation": ttl_cotations, "momentum": ttl_momentum, "fx": ttl_cotations}
+        self._cache = {} # (type, clé) -> (horodatage, valeur)
+        self._en_cours = {} # (type, clé) -> Future
+        self._verrou = threading.Lock()
+        self._executeur = ThreadPoolExecutor(max_workers=nb_threads, thread_name_prefix="fournisseur-yahoo")
+        self.alertes = [] # Alertes du dernier chargement des taux
+        self.nb_telechargements = 0
+
+    def _obtenir(self, type_donnee, cles, charger):
+        """Retourne {clé: valeur}, en ne téléchargeant que les clés absentes ou expirées."""
+        maintenant = time.monotonic()
+        nom_mesure = f"fournisseur.{type_donnee}"
+        resultats, futurs = {}, {}
+        with self._verrou:
+            for cle in cles:
+                entree = self._cache.get((type_donnee, cle))
+                if entree is not None and maintenant - entree[0] < self.ttl[type_donnee]:
+                    resultats[cle] = entree[1]
+                    metriques.REQUETES_CACHE.inc(fonction=nom_mesure, resultat="hit")
+                    continue
+                metriques.REQUETES_CACHE.inc(fonction=nom_mesure, resultat="miss")
+                if entree is not None:
+                    metriques.EVICTIONS_CACHE.inc(fonction=nom_mesure)
+                futur = self._en_cours.get((type_donnee, cle))
+                if futur is None:
+                    futur = self._executeur.submit(metriques.mesurer_appel_amont, nom_mesure, charger, cle,
+                                                   est_erreur=ERREURS_YAHOO[type_donnee])
+                    self._en_cours[(type_donnee, cle)] = futur
+                    self.nb_telechargements += 1
+                futurs[cle] = futur
+        for cle, futur in futurs.items():
+            try:
+                valeur = futur.result()
+            finally:
+                # Même en cas d'échec : l'appel suivant relance le téléchargement
+                with self._verrou:
+                    if self._en_cours.get((type_donnee, cle)) is futur:
+                        del self._en_cours[(type_donnee, cle)]
+            with self._verrou:
+                self._cache[(type_donnee, cle)] = (time.monotonic(), valeur)
+            resultats[cle] = valeur
+        return resultats
+
+    def taux_change(self, devise_cible):
+        from core.yahoo import charger_taux_change
+
+        def charger(devise):
+            alertes = []
+            taux = charger_taux_change(devise, alertes)
+            self.alertes = alertes
+            return taux
+        return self._obtenir("fx", [devise_cible], charger)[devise_cible]
+
+    def _instrument(self, ticker):
+        return self.instruments(ticker) if self.instruments is not None else None
+
+    def cotations(self, tickers):
+        from core.yahoo import charger_cotation
+        return self._obtenir("cotation", list(dict.fromkeys(tickers)),
+                             lambda ticker: charger_cotation(ticker, self._instrument(ticker)))
+
+    def momentums(self, tickers):
+        from core.yahoo import charger_momentum
+        return self._obtenir("momentum", list(dict.fromkeys(tickers)),
+                             lambda ticker: charger_momentum(ticker, self._instrument(ticker)))
+
+    def vider_cache(self):
+        with self._verrou:
+            self._cache.clear()
+
+
+class FournisseurRejeu:
+    """
+    Rejoue un enregistrement JSON : {"fx": {devise cible: {devise: taux}},
+    "cotations": {ticker: {...}}, "momentums": {ticker: {...}}}.
+    Un ticker absent de l'enregistrement est rendu sans cours (NaN), comme un échec Yahoo.
+    """
+
+    def __init__(self, donnees, latence=0.0):
+        self.donnees = donnees
+        self.latence = latence # Secondes ajoutées à chaque appel (simulation du réseau)
+        self.alertes = []
+        self._cotations = {t: Cotation(**c) for t, c in donnees.get("cotations", {}).items()}
+        self._momentums = {t: Momentum(**m) for t, m in donnees.get("momentums", {}).items()}
+
+    @classmethod
+    def depuis_fichier(cls, chemin, latence=0.0):
+        with open(chemin, "r", encoding="utf-8") as f:
+            return cls(json.load(f), latence)
+
+    @classmethod
+    def synthetique(cls, tickers, devises=("USD", "GBP", "CHF", "JPY"), graine=0, latence=0.0):
+        """Enregistrement aléatoire mais reproductible (benchmarks, démonstrations)."""
+        rng = np.random.default_rng(graine)
+        cotations, momentums = {}, {}
+        for ticker in tickers:
+            cours = float(rng.uniform(5, 500))
+            z = float(rng.normal(0, 1.2))
+            cotations[ticker] = asdict(Cotation(ticker=ticker, nom=f"Société {ticker}", cours=cours,
+                                                plus_haut_52s=cours * float(rng.uniform(1.0, 1.6)),
+                                                plus_bas_52s=cours * float(rng.uniform(0.5, 1.0)),
+                                                cloture_veille=cours * float(rng.uniform(0.97, 1.03))))
+            momentums[ticker] = asdict(Momentum(dernier_cours=cours, momentum_pct=float(rng.normal(0, 15)), z_score=z))
+        fx = {"EUR": {d: float(rng.uniform(0.005, 1.3)) for d in devises}}
+        fx["EUR"]["EUR"] = 1.0
+        return cls({"fx": fx, "cotations": cotations, "momentums": momentums}, latence)
+
+    @staticmethod
+    def enregistrer(chemin, fournisseur, tickers, devise_cible="EUR"):
+        """Enregistre les réponses d'un autre fournisseur (Yahoo) pour les rejouer ensuite."""
+        donnees = {
+            "fx": {devise_cible: fournisseur.taux_change(devise_cible)},
+            "cotations": {t: asdict(c) for t, c in fournisseur.cotations(tickers).items()},
+            "momentums": {t: asdict(m) for t, m in fournisseur.momentums(tickers).items()},
+        }
+        with open(chemin, "w", encoding="utf-8") as f:
+            json.dump(donnees, f, ensure_ascii=False, indent=1)
+        return donnees
+
+    def _attendre(self):
+        if self.latence:
+            time.sleep(self.latence)
+
+    def taux_change(self, devise_cible):
+        self._attendre()
+        taux = dict(self.donnees.get("fx", {}).get(devise_cible, {}))
+        taux[devise_cible] = 1.0
+        return taux
+
+    def cotations(self, tickers):
+        self._attendre()
+        return {t: self._cotations.get(t) or Cotation(ticker=t, nom=t) for t in dict.fromkeys(tickers)}
+
+    def momentums(self, tickers):
+        self._attendre()
+        from core.momentum import signal_momentum
+        resultats = {}
+        for t in dict.fromkeys(tickers):
+            m = self._momentums.get(t) or Momentum()
+            if not m.signal:
+                m.signal, m.action, m.justification = signal_momentum(m.z_score)
+            resultats[t] = m
+        return resultats
@@ -0,0 +1,189 @@
+# core/historique.py
+"""
+Magasin des cours quotidiens par ticker, et champs de cotation qui s'en déduisent.
+
+Les barres quotidiennes (Close, High, Low) d'un ticker sont téléchargées une fois, puis
+servies à tous les appelants du processus : historique de l'onglet Performance, cotations
+du tableau, momentum, API. Une entrée couvre la plus longue période demandée jusqu'à
+aujourd'hui ; à l'expiration (ttl), seules les dernières séances sont retéléchargées et ajoutées.
+
+Les clôtures hebdomadaires et mensuelles (momentum 39 semaines, vues longues) sont
+rééchantillonnées localement depuis les clôtures quotidiennes, et gardées en cache jusqu'à
+la prochaine mise à jour du ticker : un seul téléchargement par ticker au lieu de trois
+(barres 1 min / 1 h, quotidiennes et hebdomadaires).
+
+Plus haut / plus bas 52 semaines, dernière clôture, clôture de la veille et variation du
+jour sont calculés sur ces barres (fenêtres glissantes vectorisées) : la cotation n'interroge
+plus Yahoo que pour le cours en temps réel. Les prix restent en devise de cotation (pence non
+corrigés), comme ceux de Yahoo.
+"""
+
+import threading
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+TTL_HISTORIQUE = 3600 # Secondes avant d'ajouter les dernières séances, comme fetch_stock_history
+# Couverture minimale : 52 semaines des cotations et 5 ans du momentum, d'un seul téléchargement
+DUREE_MINIMALE = timedelta(days=5 * 365 + 31)
+RECOUVREMENT = timedelta(days=7) # Séances retéléchargées à chaque mise à jour (clôtures corrigées)
+FENETRE_52S = "365D"
+
+# Granularité -> fréquence pandas du rééchantillonnage (libellé : dernier jour de la période)
+FREQUENCES = {"semaine": "W-FRI", "mois": "ME"}
+
+
+def indicateurs_journaliers(barres):
+    """
+    Champs de cotation pour chaque séance, en une passe vectorisée : plus haut et plus bas
+    sur 52 semaines glissantes (High / Low, ou Close à défaut), clôture de la séance précédente
+    et variation du jour (absolue et en %).
+    """
+    cloture = barres["Close"]
+    haut = barres["High"].fillna(cloture) if "High" in barres.columns else cloture
+    bas = barres["Low"].fillna(cloture) if "Low" in barres.columns else cloture
+    veille = cloture.shift(1)
+    return pd.DataFrame({
+        "Close": cloture,
+        "Plus_Haut_52s": haut.rolling(FENETRE_52S, min_periods=1).max(),
+        "Plus_Bas_52s": bas.rolling(FENETRE_52S, min_periods=1).min(),
+        "Cloture_Veille": veille,
+        "Variation_Jour": cloture - veille,
+        "Variation_Jour_Pct": (cloture / veille - 1) * 100,
+    }, index=barres.index)
+
+
+def resume_cotation(barres):
+    """
+    Champs de cotation de la dernière séance : dict (derniere_cloture, cloture_veille,
+    plus_haut_52s, plus_bas_52s), NaN si l'historique est vide.
+    """
+    barres = barres.dropna(subset=["Close"]) if not barres.empty else barres
+    if barres.empty:
+        return {"derniere_cloture": np.nan, "cloture_veille": np.nan, "plus_haut_52s": np.nan, "plus_bas_52s": np.nan}
+    derniere = indicateurs_journaliers(barres.iloc[-400:]).iloc[-1] # Une fenêtre de 52 semaines suffit
+    return {
+        "derniere_cloture": float(derniere["Close"]),
+        "cloture_veille": float(derniere["Cloture_Veille"]),
+        "plus_haut_52s": float(derniere["Plus_Haut_52s"]),
+        "plus_bas_52s": float(derniere["Plus_Bas_52s"]),
+    }
+
+
+def reechantillonner(clotures, granularite):
+    """Dernière clôture de chaque semaine ou de chaque mois (périodes sans séance omises)."""
+    if granularite not in FREQUENCES:
+        raise ValueError(f"Granularité inconnue : {granularite} (attendu : jour, {', '.join(FREQUENCES)})")
+    return clotures.resample(FREQUENCES[granularite]).last().dropna()
+
+
+def _jour(valeur):
+    if valeur is None:
+        return None
+    return pd.Timestamp(valeur).normalize().date()
+
+
+class MagasinCours:
+    """
+    Barres quotidiennes par ticker, partagées par tout le processus (thread-safe).
+    Un même ticker n'est jamais téléchargé deux fois en parallèle.
+    """
+
+    def __init__(self, ttl=TTL_HISTORIQUE, telecharger=None):
+        self.ttl = ttl
+        self._telecharger = telecharger # (ticker, début, fin, alertes) -> DataFrame ; core.yahoo par défaut
+        self._entrees = {} # ticker -> (time.monotonic() de la mise à jour, premier jour couvert, barres)
+        self._reechantillons = {} # (ticker, granularité) -> clôtures rééchantillonnées de l'entrée courante
+        self._verrous = {} # ticker -> verrou de téléchargement
+        self._verrou = threading.Lock()
+        self.nb_telechargements = 0
+
+    def _charger(self, ticker, debut, alertes):
+        if self._telecharger is None:
+            from core.yahoo import charger_historique_journalier
+            self._telecharger = charger_historique_journalier
+        self.nb_telechargements += 1
+        return self._telecharger(ticker, debut, date.today() + timedelta(days=1), alertes)
+
+    def journalier(self, ticker, debut=None, fin=None, alertes=None):
+        """
+        Barres quotidiennes (Close, High, Low) d'un ticker de 'debut' à 'fin' inclus
+        (par défaut : depuis DUREE_MINIMALE). DataFrame vide si Yahoo n'a rien renvoyé.
+        """
+        alertes = alertes if alertes is not None else []
+        demande = _jour(debut)
+        couverture = min(demande or date.today(), date.today() - DUREE_MINIMALE)
+        with self._verrou:
+            verrou = self._verrous.setdefault(ticker, threading.Lock())
+        with verrou:
+            entree = self._entrees.get(ticker)
+            if entree is None or entree[1] > couverture:
+                barres = self._charger(ticker, couverture, alertes)
+                self._remplacer(ticker, couverture, barres)
+            elif time.monotonic() - entree[0] >= self.ttl:
+                barres = self._mettre_a_jour(ticker, entree[2], couverture, alertes)
+                self._remplacer(ticker, entree[1], barres)
+            else:
+                barres = entree[2]
+        if barres.empty:
+            return barres
+        return barres.loc[pd.Timestamp(demande or date.today() - DUREE_MINIMALE):
+                          pd.Timestamp(_jour(fin)) if fin is not None else None]
+
+    def _remplacer(self, ticker, premier, barres):
+        with self._verrou:
+            self._entrees[ticker] = (time.monotonic(), premier, barres)
+            for granularite in FREQUENCES:
+                self._reechantillons.pop((ticker, granularite), None)
+
+    def _mettre_a_jour(self, ticker, barres, couverture, alertes):
+        """Ajoute les dernières séances à l'historique connu (retéléchargement complet s'il est vide)."""
+        if barres.empty:
+            return self._charger(ticker, couverture, alertes)
+        depuis = barres.index[-1].date() - RECOUVREMENT
+        recentes = self._charger(ticker, depuis, alertes)
+        if recentes.empty:
+            return barres
+        return pd.concat([barres[barres.index < pd.Timestamp(depuis)], recentes])
+
+    def clotures(self, ticker, debut=None, fin=None, alertes=None, granularite="jour"):
+        """
+        Clôtures (Series nommée par le ticker) de 'debut' à 'fin' inclus, quotidiennes ou
+        rééchantillonnées par 'semaine' ou par 'mois' depuis les clôtures quotidiennes.
+        """
+        journalier = self.journalier(ticker, debut, fin, alertes)["Close"].rename(ticker)
+        if granularite == "jour" or journalier.empty:
+            return journalier
+        with self._verrou:
+            entree = self._entrees.get(ticker)
+            serie = self._reechantillons.get((ticker, granularite))
+        if entree is None or journalier.index[-1] < entree[2].index[-1]:
+            return reechantillonner(journalier, granularite) # Période close : la dernière barre s'arrête à 'fin'
+        if serie is None:
+            # Rééchantillonnage de tout l'historique connu, réutilisé pour toute période jusqu'à aujourd'hui
+            serie = reechantillonner(entree[2]["Close"].rename(ticker), granularite)
+            with self._verrou:
+                if self._entrees.get(ticker) is entree:
+                    self._reechantillons[(ticker, granularite)] = serie
+        return serie.loc[pd.tseries.frequencies.to_offset(FREQUENCES[granularite]).rollforward(journalier.index[0]):]
+
+    def cotation(self, ticker, alertes=None):
+        """Champs de cotation de la dernière séance (voir resume_cotation)."""
+        return resume_cotation(self.journalier(ticker, alertes=alertes))
+
+    def invalider(self, ticker=None):
+        """Oublie un ticker (ou tous) : il sera retéléchargé entièrement au prochain accès."""
+        with self._verrou:
+            if ticker is None:
+                self._entrees.clear()
+                self._reechantillons.clear()
+            else:
+                self._entrees.pop(ticker, None)
+                for granularite in FREQUENCES:
+                    self._reechantillons.pop((ticker, granularite), None)
+
+
+# Magasin partagé par le processus (fetchers Streamlit, fournisseur Yahoo de l'API et du CLI)
+MAGASIN = MagasinCours()
@@ -0,0 +1,301 @@
+# core/ingestion.py
+"""
+Lecture rapide des fichiers de positions (Excel, CSV) importés.
+
+- Projection : seules les colonnes utilisées par l'application (COLONNES_POSITIONS, comparées
+  sans casse ni espaces) sont lues ; les autres ne sont ni converties ni conservées.
+- Types explicites : aucune inférence de types. Les colonnes texte (Ticker, Devise,
+  catégories) sont lues en texte, et les nombres saisis à la française ('1 234,5') sont
+  convertis une seule fois par core.positions.
+- Excel (.xlsx) : lecture en flux du XML de la seule feuille demandée, ligne à ligne, sans
+  construire les cellules des colonnes écartées ; les autres feuilles d'un classeur ne sont
+  jamais analysées (openpyxl en mode read_only si la structure du classeur est inattendue).
+- CSV : lecture par blocs de TAILLE_BLOC lignes.
+- Cache par empreinte (SHA-256) du contenu du fichier : réimporter le même fichier, ou le relire
+  depuis la ligne de commande ou l'API, ne relance pas l'analyse.
+
+Chaque lecture indique son débit (lignes par seconde). Ce module n'importe pas Streamlit.
+"""
+
+import hashlib
+import io
+import os
+import threading
+import time
+import zipfile
+from collections import OrderedDict
+from dataclasses import dataclass
+from xml.etree import ElementTree
+
+import numpy as np
+import pandas as pd
+
+# Colonnes lues dans un fichier de positions (noms comparés en minuscules, sans espaces autour)
+COLONNES_TEXTE = {"ticker", "tickers", "devise", "categories", "catégories", "catégorie", "category"}
+COLONNES_NUMERIQUES = {"quantité", "acquisition", "lt", "objectif_lt", "h", "lot"}
+COLONNES_POSITIONS = COLONNES_TEXTE | COLONNES_NUMERIQUES
+
+EXTENSIONS_EXCEL = (".xlsx", ".xlsm")
+_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_NS_REL = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+TAILLE_BLOC = 50_000 # Lignes par bloc de lecture CSV
+TAILLE_CACHE = 16 # Fichiers lus conservés
+
+_verrou = threading.Lock()
+_cache = OrderedDict() # (empreinte, feuille, projection) -> Lecture
+
+
+@dataclass
+class Lecture:
+    """Résultat d'une lecture : DataFrame, volume et débit."""
+    df: pd.DataFrame
+    nom: str
+    empreinte: str
+    duree: float # Secondes, analyse seule (hors calcul d'empreinte)
+    feuille: str = None
+    depuis_cache: bool = False
+
+    @property
+    def nb_lignes(self):
+        return len(self.df)
+
+    @property
+    def lignes_par_seconde(self):
+        return self.nb_lignes / self.duree if self.duree > 0 else float("inf")
+
+    def resume(self):
+        origine = f"feuille « {self.feuille} », " if self.feuille else ""
+        lignes = f"{self.nb_lignes:,}".replace(",", " ")
+        debit = f"{self.lignes_par_seconde:,.0f}".replace(",", " ")
+        texte = f"{origine}{lignes} lignes, {len(self.df.columns)} colonnes lues en {self.duree:.2f} s ({debit} lignes/s)"
+        return texte + (", depuis le cache" if self.depuis_cache else "")
+
+
+def est_colonne_position(nom):
+    """True si la colonne fait partie de la projection des fichiers de positions."""
+    return str(nom).strip().lower() in COLONNES_POSITIONS
+
+
+def _contenu(source):
+    """(octets, nom) d'un chemin, d'un objet fichier (UploadedFile de Streamlit...) ou d'octets."""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            return f.read(), os.fspath(source)
+    if isinstance(source, (bytes, bytearray)):
+        return bytes(source), ""
+    nom = getattr(source, "name", "")
+    if hasattr(source, "getvalue"):
+        return source.getvalue(), nom
+    source.seek(0)
+    return source.read(), nom
+
+
+def _projection(colonnes):
+    """Prédicat de sélection des colonnes : liste de noms, prédicat, ou None (toutes)."""
+    if colonnes is None:
+        return lambda nom: True
+    if callable(colonnes):
+        return colonnes
+    retenues = {str(c).strip().lower() for c in colonnes}
+    return lambda nom: str(nom).strip().lower() in retenues
+
+
+def _typer(df):
+    """Types explicites : texte pour les colonnes texte connues, float64 pour les colonnes numériques déjà numériques."""
+    for col in df.columns:
+        nom = str(col).strip().lower()
+        serie = df[col]
+        if nom in COLONNES_TEXTE:
+            df[col] = serie.astype(str).where(serie.notna())
+        elif nom in COLONNES_NUMERIQUES and serie.dtype == object:
+            valeurs = serie.to_numpy()
+            # Cellules Excel numériques : conversion directe ; texte à la française laissé à core.positions
+            if all(v is None or isinstance(v, (int, float)) and not isinstance(v, bool) for v in valeurs):
+                df[col] = np.array([np.nan if v is None else v for v in valeurs], dtype="float64")
+    return df
+
+
+def _lire_csv(contenu, garder, taille_bloc):
+    blocs = pd.read_csv(io.BytesIO(contenu), dtype=str, usecols=garder, chunksize=taille_bloc,
+                        encoding="utf-8-sig")
+    frames = list(blocs)
+    return pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+
+
+def _indice_colonne(reference):
+    """Indice (0 pour A) de la colonne d'une référence de cellule ('AB12' -> 27)."""
+    indice = 0
+    for caractere in reference:
+        if caractere.isdigit():
+            break
+        indice = indice * 26 + ord(caractere.upper()) - 64
+    return indice - 1
+
+
+def _chaines_partagees(archive):
+    try:
+        flux = archive.open("xl/sharedStrings.xml")
+    except KeyError:
+        return []
+    chaines = []
+    for _, element in ElementTree.iterparse(flux):
+        if element.tag == _NS + "si":
+            # Texte simple (<t>) ou texte enrichi (<r><t>) ; les indications phonétiques sont ignorées
+            textes = element.findall(_NS + "t") or element.findall(f"{_NS}r/{_NS}t")
+            chaines.append("".join(t.text or "" for t in textes))
+            element.clear()
+    return chaines
+
+
+def _chemin_feuille(archive, feuille):
+    """(chemin XML, nom) de la feuille demandée (nom ou indice, la première par défaut)."""
+    classeur = ElementTree.fromstring(archive.read("xl/workbook.xml"))
+    feuilles = classeur.findall(f"{_NS}sheets/{_NS}sheet")
+    if feuille is None or isinstance(feuille, int):
+        choisie = feuilles[feuille or 0]
+    else:
+        choisie = next(f for f in feuilles if f.get("name") == feuille)
+    relations = ElementTree.fromstring(archive.read("xl/_rels/workbook.xml.rels"))
+    cible = next(r.get("Target") for r in relations if r.get("Id") == choisie.get(_NS_REL + "id"))
+    return (cible.lstrip("/") if cible.startswith("/") else "xl/" + cible), choisie.get("name")
+
+
+def _valeur_cellule(cellule, chaines):
+    """Valeur d'une cellule <c> ; None pour une cellule vide, un texte vide ou une erreur (#N/A...)."""
+    type_cellule = cellule.get("t")
+    if type_cellule == "inlineStr":
+        return "".join(t.text or "" for t in cellule.iter(_NS + "t")) or None
+    valeur = cellule.findtext(_NS + "v")
+    if valeur is None or type_cellule == "e":
+        return None
+    if type_cellule == "s":
+        return chaines[int(valeur)] or None
+    if type_cellule == "str":
+        return valeur or None
+    if type_cellule == "b":
+        return valeur == "1"
+    return int(valeur) if valeur.lstrip("-").isdigit() else float(valeur)
+
+
+def _lire_xlsx(contenu, garder, feuille):
+    """
+    Lecture en flux du XML de la feuille (zipfile + iterparse) : seules les cellules des colonnes
+    retenues sont converties, et chaque ligne est libérée dès qu'elle est lue. Les dates ne sont
+    pas reconnues (aucune colonne de positions n'en contient) : voir _lire_xlsx_openpyxl.
+    """
+    with zipfile.ZipFile(io.BytesIO(contenu)) as archive:
+        chaines = _chaines_partagees(archive)
+        chemin, nom_feuille = _chemin_feuille(archive, feuille)
+        noms, indices, colonnes = None, [], []
+        for _, element in ElementTree.iterparse(archive.open(chemin)):
+            if element.tag != _NS + "row":
+                continue
+            cellules, position = {}, 0
+            for cellule in element.iter(_NS + "c"):
+                reference = cellule.get("r")
+                position = _indice_colonne(reference) if reference else position
+                cellules[position] = cellule
+                position += 1
+            if noms is None:
+                largeur = max(cellules, default=-1) + 1
+                entete = [_valeur_cellule(cellules[i], chaines) if i in cellules else None for i in range(largeur)]
+                noms = [f"Unnamed: {i}" if nom is None else str(nom) for i, nom in enumerate(entete)]
+                indices = [i for i, nom in enumerate(noms) if garder(nom)]
+                colonnes = [[] for _ in indices]
+            else:
+                valeurs = [_valeur_cellule(cellules[i], chaines) if i in cellules else None for i in indices]
+                if any(v is not None for v in valeurs): # Lignes vides (fin de feuille formatée) ignorées
+                    for colonne, valeur in zip(colonnes, valeurs):
+                        colonne.append(valeur)
+            element.clear()
+    if noms is None:
+        return pd.DataFrame(), nom_feuille
+    return pd.DataFrame({noms[i]: pd.Series(colonne, dtype=object) for i, colonne in zip(indices, colonnes)}), nom_feuille
+
+
+def _lire_xlsx_openpyxl(contenu, garder, feuille):
+    """Lecture openpyxl en mode read_only, si le classeur n'a pas la structure attendue par _lire_xlsx."""
+    from openpyxl import load_workbook
+
+    classeur = load_workbook(io.BytesIO(contenu), read_only=True, data_only=True)
+    try:
+        if feuille is None or isinstance(feuille, int):
+            onglet = classeur.worksheets[feuille or 0]
+        else:
+            onglet = classeur[feuille]
+        lignes = onglet.iter_rows(values_only=True)
+        entete = next(lignes, None)
+        if entete is None:
+            return pd.DataFrame(), onglet.title
+        noms = [f"Unnamed: {i}" if nom is None else str(nom) for i, nom in enumerate(entete)]
+        indices = [i for i, nom in enumerate(noms) if garder(nom)]
+        colonnes = [[] for _ in indices]
+        for ligne in lignes:
+            valeurs = [ligne[i] if i < len(ligne) else None for i in indices]
+            if all(v is None for v in valeurs):
+                continue # Lignes vides (fin de feuille formatée)
+            for colonne, valeur in zip(colonnes, valeurs):
+                colonne.append(valeur)
+        df = pd.DataFrame({noms[i]: pd.Series(colonne, dtype=object) for i, colonne in zip(indices, colonnes)})
+        return df, onglet.title
+    finally:
+        classeur.close()
+
+
+def lire_fichier(source, nom=None, colonnes=None, feuille=None, taille_bloc=TAILLE_BLOC):
+    """
+    Lit un fichier Excel ou CSV, avec mise en cache par empreinte du contenu.
+
+    Args:
+        source: Chemin, objet fichier (UploadedFile de Streamlit, BytesIO) ou octets.
+        nom (str, optional): Nom du fichier (extension) si la source n'en porte pas.
+        colonnes (optional): Colonnes lues : liste de noms, prédicat sur le nom, ou None pour toutes
+            (Excel : lecture openpyxl, qui reconnaît les dates, au lieu de la lecture en flux).
+        feuille (optional): Feuille Excel (nom ou indice, la première par défaut).
+    Returns:
+        Lecture: DataFrame (partagé avec le cache : le copier avant de le modifier) et débit.
+    Raises:
+        ValueError: extension non prise en charge.
+    """
+    contenu, nom_source = _contenu(source)
+    nom = nom or nom_source
+    extension = os.path.splitext(nom)[1].lower()
+    if extension not in (".csv", ".xls") + EXTENSIONS_EXCEL:
+        raise ValueError(f"Format de fichier non supporté : {extension or nom} (.csv, .xlsx ou .xls attendu).")
+
+    empreinte = hashlib.sha256(contenu).hexdigest()
+    cle = (empreinte, feuille, colonnes if colonnes is None or callable(colonnes) else tuple(colonnes))
+    with _verrou:
+        lecture = _cache.get(cle)
+        if lecture is not None:
+            _cache.move_to_end(cle)
+            return Lecture(lecture.df, nom, empreinte, lecture.duree, lecture.feuille, depuis_cache=True)
+
+    garder = _projection(colonnes)
+    debut = time.perf_counter()
+    nom_feuille = None
+    if extension == ".csv":
+        df = _lire_csv(contenu, garder, taille_bloc)
+    elif extension in EXTENSIONS_EXCEL and colonnes is not None:
+        try:
+            df, nom_feuille = _lire_xlsx(contenu, garder, feuille)
+        except (KeyError, IndexError, StopIteration, ValueError, ElementTree.ParseError):
+            df, nom_feuille = _lire_xlsx_openpyxl(contenu, garder, feuille)
+    elif extension in EXTENSIONS_EXCEL:
+        df, nom_feuille = _lire_xlsx_openpyxl(contenu, garder, feuille) # Toutes les colonnes : dates comprises
+    else:
+        # Ancien format .xls : pas de lecture en flux, lecteur par défaut de pandas
+        df = pd.read_excel(io.BytesIO(contenu), sheet_name=feuille or 0, usecols=garder, dtype=object)
+    df = _typer(df)
+    lecture = Lecture(df, nom, empreinte, time.perf_counter() - debut, nom_feuille)
+
+    with _verrou:
+        _cache[cle] = lecture
+        while len(_cache) > TAILLE_CACHE:
+            _cache.popitem(last=False)
+    return lecture
+
+
+def lire_portefeuille(source, nom=None, feuille=None):
+    """Lit un fichier de positions (projection COLONNES_POSITIONS)."""
+    return lire_fichier(source, nom=nom, colonnes=est_colonne_position, feuille=feuille)
@@ -0,0 +1,253 @@
+# core/metriques.py
+"""
+Métriques de production (compteurs et histogrammes) au format texte Prometheus.
+
+Bibliothèque standard uniquement. Les métriques sont déclarées une fois (catalogue en bas de
+module) dans le registre du processus ; une mesure coûte une recherche dans un dictionnaire
+et une addition sous verrou, de l'ordre de la microseconde : elle reste active en permanence.
+Le registre est exposé par demarrer_serveur (route /metrics sur un port local) ou par la
+route /metrics d'un autre serveur (api.py) avec exposition_texte().
+"""
+
+import bisect
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+HOTE = "127.0.0.1" # Exposition locale uniquement
+PORT = 8503 # À côté de Streamlit (8501) et du service de valorisation (8502)
+TYPE_CONTENU = "text/plain; version=0.0.4; charset=utf-8"
+
+BORNES_LATENCE = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0) # Secondes
+
+
+def _echapper(valeur):
+    return str(valeur).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _etiquettes_texte(noms, valeurs, supplementaires=()):
+    paires = list(zip(noms, valeurs)) + list(supplementaires)
+    if not paires:
+        return ""
+    return "{" + ",".join(f'{nom}="{_echapper(valeur)}"' for nom, valeur in paires) + "}"
+
+
+def _nombre(valeur):
+    if valeur == float("inf"):
+        return "+Inf"
+    return repr(float(valeur)) if not float(valeur).is_integer() else str(int(valeur))
+
+
+class Registre:
+    """Ensemble des métriques d'un processus, dans l'ordre de déclaration."""
+
+    def __init__(self):
+        self.metriques = {}
+        self._verrou = threading.Lock()
+
+    def enregistrer(self, metrique):
+        with self._verrou:
+            if metrique.nom in self.metriques:
+                raise ValueError(f"Métrique déjà déclarée : {metrique.nom}")
+            self.metriques[metrique.nom] = metrique
+        return metrique
+
+    def exposition_texte(self):
+        """Toutes les métriques au format d'exposition texte de Prometheus (0.0.4)."""
+        lignes = []
+        for metrique in list(self.metriques.values()):
+            lignes.append(f"# HELP {metrique.nom} {metrique.aide}")
+            lignes.append(f"# TYPE {metrique.nom} {metrique.type_prometheus}")
+            lignes.extend(metrique.lignes())
+        return "\n".join(lignes) + "\n"
+
+
+REGISTRE = Registre()
+
+
+class _Metrique:
+    type_prometheus = None
+
+    def __init__(self, nom, aide, etiquettes=(), registre=REGISTRE):
+        self.nom = nom
+        self.aide = aide
+        self.etiquettes = tuple(etiquettes)
+        self._valeurs = {} # tuple des valeurs d'étiquettes -> mesure
+        self._verrou = threading.Lock()
+        if registre is not None:
+            registre.enregistrer(self)
+
+    def _cle(self, etiquettes):
+        try:
+            return tuple(str(etiquettes[nom]) for nom in self.etiquettes)
+        except KeyError as e:
+            raise ValueError(f"Étiquette manquante pour {self.nom} : {e}") from None
+
+    def reinitialiser(self):
+        with self._verrou:
+            self._valeurs.clear()
+
+
+class Compteur(_Metrique):
+    """Valeur croissante par combinaison d'étiquettes (appels, erreurs, succès de cache...)."""
+
+    type_prometheus = "counter"
+
+    def inc(self, valeur=1.0, **etiquettes):
+        cle = self._cle(etiquettes)
+        with self._verrou:
+            self._valeurs[cle] = self._valeurs.get(cle, 0.0) + valeur
+
+    def valeur(self, **etiquettes):
+        return self._valeurs.get(self._cle(etiquettes), 0.0)
+
+    def lignes(self):
+        with self._verrou:
+            valeurs = sorted(self._valeurs.items())
+        return [f"{self.nom}{_etiquettes_texte(self.etiquettes, cle)} {_nombre(v)}" for cle, v in valeurs]
+
+
+class Histogramme(_Metrique):
+    """Distribution d'une durée (ou d'une taille) par combinaison d'étiquettes, en seaux cumulés."""
+
+    type_prometheus = "histogram"
+
+    def __init__(self, nom, aide, etiquettes=(), bornes=BORNES_LATENCE, registre=REGISTRE):
+        self.bornes = tuple(sorted(bornes))
+        super().__init__(nom, aide, etiquettes, registre)
+
+    def observer(self, valeur, **etiquettes):
+        cle = self._cle(etiquettes)
+        indice = bisect.bisect_left(self.bornes, valeur) # Premier seau dont la borne est >= valeur
+        with self._verrou:
+            mesure = self._valeurs.get(cle)
+            if mesure is None:
+                mesure = self._valeurs[cle] = [[0] * (len(self.bornes) + 1), 0.0]
+            mesure[0][indice] += 1
+            mesure[1] += valeur
+
+    @contextmanager
+    def chronometrer(self, **etiquettes):
+        """Observe la durée du bloc (en secondes), même s'il lève une exception."""
+        debut = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observer(time.perf_counter() - debut, **etiquettes)
+
+    def chronometrer_fonction(self, **etiquettes):
+        """Décorateur : observe la durée de chaque appel de la fonction."""
+        def decorer(fonction):
+            @functools.wraps(fonction)
+            def appel(*args, **kwargs):
+                with self.chronometrer(**etiquettes):
+                    return fonction(*args, **kwargs)
+            return appel
+        return decorer
+
+    def nombre(self, **etiquettes):
+        mesure = self._valeurs.get(self._cle(etiquettes))
+        return sum(mesure[0]) if mesure else 0
+
+    def lignes(self):
+        with self._verrou:
+            valeurs = sorted((cle, (list(seaux), somme)) for cle, (seaux, somme) in self._valeurs.items())
+        lignes = []
+        for cle, (seaux, somme) in valeurs:
+            cumul = 0
+            for borne, nombre in zip(self.bornes + (float("inf"),), seaux):
+                cumul += nombre
+                lignes.append(f"{self.nom}_bucket{_etiquettes_texte(self.etiquettes, cle, [('le', _nombre(borne))])} {cumul}")
+            lignes.append(f"{self.nom}_sum{_etiquettes_texte(self.etiquettes, cle)} {_nombre(somme)}")
+            lignes.append(f"{self.nom}_count{_etiquettes_texte(self.etiquettes, cle)} {cumul}")
+        return lignes
+
+
+# --- Catalogue des métriques de l'application ---
+
+APPELS_AMONT = Compteur(
+    "beam_appels_amont_total", "Appels réels aux sources externes (Yahoo Finance), par fonction et résultat (ok, erreur).",
+    ("fonction", "resultat"))
+LATENCE_AMONT = Histogramme(
+    "beam_latence_amont_secondes", "Durée des appels réels aux sources externes, par fonction.", ("fonction",))
+REQUETES_CACHE = Compteur(
+    "beam_cache_requetes_total", "Lectures des caches de données de marché, par fonction et résultat (hit, miss).",
+    ("fonction", "resultat"))
+EVICTIONS_CACHE = Compteur(
+    "beam_cache_evictions_total", "Entrées déjà chargées puis sorties du cache (expiration ou vidage), par fonction.",
+    ("fonction",))
+DUREE_RERUN = Histogramme(
+    "beam_rerun_duree_secondes", "Durée des reruns Streamlit, par onglet affiché.", ("onglet",))
+DUREE_ECRITURE_JOURNAL = Histogramme(
+    "beam_journal_ecriture_secondes", "Durée des écritures du journal et des totaux quotidiens, par opération.",
+    ("operation",))
+ERREURS_ECRITURE_JOURNAL = Compteur(
+    "beam_journal_ecriture_erreurs_total", "Écritures du journal et des totaux quotidiens en échec, par opération.",
+    ("operation",))
+
+
+def mesurer_appel_amont(nom, fonction, *args, est_erreur=None, **kwargs):
+    """
+    Exécute un appel à une source externe en comptant sa latence et son résultat.
+    est_erreur(résultat) signale les échecs que la fonction absorbe (cours NaN, série vide...).
+    """
+    debut = time.perf_counter()
+    resultat = "erreur"
+    try:
+        valeur = fonction(*args, **kwargs)
+        if est_erreur is None or not est_erreur(valeur):
+            resultat = "ok"
+        return valeur
+    finally:
+        LATENCE_AMONT.observer(time.perf_counter() - debut, fonction=nom)
+        APPELS_AMONT.inc(fonction=nom, resultat=resultat)
+
+
+def exposition_texte(registre=REGISTRE):
+    return registre.exposition_texte()
+
+
+# --- Exposition HTTP ---
+
+class _GestionnaireMetriques(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0].rstrip("/") != "/metrics":
+            self.send_error(404)
+            return
+        corps = self.server.registre.exposition_texte().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", TYPE_CONTENU)
+        self.send_header("Content-Length", str(len(corps)))
+        self.end_headers()
+        self.wfile.write(corps)
+
+
+_serveur = None
+_port_occupe = False
+_verrou_serveur = threading.Lock()
+
+
+def demarrer_serveur(port=PORT, hote=HOTE, registre=REGISTRE):
+    """
+    Démarre (une seule fois par processus) le serveur d'exposition /metrics dans un thread.
+    Retourne le serveur, ou None si le port est déjà occupé (autre processus de l'application).
+    """
+    global _serveur, _port_occupe
+    with _verrou_serveur:
+        if _serveur is None and not _port_occupe:
+            try:
+                serveur = ThreadingHTTPServer((hote, port), _GestionnaireMetriques)
+            except OSError as e:
+                _port_occupe = True # Pas de nouvelle tentative à chaque rerun
+                print(f"WARNING: Exposition des métriques impossible sur {hote}:{port} : {e}")
+                return None
+            serveur.daemon_threads = True
+            serveur.registre = registre
+            threading.Thread(target=serveur.serve_forever, name="metriques", daemon=True).start()
+            _serveur = serveur
+        return _serveur
@@ -0,0 +1,178 @@
+# core/modeles.py
+"""
+Types d'entrée et de sortie du noyau de valorisation.
+
+Les fonctions du noyau ne dépendent ni de Streamlit ni du réseau : elles reçoivent des
+cotations et des taux déjà chargés, et retournent leurs avertissements dans une liste
+d'Alerte que la vue (Streamlit, CLI) affiche comme elle l'entend.
+"""
+
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+AVERTISSEMENT = "warning"
+ERREUR = "error"
+
+
+@dataclass(frozen=True)
+class Alerte:
+    """Message destiné à l'utilisateur (niveau AVERTISSEMENT ou ERREUR)."""
+    message: str
+    niveau: str = AVERTISSEMENT
+
+
+@dataclass
+class Instrument:
+    """Métadonnées stables d'un ticker (registre des instruments) : nom court, devise, cotation en pence, place."""
+    ticker: str
+    nom: str
+    devise: Optional[str] = None
+    en_pence: bool = False
+    bourse: Optional[str] = None
+    date_maj: Optional[datetime] = None
+
+
+@dataclass
+class Cotation:
+    """Cours d'un ticker, déjà corrigé des prix en pence (GBp)."""
+    ticker: str
+    nom: str
+    cours: float = np.nan
+    plus_haut_52s: float = np.nan
+    en_pence: bool = False
+    plus_bas_52s: float = np.nan # Déduits de l'historique quotidien (core.historique)
+    cloture_veille: float = np.nan
+
+    @property
+    def variation_jour_pct(self):
+        """Variation du cours depuis la clôture de la veille, en %."""
+        if self.cours is None or not self.cloture_veille or np.isnan(self.cloture_veille):
+            return np.nan
+        return (self.cours / self.cloture_veille - 1) * 100
+
+    @classmethod
+    def depuis_dict(cls, ticker, donnees):
+        """Construit une Cotation depuis le dictionnaire historique de fetch_yahoo_data."""
+        donnees = donnees or {}
+        return cls(
+            ticker=ticker,
+            nom=donnees.get("shortName", f"https://finance.yahoo.com/quote/{ticker}"),
+            cours=_flottant(donnees.get("currentPrice")),
+            plus_haut_52s=_flottant(donnees.get("fiftyTwoWeekHigh")),
+            en_pence=bool(donnees.get("is_gbp_pence", False)),
+            plus_bas_52s=_flottant(donnees.get("fiftyTwoWeekLow")),
+            cloture_veille=_flottant(donnees.get("previousClose")),
+        )
+
+    def vers_dict(self):
+        """Dictionnaire au format de fetch_yahoo_data (cache de session ticker_data_cache)."""
+        return {
+            "shortName": self.nom,
+            "currentPrice": self.cours,
+            "fiftyTwoWeekHigh": self.plus_haut_52s,
+            "is_gbp_pence": self.en_pence,
+            "fiftyTwoWeekLow": self.plus_bas_52s,
+            "previousClose": self.cloture_veille,
+        }
+
+
+@dataclass
+class Momentum:
+    """Momentum 39 semaines d'un ticker et signal associé."""
+    dernier_cours: float = np.nan
+    momentum_pct: float = np.nan
+    z_score: float = np.nan
+    signal: str = ""
+    action: str = ""
+    justification: str = ""
+
+    @classmethod
+    def depuis_dict(cls, donnees):
+        """Construit un Momentum depuis le dictionnaire historique de fetch_momentum_data."""
+        donnees = donnees or {}
+        return cls(
+            dernier_cours=_flottant(donnees.get("Last Price")),
+            momentum_pct=_flottant(donnees.get("Momentum (%)")),
+            z_score=_flottant(donnees.get("Z-Score")),
+            signal=donnees.get("Signal", ""),
+            action=donnees.get("Action", ""),
+            justification=donnees.get("Justification", ""),
+        )
+
+    def vers_dict(self):
+        """Dictionnaire au format de fetch_momentum_data (cache de session momentum_results_cache)."""
+        return {
+            "Last Price": self.dernier_cours,
+            "Momentum (%)": self.momentum_pct,
+            "Z-Score": self.z_score,
+            "Signal": self.signal,
+            "Action": self.action,
+            "Justification": self.justification,
+        }
+
+
+@dataclass
+class Valorisation:
+    """
+    Résultat de valoriser_portefeuille.
+
+    Attributes:
+        positions (pd.DataFrame): Portefeuille enrichi (cours, momentum, valeurs source et converties, gains).
+        total_acquisition, total_actuel, total_h52, total_lt (float): Totaux en devise cible.
+        devise (str): Devise cible.
+        alertes (list[Alerte]): Avertissements rencontrés pendant le calcul.
+    """
+    positions: pd.DataFrame
+    total_acquisition: float
+    total_actuel: float
+    total_h52: float
+    total_lt: float
+    devise: str
+    alertes: list = field(default_factory=list)
+    date_valorisation: Optional[date] = None
+
+    def totaux(self):
+        """Totaux dans l'ordre historique de calculer_portefeuille (acquisition, actuel, H52, LT)."""
+        return self.total_acquisition, self.total_actuel, self.total_h52, self.total_lt
+
+
+def _flottant(valeur):
+    """Convertit en float, NaN si la valeur est absente ou non numérique."""
+    try:
+        return np.nan if valeur is None else float(valeur)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+@dataclass
+class InstantaneMarche:
+    """
+    Cotations, momentum et taux de change chargés une seule fois, pour valoriser plusieurs
+    portefeuilles sur les mêmes données (voir core.consolidation).
+    """
+    devise: str
+    fx_rates: dict
+    cotations: dict
+    momentums: dict
+    alertes: list = field(default_factory=list)
+
+
+@dataclass
+class ValorisationConsolidee:
+    """
+    Résultat de valoriser_portefeuilles : une Valorisation par portefeuille et la vue consolidée
+    (toutes les positions, avec une colonne 'Portefeuille').
+    """
+    portefeuilles: dict
+    consolidee: Valorisation
+    instantane: InstantaneMarche
+
+    def totaux_par_portefeuille(self):
+        """DataFrame des totaux (une ligne par portefeuille, plus la ligne consolidée)."""
+        lignes = [(nom, *v.totaux()) for nom, v in self.portefeuilles.items()]
+        lignes.append(("Total", *self.consolidee.totaux()))
+        return pd.DataFrame(lignes, columns=["Portefeuille", "Valeur Acquisition", "Valeur Actuelle", "Valeur H52", "Valeur LT"])
@@ -0,0 +1,91 @@
+# core/momentum.py
+"""Momentum 39 semaines, Z-score sur 10 semaines et signal associé, à partir d'une série de clôtures."""
+
+import numpy as np
+import pandas as pd
+
+from core.modeles import Momentum
+
+FENETRE_MOYENNE = 39 # Semaines
+FENETRE_ZSCORE = 10 # Semaines
+
+# (seuil de Z-score strictement dépassé, signal, action, justification), du plus haut au plus bas
+SEUILS_SIGNAL = [
+    (2, "🔥 Surchauffe", "Alléger / Prendre profits", "Momentum extrême, risque de retournement"),
+    (1.5, "↗ Fort", "Surveiller", "Momentum soutenu, proche de surchauffe"),
+    (0.5, "↗ Haussier", "Conserver / Renforcer", "Momentum sain"),
+    (-0.5, "➖ Neutre", "Ne rien faire", "Pas de signal exploitable"),
+    (-1.5, "↘ Faible", "Surveiller / Réduire si confirmé", "Dynamique en affaiblissement"),
+]
+SIGNAL_SURVENDU = ("🧊 Survendu", "Acheter / Renforcer (si signal technique)", "Purge excessive, possible bas de cycle")
+
+
+def indicateurs_momentum(close_series):
+    """
+    Retourne un DataFrame Close, MA_39, Momentum, Momentum_Mean_10, Momentum_Std_10, Z_Momentum
+    (colonnes attendues par data_fetcher.plot_momentum_chart).
+    """
+    df = pd.DataFrame({"Close": close_series}).copy()
+    df["MA_39"] = df["Close"].rolling(window=FENETRE_MOYENNE, min_periods=1).mean()
+    df["Momentum"] = (df["Close"] / df["MA_39"]) - 1
+
+    df["Momentum_Mean_10"] = df["Momentum"].rolling(window=FENETRE_ZSCORE, min_periods=1).mean()
+    df["Momentum_Std_10"] = df["Momentum"].rolling(window=FENETRE_ZSCORE, min_periods=1).std()
+
+    df["Z_Momentum"] = (df["Momentum"] - df["Momentum_Mean_10"]) / df["Momentum_Std_10"]
+    df["Z_Momentum"] = df["Z_Momentum"].replace([np.inf, -np.inf], np.nan)
+    return df
+
+
+def signal_momentum(z):
+    """Retourne (signal, action, justification) pour un Z-score."""
+    if pd.isna(z):
+        return "Neutre", "Maintenir", "Z-Score non calculable."
+    for seuil, signal, action, justification in SEUILS_SIGNAL:
+        if z > seuil:
+            return signal, action, justification
+    return SIGNAL_SURVENDU
+
+
+def calculer_momentum(close_series):
+    """
+    Calcule le momentum d'une série de clôtures hebdomadaires (déjà corrigée des pence).
+
+    Returns:
+        Momentum: Indicateurs de la dernière semaine, ou un Momentum « Insuffisant » /
+        « Manquant » si la série est trop courte ou vide.
+    """
+    if close_series is None or close_series.empty:
+        return Momentum(
+            signal="Manquant", action="Vérifier Ticker",
+            justification="La colonne 'Close' ne contient pas de données pour la période demandée."
+        )
+
+    if len(close_series) < FENETRE_MOYENNE:
+        return Momentum(
+            dernier_cours=close_series.iloc[-1],
+            signal="Insuffisant", action="Plus de données requises",
+            justification="Pas assez de données pour calculer le momentum (moins de 39 semaines)."
+        )
+
+    latest = indicateurs_momentum(close_series).iloc[-1]
+
+    # Extraire les valeurs finales, en s'assurant qu'elles sont scalaires et non NaN
+    latest_price = latest["Close"] if pd.notna(latest["Close"]) else np.nan
+    m = (latest["Momentum"] * 100.0) if pd.notna(latest["Momentum"]) else np.nan
+    z = latest["Z_Momentum"] if pd.notna(latest["Z_Momentum"]) else np.nan
+
+    signal, action, justification = signal_momentum(z)
+    if pd.notna(m):
+        justification += f" Momentum: {m:.2f}%."
+    if pd.notna(z):
+        justification += f" Z-Score: {z:.2f}."
+
+    return Momentum(
+        dernier_cours=latest_price,
+        momentum_pct=m,
+        z_score=z,
+        signal=signal,
+        action=action,
+        justification=justification,
+    )
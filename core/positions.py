@@ -0,0 +1,185 @@
+# core/positions.py
+"""
+Table canonique des positions : le portefeuille importé (Excel, CSV, Google Sheets) est analysé
+une seule fois, au chargement, en un DataFrame typé que toutes les vues consomment sans nouveau
+nettoyage :
+- Quantité, Acquisition et Objectif_LT (colonne 'LT' renommée) en float64, cellules vides à 0,
+  saisies à la française acceptées ('1 234,5') ;
+- Facteur_Ajustement_FX en float64, lu dans la colonne 'H' (1.0 par défaut) ;
+- Ticker (ou Tickers), Devise (majuscules, vide si inconnue) et Catégories ('Non classé' par
+  défaut) en catégories pandas.
+
+Les autres colonnes importées sont conservées telles quelles. Le résultat est mis en cache par
+empreinte du contenu : réimporter le même fichier, revenir à un portefeuille ou recalculer la
+consolidation ne relance pas l'analyse. Les DataFrames retournés sont partagés : les copier
+avant de les modifier.
+"""
+
+import hashlib
+import threading
+import weakref
+from collections import OrderedDict
+
+import pandas as pd
+
+from core.modeles import Alerte, ERREUR
+
+NOMS_CATEGORIE = ["categories", "catégories", "catégorie", "category"]
+COLONNES_NUMERIQUES = ["Quantité", "Acquisition", "Objectif_LT"]
+COLONNES_CATEGORIELLES = ["Devise", "Catégories"] # Plus la colonne des tickers
+CATEGORIE_PAR_DEFAUT = "Non classé"
+
+TAILLE_CACHE = 32 # Tables canoniques conservées (portefeuilles nommés, consolidation, snapshots relus)
+ATTRIBUT_ALERTES = "alertes_import" # df.attrs : alertes de l'analyse, restituées à chaque valorisation
+
+_verrou = threading.Lock()
+_cache = OrderedDict() # empreinte du contenu importé -> table canonique
+_empreintes = {} # id(table canonique) -> (référence faible, empreinte)
+
+
+def colonne_ticker(df):
+    """Nom de la colonne des tickers ('Ticker' ou 'Tickers'), ou None."""
+    return "Ticker" if "Ticker" in df.columns else "Tickers" if "Tickers" in df.columns else None
+
+
+def empreinte(df):
+    """Empreinte du contenu d'un DataFrame (valeurs, colonnes et index), stable d'un rerun à l'autre."""
+    if df is None:
+        return None
+    hachage = hashlib.sha256(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    hachage.update("\x1f".join(map(str, df.columns)).encode("utf-8"))
+    return hachage.hexdigest()[:16]
+
+
+def empreinte_positions(positions):
+    """
+    Empreinte d'une table canonique, calculée une fois par objet : les tables sont partagées et
+    jamais modifiées, un rerun qui retrouve la même table ne rehache rien.
+    """
+    if positions is None:
+        return None
+    with _verrou:
+        entree = _empreintes.get(id(positions))
+        if entree is not None and entree[0]() is positions:
+            return entree[1]
+    cle = empreinte(positions)
+    with _verrou:
+        for i in [i for i, (ref, _) in _empreintes.items() if ref() is None]:
+            del _empreintes[i]
+        _empreintes[id(positions)] = (weakref.ref(positions), cle)
+    return cle
+
+
+def _nombre_fr(serie):
+    """Convertit une colonne saisie à la française ('1 234,5') en float64 ; une colonne déjà numérique est gardée."""
+    if pd.api.types.is_float_dtype(serie):
+        return serie.astype("float64")
+    if pd.api.types.is_numeric_dtype(serie) and not pd.api.types.is_bool_dtype(serie):
+        return serie.astype("float64")
+    texte = serie.astype(str).str.replace(" ", "", regex=False).str.replace(",", ".", regex=False)
+    return pd.to_numeric(texte, errors="coerce").astype("float64")
+
+
+def _texte(serie):
+    """Texte sans espaces autour ; NaN pour les cellules vides."""
+    texte = serie.astype(str).str.strip()
+    return texte.where(serie.notna() & (texte != ""))
+
+
+def _colonne_categorie(df):
+    if "Categories" in df.columns:
+        return "Categories"
+    return next((col for col in df.columns if str(col).strip().lower() in NOMS_CATEGORIE), None)
+
+
+def est_canonique(df):
+    """True si le DataFrame est déjà une table canonique (ou une valorisation qui en dérive)."""
+    if df is None or "Facteur_Ajustement_FX" not in df.columns or df["Facteur_Ajustement_FX"].dtype != "float64":
+        return False
+    ticker_col = colonne_ticker(df)
+    colonnes = COLONNES_CATEGORIELLES + ([ticker_col] if ticker_col else [])
+    return (all(col in df.columns and isinstance(df[col].dtype, pd.CategoricalDtype) for col in colonnes)
+            and all(df[col].dtype == "float64" for col in COLONNES_NUMERIQUES if col in df.columns))
+
+
+def analyser_positions(df_portefeuille):
+    """
+    Construit la table canonique d'un portefeuille importé (sans passer par le cache).
+    Les alertes (colonnes Devise ou Catégories absentes) sont attachées à df.attrs.
+    """
+    alertes = []
+    df = df_portefeuille.copy()
+
+    # Assurez-vous que 'LT' est renommé en 'Objectif_LT'
+    if "LT" in df.columns and "Objectif_LT" not in df.columns:
+        df = df.rename(columns={"LT": "Objectif_LT"})
+
+    for col in COLONNES_NUMERIQUES:
+        if col in df.columns:
+            df[col] = _nombre_fr(df[col]).fillna(0.0)
+
+    # Facteur d'ajustement FX lu dans la colonne 'H' (table déjà canonique : facteur conservé)
+    if "H" in df.columns:
+        df["Facteur_Ajustement_FX"] = _nombre_fr(df["H"]).fillna(1.0)
+    elif "Facteur_Ajustement_FX" in df.columns:
+        df["Facteur_Ajustement_FX"] = _nombre_fr(df["Facteur_Ajustement_FX"]).fillna(1.0)
+    else:
+        df["Facteur_Ajustement_FX"] = 1.0
+
+    # Devise : la devise cible est appliquée aux cellules vides à la valorisation (remplir_devise)
+    if "Devise" in df.columns:
+        df["Devise"] = _texte(df["Devise"]).str.upper().astype("category")
+    else:
+        alertes.append(Alerte("Colonne 'Devise' absente. Utilisation de la devise cible par défaut.", ERREUR))
+        df["Devise"] = pd.Categorical([None] * len(df), categories=[])
+
+    cat_col = _colonne_categorie(df)
+    if cat_col is not None:
+        df["Catégories"] = _texte(df[cat_col]).fillna(CATEGORIE_PAR_DEFAUT).astype("category")
+    else:
+        alertes.append(Alerte("ATTENTION: Aucune colonne 'Categories' ou équivalente introuvable. 'Catégories' sera 'Non classé'."))
+        df["Catégories"] = pd.Categorical([CATEGORIE_PAR_DEFAUT] * len(df))
+
+    ticker_col = colonne_ticker(df)
+    if ticker_col:
+        df[ticker_col] = _texte(df[ticker_col]).astype("category")
+
+    df.attrs[ATTRIBUT_ALERTES] = alertes
+    return df
+
+
+def positions_canoniques(df_portefeuille):
+    """
+    Table canonique d'un portefeuille, analysée une fois par contenu (cache par empreinte).
+    Une table déjà canonique est retournée telle quelle, sans calcul d'empreinte.
+    Le DataFrame retourné est partagé : le copier avant de le modifier.
+    """
+    if df_portefeuille is None or est_canonique(df_portefeuille):
+        return df_portefeuille
+    cle = empreinte(df_portefeuille)
+    with _verrou:
+        positions = _cache.get(cle)
+        if positions is not None:
+            _cache.move_to_end(cle)
+            return positions
+    positions = analyser_positions(df_portefeuille)
+    with _verrou:
+        _cache[cle] = positions
+        while len(_cache) > TAILLE_CACHE:
+            _cache.popitem(last=False)
+    return positions
+
+
+def alertes_import(df):
+    """Alertes de l'analyse d'une table canonique (colonnes absentes à l'import)."""
+    return list(df.attrs.get(ATTRIBUT_ALERTES, ()))
+
+
+def remplir_devise(df, devise_cible):
+    """Applique la devise cible aux positions sans devise (modifie df, à appeler sur une copie)."""
+    devises = df["Devise"]
+    if devises.isna().any():
+        if devise_cible not in devises.cat.categories:
+            devises = devises.cat.add_categories([devise_cible])
+        df["Devise"] = devises.fillna(devise_cible)
+    return df
@@ -0,0 +1,94 @@
+# core/reconstruction.py
+"""
+Reconstruction de la valeur historique d'un portefeuille à composition fixe, à partir de
+séries de clôtures déjà chargées (parité des changes désactivée, comme dans l'application).
+"""
+
+import numpy as np
+import pandas as pd
+
+from core.modeles import Alerte
+from core.positions import positions_canoniques, remplir_devise
+
+
+def valeur_portefeuille_jour(df_positions, jour, historical_prices):
+    """
+    Valeur d'acquisition et valeur actuelle d'un portefeuille pour une date donnée.
+    Sans cours pour le ticker à cette date, le prix d'acquisition est retenu (approche conservatrice).
+    Les valeurs restent dans leur devise d'origine, puis sont sommées (fx_rate = 1.0).
+    """
+    jour_str = jour.strftime("%Y-%m-%d")
+    acquisition_totale = 0.0
+    actuelle_totale = 0.0
+
+    for ticker, quantite, acquisition in zip(df_positions["Ticker"], df_positions["Quantité"], df_positions["Acquisition"]):
+        if pd.isna(quantite) or quantite == 0:
+            continue
+        cours = np.nan
+        if ticker and historical_prices.get(ticker) is not None and jour_str in historical_prices[ticker].index:
+            cours = historical_prices[ticker].loc[jour_str]
+        if pd.isna(cours):
+            cours = acquisition
+        acquisition_totale += quantite * acquisition
+        actuelle_totale += quantite * cours
+
+    return acquisition_totale, actuelle_totale
+
+
+def normaliser_positions(df_snapshot, target_currency):
+    """
+    Table canonique (core.positions) du portefeuille avec des colonnes Ticker, Quantité, Acquisition,
+    Devise utilisables. Un snapshot relu plusieurs fois n'est analysé qu'une fois (cache par contenu).
+    """
+    df = positions_canoniques(df_snapshot)
+    manquantes = {col: defaut for col, defaut in [("Quantité", 0.0), ("Acquisition", 0.0), ("Ticker", "")]
+                  if col not in df.columns}
+    df = df.assign(**manquantes) if manquantes else df.copy()
+    return remplir_devise(df, target_currency)
+
+
+def reconstruire_valeur_historique(df_portefeuille, historical_prices, start_date, end_date, target_currency, alertes=None):
+    """
+    Reconstruit, jour ouvré par jour ouvré, la valeur du portefeuille actuel sur [start_date, end_date].
+
+    Args:
+        historical_prices (dict): Ticker -> Series de clôtures indexée par date.
+        alertes (list, optional): Liste recevant les Alerte rencontrées.
+    Returns:
+        pd.DataFrame: Indexé par Date, colonnes Valeur Acquisition, Valeur Actuelle, Devise,
+        Gain/Perte Absolu, Gain/Perte (%). Vide si rien n'a pu être reconstruit.
+    """
+    alertes = alertes if alertes is not None else []
+    business_days = pd.bdate_range(start_date, end_date)
+    if business_days.empty:
+        alertes.append(Alerte("Aucun jour ouvrable trouvé dans la période sélectionnée."))
+        return pd.DataFrame()
+
+    df_positions = normaliser_positions(df_portefeuille, target_currency)
+    historical_data = []
+    for date_obj in business_days:
+        jour = date_obj.date()
+        acquisition, actuelle = valeur_portefeuille_jour(df_positions, jour, historical_prices)
+        if not (np.isnan(acquisition) or np.isnan(actuelle)):
+            historical_data.append({
+                "Date": jour,
+                "Valeur Acquisition": acquisition,
+                "Valeur Actuelle": actuelle,
+                "Devise": target_currency # Devise de référence, car pas de conversion
+            })
+
+    if not historical_data:
+        alertes.append(Alerte("Aucune donnée de valeur de portefeuille historique n'a pu être reconstruite."))
+        return pd.DataFrame()
+
+    df_reconstructed = pd.DataFrame(historical_data)
+    df_reconstructed["Date"] = pd.to_datetime(df_reconstructed["Date"])
+    df_reconstructed = df_reconstructed.set_index("Date").sort_index()
+
+    df_reconstructed["Gain/Perte Absolu"] = df_reconstructed["Valeur Actuelle"] - df_reconstructed["Valeur Acquisition"]
+    df_reconstructed["Gain/Perte (%)"] = np.where(
+        df_reconstructed["Valeur Acquisition"] != 0,
+        df_reconstructed["Gain/Perte Absolu"] / df_reconstructed["Valeur Acquisition"].where(df_reconstructed["Valeur Acquisition"] != 0) * 100,
+        0
+    )
+    return df_reconstructed
@@ -0,0 +1,151 @@
+# core/source_distante.py
+"""
+Rechargement conditionnel d'un portefeuille publié en CSV (Google Sheets) et différences ligne à ligne.
+
+charger_si_modifie envoie une requête conditionnelle (If-None-Match / If-Modified-Since) avec
+l'ETag et la date Last-Modified du chargement précédent : un 304 ne transfère rien et le CSV
+n'est pas relu. Si le serveur ne gère pas ces en-têtes, le contenu reçu est comparé à
+l'empreinte (SHA-256) du précédent avant toute lecture par pandas.
+
+comparer_portefeuilles indique les lignes ajoutées, modifiées et retirées par ticker : seuls les
+tickers ajoutés ont besoin de cotations, celles des autres restent dans les caches.
+"""
+
+import hashlib
+import io
+from dataclasses import dataclass, field
+from datetime import datetime
+
+import pandas as pd
+
+from core.positions import colonne_ticker, positions_canoniques
+
+DELAI_REQUETE = 30 # Secondes
+
+
+@dataclass
+class EtatSource:
+    """Dernier chargement d'une URL : validateurs HTTP, empreinte du contenu et DataFrame lu."""
+    url: str
+    etag: str = None
+    derniere_modification: str = None
+    empreinte: str = None
+    df: pd.DataFrame = None
+    date_chargement: datetime = None
+    date_verification: datetime = None
+    nb_verifications: int = 0
+    nb_non_modifies: int = 0
+
+
+def charger_si_modifie(url, etat=None, delai=DELAI_REQUETE):
+    """
+    Télécharge le CSV seulement s'il a changé depuis 'etat' (EtatSource du chargement précédent).
+
+    Returns:
+        tuple: (EtatSource à jour, modifie). Si modifie est False, etat.df est toujours le
+        DataFrame précédent et rien n'a été relu.
+    Raises:
+        requests.RequestException, pandas.errors.ParserError : erreurs réseau ou CSV illisible.
+    """
+    import requests
+
+    if etat is None or etat.url != url:
+        etat = EtatSource(url)
+    entetes = {}
+    if etat.df is not None:
+        if etat.etag:
+            entetes["If-None-Match"] = etat.etag
+        if etat.derniere_modification:
+            entetes["If-Modified-Since"] = etat.derniere_modification
+
+    reponse = requests.get(url, headers=entetes, timeout=delai)
+    etat.date_verification = datetime.now()
+    etat.nb_verifications += 1
+    if reponse.status_code == 304 and etat.df is not None:
+        etat.nb_non_modifies += 1
+        return etat, False
+    reponse.raise_for_status()
+
+    etat.etag = reponse.headers.get("ETag")
+    etat.derniere_modification = reponse.headers.get("Last-Modified")
+    empreinte = hashlib.sha256(reponse.content).hexdigest()
+    if etat.df is not None and empreinte == etat.empreinte:
+        etat.nb_non_modifies += 1 # Serveur sans validateurs : contenu identique, pas de relecture
+        return etat, False
+
+    etat.df = pd.read_csv(io.BytesIO(reponse.content))
+    etat.empreinte = empreinte
+    etat.date_chargement = etat.date_verification
+    return etat, True
+
+
+@dataclass
+class DiffPortefeuille:
+    """Différences entre deux versions d'un portefeuille, ligne à ligne et par ticker."""
+    lignes_ajoutees: int = 0
+    lignes_modifiees: int = 0
+    lignes_retirees: int = 0
+    lignes_inchangees: int = 0
+    tickers_ajoutes: list = field(default_factory=list) # Cotations à charger
+    tickers_modifies: list = field(default_factory=list) # Quantités, prix d'acquisition... (cotations en cache)
+    tickers_retires: list = field(default_factory=list)
+    devises_ajoutees: list = field(default_factory=list)
+
+    @property
+    def inchange(self):
+        return not (self.lignes_ajoutees or self.lignes_modifiees or self.lignes_retirees)
+
+    def resume(self):
+        if self.inchange:
+            return "Aucune ligne modifiée."
+        texte = (f"{self.lignes_ajoutees} ligne(s) ajoutée(s), {self.lignes_modifiees} modifiée(s), "
+                 f"{self.lignes_retirees} retirée(s), {self.lignes_inchangees} inchangée(s)")
+        if self.tickers_ajoutes:
+            texte += f" ; nouveaux tickers à charger : {', '.join(self.tickers_ajoutes)}"
+        return texte + "."
+
+
+def _lignes_par_ticker(df, colonnes, col_ticker):
+    """Nombre d'occurrences de chaque ligne, indexé par (ticker, empreinte de la ligne) ; '' sans ticker."""
+    # Comparaison sur le texte des valeurs : un entier relu en flottant (NaN ajouté dans la colonne) reste égal
+    empreintes = pd.util.hash_pandas_object(df.reindex(columns=colonnes).astype(str), index=False)
+    tickers = df[col_ticker].astype(object).fillna("").astype(str).str.strip() if col_ticker else pd.Series("", index=df.index)
+    return pd.Series(1, index=pd.MultiIndex.from_arrays([tickers.to_numpy(), empreintes.to_numpy()])).groupby(level=[0, 1]).sum()
+
+
+def comparer_portefeuilles(ancien, nouveau):
+    """
+    Compare deux DataFrames de portefeuille (format importé) ticker par ticker.
+    Une ligne d'un ticker présent dans les deux versions dont une valeur change est « modifiée » ;
+    les lignes en plus ou en moins d'un ticker sont ajoutées ou retirées. Les deux versions sont
+    comparées sous forme de tables canoniques (core.positions) : « 1 234,5 » et 1234.5 sont égaux.
+    """
+    nouveau = positions_canoniques(nouveau)
+    ancien = nouveau.iloc[0:0] if ancien is None or ancien.empty else positions_canoniques(ancien)
+    colonnes = list(dict.fromkeys(list(nouveau.columns) + list(ancien.columns)))
+    lignes = pd.DataFrame({
+        "avant": _lignes_par_ticker(ancien, colonnes, colonne_ticker(ancien)),
+        "apres": _lignes_par_ticker(nouveau, colonnes, colonne_ticker(nouveau)),
+    }).fillna(0)
+    lignes["communes"] = lignes[["avant", "apres"]].min(axis=1)
+    lignes["en_plus"] = lignes["apres"] - lignes["communes"]
+    lignes["en_moins"] = lignes["avant"] - lignes["communes"]
+    par_ticker = lignes.groupby(level=0, sort=False).sum()
+    modifiees = par_ticker[["en_plus", "en_moins"]].min(axis=1)
+
+    diff = DiffPortefeuille(
+        lignes_ajoutees=int((par_ticker["en_plus"] - modifiees).sum()),
+        lignes_modifiees=int(modifiees.sum()),
+        lignes_retirees=int((par_ticker["en_moins"] - modifiees).sum()),
+        lignes_inchangees=int(par_ticker["communes"].sum()),
+    )
+    par_ticker = par_ticker[par_ticker.index != ""]
+    diff.tickers_ajoutes = par_ticker.index[par_ticker["avant"] == 0].tolist()
+    diff.tickers_retires = par_ticker.index[par_ticker["apres"] == 0].tolist()
+    diff.tickers_modifies = par_ticker.index[(par_ticker["avant"] > 0) & (par_ticker["apres"] > 0)
+                                             & (par_ticker["en_plus"] + par_ticker["en_moins"] > 0)].tolist()
+
+    if "Devise" in nouveau.columns:
+        devises_avant = set(ancien["Devise"].dropna().astype(str).str.strip()) if "Devise" in ancien.columns else set()
+        diff.devises_ajoutees = sorted(set(nouveau["Devise"].dropna().astype(str).str.strip()) - devises_avant)
+    return diff
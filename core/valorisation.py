@@ -0,0 +1,115 @@
+# core/valorisation.py
+"""
+Valorisation d'un portefeuille : table canonique des positions (core.positions), cours et
+momentum par ticker, conversion en devise cible et totaux. Aucune dépendance à Streamlit ni au réseau.
+"""
+
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from core.change import convertir_colonne, devises_sans_taux
+from core.modeles import Alerte, Cotation, Momentum, Valorisation
+from core.positions import alertes_import, colonne_ticker, positions_canoniques, remplir_devise
+
+# Colonnes valorisées : (colonne de prix, colonne de valeur source, colonne convertie, colonne du taux)
+VALEURS = [
+    ("Acquisition", "Valeur Acquisition", "Valeur_conv", "Taux_FX_Acquisition"),
+    ("currentPrice", "Valeur_Actuelle", "Valeur_Actuelle_conv", "Taux_FX_Actuel"),
+    ("fiftyTwoWeekHigh", "Valeur_H52", "Valeur_H52_conv", "Taux_FX_H52"),
+    ("Objectif_LT", "Valeur_LT", "Valeur_LT_conv", "Taux_FX_LT"),
+]
+
+
+def preparer_positions(df_portefeuille, devise_cible="EUR", alertes=None):
+    """
+    Copie de la table canonique du portefeuille (core.positions : colonnes typées, facteur
+    d'ajustement FX, catégories), la devise cible étant appliquée aux positions sans devise.
+    Un portefeuille déjà canonique n'est pas réanalysé.
+    """
+    alertes = alertes if alertes is not None else []
+    df = positions_canoniques(df_portefeuille).copy()
+    alertes.extend(alertes_import(df))
+    return remplir_devise(df, devise_cible)
+
+
+def valoriser_portefeuille(df_portefeuille, devise_cible, fx_rates, cotations=None, momentums=None, date_valorisation=None):
+    """
+    Valorise un portefeuille en devise cible.
+
+    Args:
+        df_portefeuille (pd.DataFrame): Portefeuille importé (Ticker, Quantité, Acquisition, Devise, ...).
+        devise_cible (str): Devise des totaux.
+        fx_rates (dict): Devise source -> taux vers la devise cible (format de fetch_fx_rates).
+        cotations (dict, optional): Ticker -> Cotation (ou dictionnaire au format fetch_yahoo_data).
+        momentums (dict, optional): Ticker -> Momentum (ou dictionnaire au format fetch_momentum_data).
+        date_valorisation (date, optional): Date rattachée au résultat (aujourd'hui par défaut).
+    Returns:
+        Valorisation: Positions enrichies, totaux convertis et alertes.
+    """
+    alertes = []
+    fx_rates = fx_rates or {}
+    cotations = {t: c if isinstance(c, Cotation) else Cotation.depuis_dict(t, c) for t, c in (cotations or {}).items()}
+    momentums = {t: m if isinstance(m, Momentum) else Momentum.depuis_dict(m) for t, m in (momentums or {}).items()}
+
+    if "Devise" in df_portefeuille.columns:
+        manquantes = devises_sans_taux(df_portefeuille["Devise"], devise_cible, fx_rates)
+        if manquantes:
+            alertes.append(Alerte(
+                f"Taux de change manquants pour les devises : {', '.join(manquantes)}. "
+                f"Les valeurs ne seront pas converties pour ces devises."
+            ))
+
+    df = preparer_positions(df_portefeuille, devise_cible, alertes)
+    ticker_col = colonne_ticker(df)
+
+    if ticker_col and not df[ticker_col].dropna().empty:
+        tickers = df[ticker_col].astype(object) # map() sur une catégorie produirait des colonnes catégorielles
+        cot = {t: cotations.get(t) or Cotation.depuis_dict(t, None) for t in tickers.dropna().unique()}
+        mom = {t: momentums.get(t) or Momentum() for t in tickers.dropna().unique()}
+        df["shortName"] = tickers.map(lambda t: cot[t].nom if t in cot else f"https://finance.yahoo.com/quote/{t}")
+        df["currentPrice"] = tickers.map(lambda t: cot[t].cours if t in cot else np.nan)
+        df["fiftyTwoWeekHigh"] = tickers.map(lambda t: cot[t].plus_haut_52s if t in cot else np.nan)
+        df["fiftyTwoWeekLow"] = tickers.map(lambda t: cot[t].plus_bas_52s if t in cot else np.nan)
+        df["previousClose"] = tickers.map(lambda t: cot[t].cloture_veille if t in cot else np.nan)
+        df["Variation Jour (%)"] = tickers.map(lambda t: cot[t].variation_jour_pct if t in cot else np.nan)
+        df["Momentum (%)"] = tickers.map(lambda t: mom[t].momentum_pct if t in mom else np.nan)
+        df["Z-Score"] = tickers.map(lambda t: mom[t].z_score if t in mom else np.nan)
+        df["Signal"] = tickers.map(lambda t: mom[t].action if t in mom else "")
+        df["Action"] = tickers.map(lambda t: mom[t].action if t in mom else "")
+        df["Justification"] = tickers.map(lambda t: mom[t].justification if t in mom else "")
+    else:
+        df["shortName"] = ""
+        df["currentPrice"] = np.nan
+        df["fiftyTwoWeekHigh"] = np.nan
+        df["fiftyTwoWeekLow"] = np.nan
+        df["previousClose"] = np.nan
+        df["Variation Jour (%)"] = np.nan
+        df["Momentum (%)"] = np.nan
+        df["Z-Score"] = np.nan
+        df["Signal"] = ""
+        df["Action"] = ""
+        df["Justification"] = ""
+
+    # Valeurs en devise source puis conversion en devise cible
+    for col_prix, col_valeur, col_conv, col_taux in VALEURS:
+        df[col_valeur] = df["Quantité"] * pd.to_numeric(df[col_prix], errors="coerce")
+        df[col_conv], df[col_taux] = convertir_colonne(
+            df[col_valeur], df["Devise"], devise_cible, fx_rates, df["Facteur_Ajustement_FX"], alertes
+        )
+
+    # Calcul Gain/Perte
+    df["Gain/Perte"] = df["Valeur_Actuelle_conv"] - df["Valeur_conv"]
+    df["Gain/Perte (%)"] = np.where(df["Valeur_conv"] != 0, (df["Gain/Perte"] / df["Valeur_conv"]) * 100, 0)
+
+    return Valorisation(
+        positions=df,
+        total_acquisition=float(df["Valeur_conv"].sum(skipna=True)),
+        total_actuel=float(df["Valeur_Actuelle_conv"].sum(skipna=True)),
+        total_h52=float(df["Valeur_H52_conv"].sum(skipna=True)),
+        total_lt=float(df["Valeur_LT_conv"].sum(skipna=True)),
+        devise=devise_cible,
+        alertes=list(dict.fromkeys(alertes)),
+        date_valorisation=date_valorisation or date.today(),
+    )
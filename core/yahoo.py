@@ -0,0 +1,222 @@
+# core/yahoo.py
+"""
+Chargement des cours, taux de change et historiques depuis Yahoo Finance (yfinance).
+
+Seul module du noyau qui accède au réseau. yfinance est importé dans les fonctions :
+il pèse lourd et n'est pas nécessaire pour valoriser des cotations déjà chargées.
+
+Les métadonnées stables d'un ticker (nom, devise, pence, place) viennent de yf.Ticker(...).info,
+l'appel le plus lent de Yahoo. Les fonctions de chargement acceptent un Instrument déjà connu
+(registre des instruments, voir instruments.py) et n'interrogent alors plus .info. Les champs de
+cotation qui se déduisent de l'historique quotidien (plus haut 52 semaines, clôtures) sont calculés
+sur le magasin de cours (core.historique) : seul le cours en temps réel est demandé à Yahoo.
+Le momentum utilise les clôtures hebdomadaires rééchantillonnées depuis ce même magasin.
+"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from core.modeles import Alerte, Cotation, ERREUR, Instrument, Momentum
+from core.momentum import calculer_momentum
+
+DEVISES_COTEES = ["USD", "EUR", "GBP", "CAD", "JPY", "CHF", "HKD", "SGD", "THB", "VND", "PHP", "AUD", "CNY"]
+
+
+def _scalaire(val):
+    """Sécurise l'extraction d'une valeur unique depuis une Series ou autre."""
+    if isinstance(val, pd.Series):
+        return val.item() if len(val) == 1 else np.nan
+    return val
+
+
+def _derniere_cloture(data):
+    if not data.empty and "Close" in data.columns and not data["Close"].empty:
+        return _scalaire(data["Close"].iloc[-1])
+    return np.nan
+
+
+def _est_en_pence(ticker_symbol, currency_yahoo):
+    return currency_yahoo == "GBp" or (currency_yahoo == "GBP" and ticker_symbol.endswith((".L", "^L")))
+
+
+def _instrument_depuis_info(ticker_symbol, info):
+    """Instrument construit depuis le dictionnaire .info de yfinance, ou None s'il est vide."""
+    if not info or not (info.get("currency") or info.get("shortName") or info.get("longName")):
+        return None
+    return Instrument(
+        ticker=ticker_symbol,
+        nom=info.get("shortName") or info.get("longName") or ticker_symbol,
+        devise=info.get("currency"),
+        en_pence=_est_en_pence(ticker_symbol, info.get("currency")),
+        bourse=info.get("exchange"),
+        date_maj=datetime.now(),
+    )
+
+
+def charger_instrument(ticker_symbol):
+    """Métadonnées d'un ticker (un seul appel .info), ou None si Yahoo ne le connaît pas ou ne répond pas."""
+    import yfinance as yf
+
+    try:
+        return _instrument_depuis_info(ticker_symbol, yf.Ticker(ticker_symbol).info)
+    except Exception:
+        return None
+
+
+def charger_taux_change(target_currency="EUR", alertes=None):
+    """
+    Récupère les taux de change actuels vers une devise cible (paire directe, puis inverse).
+    Returns:
+        dict: Devise -> taux (None si introuvable), plus "<devise cible>/<devise cible>" et la devise cible à 1.0.
+    """
+    import yfinance as yf
+
+    alertes = alertes if alertes is not None else []
+    fx_rates = {}
+    for currency in DEVISES_COTEES:
+        if currency == target_currency:
+            fx_rates[f"{currency}/{target_currency}"] = 1.0
+            continue
+
+        ticker_symbol = f"{currency}{target_currency}=X"
+        try:
+            current_rate = _derniere_cloture(yf.download(ticker_symbol, period="1d", interval="1h", progress=False))
+
+            if pd.isna(current_rate):
+                alertes.append(Alerte(f"Impossible d'obtenir un taux valide pour {ticker_symbol}. Essai de l'inverse."))
+                data_inverse = yf.download(f"{target_currency}{currency}=X", period="1d", interval="1h", progress=False)
+                if data_inverse.empty or "Close" not in data_inverse.columns or data_inverse["Close"].empty:
+                    alertes.append(Alerte(f"Taux de change pour {currency}/{target_currency} non trouvé (données inverses vides).", ERREUR))
+                else:
+                    inverse = _derniere_cloture(data_inverse)
+                    if pd.notna(inverse) and inverse != 0:
+                        current_rate = 1 / inverse
+                    else:
+                        alertes.append(Alerte(f"Taux de change pour {currency}/{target_currency} non trouvé (inverse vide, NaN ou zéro).", ERREUR))
+
+            fx_rates[currency] = current_rate if pd.notna(current_rate) else None
+
+        except Exception as e:
+            alertes.append(Alerte(f"Erreur lors de la récupération du taux {ticker_symbol}: {e}", ERREUR))
+            fx_rates[currency] = None
+
+    fx_rates[target_currency] = 1.0
+    return fx_rates
+
+
+def charger_cotation(ticker_symbol, instrument=None, magasin=None):
+    """
+    Nom court, cours actuel, plus haut / bas 52 semaines et clôture de la veille d'un ticker,
+    corrigés des prix en pence. Seul le cours en temps réel est demandé à Yahoo (charger_cours_live) ;
+    les autres champs sont déduits de l'historique quotidien du magasin (core.historique), dont la
+    dernière clôture remplace le cours « live » s'il est indisponible. Nom et pence viennent de
+    l'Instrument fourni (registre des instruments), sinon de .info. En cas d'erreur, les valeurs
+    restent NaN.
+    """
+    from core.historique import MAGASIN
+
+    magasin = magasin or MAGASIN
+    if instrument is None:
+        instrument = charger_instrument(ticker_symbol) or Instrument(ticker=ticker_symbol, nom=ticker_symbol)
+    try:
+        champs = magasin.cotation(ticker_symbol)
+        cours = charger_cours_live(ticker_symbol)
+        if cours is None:
+            cours = champs["derniere_cloture"]
+
+        cotation = Cotation(
+            ticker=ticker_symbol,
+            nom=instrument.nom,
+            cours=cours,
+            plus_haut_52s=champs["plus_haut_52s"],
+            en_pence=instrument.en_pence,
+            plus_bas_52s=champs["plus_bas_52s"],
+            cloture_veille=champs["cloture_veille"],
+        )
+        if cotation.en_pence:
+            for champ in ("cours", "plus_haut_52s", "plus_bas_52s", "cloture_veille"):
+                setattr(cotation, champ, getattr(cotation, champ) / 100)
+        return cotation
+
+    except Exception:
+        return Cotation(ticker=ticker_symbol, nom=instrument.nom)
+
+
+def charger_momentum(ticker_symbol, instrument=None, magasin=None):
+    """
+    Calcule le momentum (voir core.momentum) sur 5 ans de clôtures hebdomadaires, rééchantillonnées
+    depuis l'historique quotidien du magasin de cours (core.historique) : aucun téléchargement
+    hebdomadaire séparé. La correction des prix en pence est tirée de l'Instrument s'il est fourni,
+    sinon de .info.
+    """
+    from core.historique import MAGASIN
+
+    magasin = magasin or MAGASIN
+    try:
+        debut = datetime.now() - timedelta(days=5 * 365) # 5 ans pour calculs robustes
+        close_series = magasin.clotures(ticker_symbol, debut, granularite="semaine")
+
+        if close_series.empty:
+            return Momentum(signal="Manquant", action="Vérifier Ticker",
+                            justification="Pas de données historiques disponibles.")
+
+        # Détection GBp et correction des prix si nécessaire
+        if instrument is None:
+            instrument = charger_instrument(ticker_symbol) # None si info n'est pas dispo ici
+        if instrument is not None and instrument.en_pence:
+            close_series = close_series / 100.0
+
+        return calculer_momentum(close_series)
+
+    except Exception as e:
+        return Momentum(signal="Erreur", action="N/A", justification=f"Erreur de calcul: {e}.")
+
+
+COLONNES_JOURNALIERES = ["Close", "High", "Low"]
+
+
+def charger_historique_journalier(ticker_symbol, start_date, end_date=None, alertes=None):
+    """
+    Barres quotidiennes (Close, High, Low) d'un ticker entre deux dates, en devise de cotation
+    (pence non corrigés). DataFrame vide en cas d'échec. Alimente core.historique.MagasinCours.
+    """
+    import yfinance as yf
+
+    alertes = alertes if alertes is not None else []
+    vide = pd.DataFrame(columns=COLONNES_JOURNALIERES, dtype="float64")
+    try:
+        data = yf.download(ticker_symbol, start=start_date, end=end_date, interval="1d", progress=False)
+        if data.empty:
+            alertes.append(Alerte(f"Aucune donnée valide pour {ticker_symbol} : DataFrame vide."))
+            return vide
+        if isinstance(data.columns, pd.MultiIndex):
+            data = data.xs(ticker_symbol, axis=1, level=-1) if ticker_symbol in data.columns.get_level_values(-1) \
+                else data.droplevel(-1, axis=1)
+        if "Close" not in data.columns:
+            alertes.append(Alerte(f"Colonne 'Close' absente pour {ticker_symbol}. Colonnes disponibles : {data.columns.tolist()}"))
+            return vide
+        barres = data.reindex(columns=COLONNES_JOURNALIERES).astype("float64")
+        barres.index = pd.DatetimeIndex(barres.index).tz_localize(None).normalize()
+        return barres[~barres.index.duplicated(keep="last")].sort_index()
+
+    except Exception as e:
+        alertes.append(Alerte(f"Erreur lors de la récupération pour {ticker_symbol} : {type(e).__name__} - {e}", ERREUR))
+        return vide
+
+
+def charger_cours_live(ticker_symbol):
+    """
+    Cours en temps réel (regularMarketPrice) via une requête de cotation d'une journée, sans
+    .info ni historique. None si Yahoo ne répond pas.
+    """
+    import yfinance as yf
+
+    try:
+        ticker = yf.Ticker(ticker_symbol)
+        ticker.history(period="1d", interval="1d")
+        cours = (ticker.get_history_metadata() or {}).get("regularMarketPrice")
+        return float(cours) if cours is not None and pd.notna(cours) else None
+    except Exception:
+        return None
@@ -1,316 +1,52 @@
 import streamlit as st
-import yfinance as yf
-from datetime import datetime, timedelta
 import pandas as pd
-import numpy as np
 import io
-import matplotlib.pyplot as plt
 
-# Cache pour 1 minute (600 secondes)
-@st.cache_data(ttl=600)
+# Le calcul est fait par le noyau (core.yahoo, core.momentum) ; ce module ajoute le cache
+# Streamlit et l'affichage des alertes. matplotlib est importé dans plot_momentum_chart,
+# le registre des instruments (instruments.py, SQLAlchemy) au premier téléchargement.
+from core.yahoo import charger_taux_change, charger_cotation, charger_momentum
+from utils import afficher_alertes
+from profilage import cache_instrumente
+from cache_dependances import devise, ticker
+
+# Cache pour 10 minutes (600 secondes)
+@cache_instrumente(ttl=600, erreur=lambda taux: any(v is None for v in taux.values()),
+                   dependances=lambda target_currency="EUR": [devise(target_currency)])
 def fetch_fx_rates(target_currency="EUR"):
     """
     Récupère les taux de change actuels par rapport à une devise cible.
     Utilise EUR comme devise de base par défaut pour les taux de change populaires.
     """
-
-    def extract_scalar(val):
-        """Sécurise l'extraction d'une valeur unique depuis une Series ou autre."""
-        if isinstance(val, pd.Series):
-            if len(val) == 1:
-                return val.item()
-            else:
-                return np.nan
-        return val
-
-    fx_rates = {}
-    currencies_to_fetch = ["USD", "EUR", "GBP", "CAD", "JPY", "CHF", "HKD", "SGD", "THB", "VND", "PHP", "AUD", "CNY"]
-
-    for currency in currencies_to_fetch:
-        if currency == target_currency:
-            fx_rates[f"{currency}/{target_currency}"] = 1.0
-            continue
-
-        ticker_symbol = f"{currency}{target_currency}=X"
-        try:
-            data = yf.download(ticker_symbol, period="1d", interval="1h", progress=False)
-            current_rate = np.nan
-
-            if not data.empty and 'Close' in data.columns and not data['Close'].empty:
-                temp_val = extract_scalar(data['Close'].iloc[-1])
-                if pd.notna(temp_val):
-                    current_rate = temp_val
-
-            if pd.isna(current_rate):
-                st.warning(f"Impossible d'obtenir un taux valide pour {ticker_symbol}. Essai de l'inverse.")
-                ticker_symbol_inverse = f"{target_currency}{currency}=X"
-                data_inverse = yf.download(ticker_symbol_inverse, period="1d", interval="1h", progress=False)
-
-                if not data_inverse.empty and 'Close' in data_inverse.columns and not data_inverse['Close'].empty:
-                    temp_val_inverse = extract_scalar(data_inverse['Close'].iloc[-1])
-                    if pd.notna(temp_val_inverse) and temp_val_inverse != 0:
-                        current_rate = 1 / temp_val_inverse
-                    else:
-                        st.error(f"Taux de change pour {currency}/{target_currency} non trouvé (inverse vide, NaN ou zéro).")
-                else:
-                    st.error(f"Taux de change pour {currency}/{target_currency} non trouvé (données inverses vides).")
-
-            if pd.notna(current_rate):
-                fx_rates[currency] = current_rate
-            else:
-                fx_rates[currency] = None
-
-        except Exception as e:
-            st.error(f"Erreur lors de la récupération du taux {ticker_symbol}: {e}")
-            fx_rates[currency] = None
-
-    fx_rates[target_currency] = 1.0
+    alertes = []
+    fx_rates = charger_taux_change(target_currency, alertes)
+    afficher_alertes(alertes)
     return fx_rates
 
 
-
-@st.cache_data(ttl=600) # Cache pour 10 minutes
+@cache_instrumente(ttl=600, erreur=lambda cotation: pd.isna(cotation["currentPrice"]),
+                   dependances=lambda ticker_symbol: [ticker(ticker_symbol)]) # Cache pour 10 minutes
 def fetch_yahoo_data(ticker_symbol):
     """
     Récupère le nom court, le prix actuel et le plus haut sur 52 semaines pour un ticker.
-    Utilise yfinance.
-    Retourne aussi un indicateur si le prix est en pence (GBp) et doit être divisé par 100.
-    Si le prix actuel n'est pas disponible (None ou NaN), tente de récupérer la dernière clôture historique.
+    Retourne aussi un indicateur si le prix est en pence (GBp), déjà divisé par 100.
+    Si le prix actuel n'est pas disponible (None ou NaN), la dernière clôture historique est utilisée.
+    Nom court et pence viennent du registre des instruments (rafraîchi chaque semaine).
     """
-    data = {}
-    is_gbp_pence = False
-
-    try:
-        ticker = yf.Ticker(ticker_symbol)
-        info = ticker.info
-
-        data['shortName'] = info.get('shortName') or info.get('longName') or ticker_symbol
-        
-        # Tentative 1: currentPrice (prix de marché actuel)
-        current_price_found = info.get('currentPrice')
-        
-        # Tentative 2: regularMarketPrice si currentPrice est None
-        if current_price_found is None:
-            current_price_found = info.get('regularMarketPrice')
-
-        # Si toujours pas de prix "live", tenter de récupérer la dernière clôture historique
-        if current_price_found is None or pd.isna(current_price_found):
-            # Tente de récupérer la dernière clôture disponible avec un intervalle court (1m)
-            hist_data = yf.download(ticker_symbol, period="1d", interval="1m", progress=False) 
-            
-            # Si aucune donnée 1m, tente avec un intervalle plus long (1h)
-            if hist_data.empty:
-                hist_data = yf.download(ticker_symbol, period="5d", interval="1h", progress=False) 
-            
-            # Si des données historiques ont été trouvées et contiennent 'Close'
-            if not hist_data.empty and 'Close' in hist_data.columns and not hist_data['Close'].empty:
-                last_historical_close = hist_data['Close'].iloc[-1]
-                if pd.notna(last_historical_close):
-                    current_price_found = float(last_historical_close)
-                    # st.warning(f"Utilisation du dernier prix de clôture historique pour {ticker_symbol}: {current_price_found}")
-
-        data['currentPrice'] = current_price_found
-        data['fiftyTwoWeekHigh'] = info.get('fiftyTwoWeekHigh')
-
-        currency_yahoo = info.get('currency')
-        if currency_yahoo == 'GBp':
-            is_gbp_pence = True
-        elif currency_yahoo == 'GBP' and ticker_symbol.endswith((".L", "^L")):
-            is_gbp_pence = True
-
-        if is_gbp_pence:
-            if data['currentPrice'] is not None and not np.isnan(data['currentPrice']):
-                data['currentPrice'] /= 100
-            if data['fiftyTwoWeekHigh'] is not None and not np.isnan(data['fiftyTwoWeekHigh']):
-                data['fiftyTwoWeekHigh'] /= 100
-
-    except Exception as e:
-        # En cas d'erreur générale, les valeurs restent NaN
-        # st.error(f"Erreur lors de la récupération des données Yahoo pour {ticker_symbol}: {e}") 
-        data['shortName'] = ticker_symbol
-        data['currentPrice'] = np.nan
-        data['fiftyTwoWeekHigh'] = np.nan
-        is_gbp_pence = False
-        
-    data['is_gbp_pence'] = is_gbp_pence
-    return data
+    from instruments import obtenir_instrument
+    return charger_cotation(ticker_symbol, obtenir_instrument(ticker_symbol)).vers_dict()
 
-@st.cache_data(ttl=60) # Cache pour 1 minute
+@cache_instrumente(ttl=60, erreur=lambda momentum: momentum["Signal"] in ("Manquant", "Erreur"),
+                   dependances=lambda ticker_symbol, months=12: [ticker(ticker_symbol)]) # Cache pour 1 minute
 def fetch_momentum_data(ticker_symbol, months=12):
     """
-    Calcule le momentum (taux de changement) et le Z-score pour un ticker sur X mois.
-    Utilise yfinance pour récupérer les données historiques.
-    Applique une correction pour les prix en pence si nécessaire.
+    Calcule le momentum (taux de changement) et le Z-score pour un ticker.
+    Les clôtures hebdomadaires sont rééchantillonnées depuis l'historique quotidien partagé
+    (core.historique), sans téléchargement hebdomadaire séparé.
+    Applique une correction pour les prix en pence si nécessaire (registre des instruments).
     """
-    try:
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=5 * 365) # 5 ans pour calculs robustes
-
-        data = yf.download(ticker_symbol, start=start_date, end=end_date, interval="1wk", progress=False)
-
-        close_series = pd.Series([]) # Initialise une Series vide
-        
-        if data.empty:
-            return {
-                "Last Price": np.nan,
-                "Momentum (%)": np.nan,
-                "Z-Score": np.nan,
-                "Signal": "Manquant",
-                "Action": "Vérifier Ticker",
-                "Justification": "Pas de données historiques disponibles."
-            }
-
-        # Gère les colonnes MultiIndex (par exemple, lors du téléchargement de données pour plusieurs tickers)
-        if isinstance(data.columns, pd.MultiIndex):
-            if ('Close', ticker_symbol) in data.columns: # Vérifie si 'Close' du ticker spécifique existe
-                close_series = data['Close'][ticker_symbol]
-            elif 'Close' in data.columns: # Fallback si 'Close' est un MultiIndex mais sans le nom du ticker
-                 close_series = data['Close'].iloc[:, 0] if isinstance(data['Close'], pd.DataFrame) else data['Close']
-            else:
-                 return {
-                    "Last Price": np.nan,
-                    "Momentum (%)": np.nan,
-                    "Z-Score": np.nan,
-                    "Signal": "Erreur",
-                    "Action": "Vérifier Ticker",
-                    "Justification": "Colonne 'Close' spécifique au ticker non trouvée dans le MultiIndex."
-                }
-        elif 'Close' in data.columns: # Colonnes simples standards
-            close_series = data['Close']
-        else: # Colonne 'Close' pas trouvée du tout
-            return {
-                "Last Price": np.nan,
-                "Momentum (%)": np.nan,
-                "Z-Score": np.nan,
-                "Signal": "Manquant",
-                "Action": "Vérifier Ticker",
-                "Justification": "Colonne 'Close' non trouvée dans les données historiques."
-            }
-            
-        # Maintenant, vérifie si la close_series extraite est vide
-        if close_series.empty:
-            return {
-                "Last Price": np.nan,
-                "Momentum (%)": np.nan,
-                "Z-Score": np.nan,
-                "Signal": "Manquant",
-                "Action": "Vérifier Ticker",
-                "Justification": "La colonne 'Close' ne contient pas de données pour la période demandée."
-            }
-
-        # Détection GBp et correction des prix si nécessaire
-        is_gbp_pence_for_momentum = False
-        try:
-            ticker_info = yf.Ticker(ticker_symbol).info
-            currency_yahoo = ticker_info.get('currency')
-            if currency_yahoo == 'GBp' or (currency_yahoo == 'GBP' and ticker_symbol.endswith((".L", "^L"))):
-                is_gbp_pence_for_momentum = True
-        except Exception:
-            pass # Ignorer les erreurs si info n'est pas dispo ici
-
-        if is_gbp_pence_for_momentum:
-            # Applique la correction directement à la close_series
-            close_series = close_series / 100.0
-
-        # Créer un DataFrame pour les calculs de momentum avec la colonne 'Close' valide
-        df = pd.DataFrame({'Close': close_series}).copy()
-        
-        # Vérifier si suffisamment de données sont disponibles après le nettoyage
-        if len(df) < 39:
-            last_price = df['Close'].iloc[-1] if not df['Close'].empty else np.nan
-            return {
-                "Last Price": last_price,
-                "Momentum (%)": np.nan,
-                "Z-Score": np.nan,
-                "Signal": "Insuffisant",
-                "Action": "Plus de données requises",
-                "Justification": "Pas assez de données pour calculer le momentum (moins de 39 semaines)."
-            }
-
-        # Calcul des indicateurs de momentum
-        df['MA_39'] = df['Close'].rolling(window=39, min_periods=1).mean()
-        df['Momentum'] = (df['Close'] / df['MA_39']) - 1
-        
-        df['Momentum_Mean_10'] = df['Momentum'].rolling(window=10, min_periods=1).mean()
-        df['Momentum_Std_10'] = df['Momentum'].rolling(window=10, min_periods=1).std()
-
-        df['Z_Momentum'] = (df['Momentum'] - df['Momentum_Mean_10']) / df['Momentum_Std_10']
-        df['Z_Momentum'] = df['Z_Momentum'].replace([np.inf, -np.inf], np.nan)
-
-        # Récupérer la dernière ligne pour les valeurs finales
-        if df.empty:
-            return {
-                "Last Price": np.nan,
-                "Momentum (%)": np.nan,
-                "Z-Score": np.nan,
-                "Signal": "Erreur",
-                "Action": "Vérifier Ticker",
-                "Justification": "DataFrame vide après calculs."
-            }
-
-        latest = df.iloc[-1]
-
-        # Extraire les valeurs finales, en s'assurant qu'elles sont scalaires et non NaN
-        latest_price = latest['Close'] if pd.notna(latest['Close']) else np.nan
-        m = (latest['Momentum'] * 100.0) if pd.notna(latest['Momentum']) else np.nan
-        z = latest['Z_Momentum'] if pd.notna(latest['Z_Momentum']) else np.nan
-
-        signal = "Neutre"
-        action = "Maintenir"
-        justification = ""
-
-        if pd.notna(z):
-            if z > 2:
-                signal = "🔥 Surchauffe"
-                action = "Alléger / Prendre profits"
-                justification = "Momentum extrême, risque de retournement"
-            elif z > 1.5:
-                signal = "↗ Fort"
-                action = "Surveiller"
-                justification = "Momentum soutenu, proche de surchauffe"
-            elif z > 0.5:
-                signal = "↗ Haussier"
-                action = "Conserver / Renforcer"
-                justification = "Momentum sain"
-            elif z > -0.5:
-                signal = "➖ Neutre"
-                action = "Ne rien faire"
-                justification = "Pas de signal exploitable"
-            elif z > -1.5:
-                signal = "↘ Faible"
-                action = "Surveiller / Réduire si confirmé"
-                justification = "Dynamique en affaiblissement"
-            else: # z <= -1.5
-                signal = "🧊 Survendu"
-                action = "Acheter / Renforcer (si signal technique)"
-                justification = "Purge excessive, possible bas de cycle"
-        else:
-            justification = "Z-Score non calculable."
-
-        if pd.notna(m):
-            justification += f" Momentum: {m:.2f}%."
-        if pd.notna(z):
-            justification += f" Z-Score: {z:.2f}."
-
-        return {
-            "Last Price": latest_price,
-            "Momentum (%)": m,
-            "Z-Score": z,
-            "Signal": signal,
-            "Action": action,
-            "Justification": justification
-        }
-
-    except Exception as e:
-        # Retourne les valeurs NaN en cas d'erreur
-        return {
-            "Last Price": np.nan,
-            "Momentum (%)": np.nan,
-            "Z-Score": np.nan,
-            "Signal": "Erreur",
-            "Action": "N/A",
-            "Justification": f"Erreur de calcul: {e}."
-        }
+    from instruments import obtenir_instrument
+    return charger_momentum(ticker_symbol, obtenir_instrument(ticker_symbol)).vers_dict()
 
 
 # --- Fonction plot_momentum_chart (si vous l'utilisez ailleurs) ---
@@ -319,6 +55,8 @@ def plot_momentum_chart(ticker, data_df):
     Génère un graphique de prix et de momentum pour un ticker donné.
     data_df doit contenir les colonnes 'Close', 'MA_39', 'Momentum', 'Z_Momentum'.
     """
+    import matplotlib.pyplot as plt
+
     if data_df.empty:
         st.write(f"Pas de données disponibles pour tracer le graphique de {ticker}.")
         return None
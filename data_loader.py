@@ -1,5 +1,4 @@
 # data_loader.py
-import pandas as pd
 import os
 import streamlit as st # <-- Assurez-vous que streamlit est importé ici
 import io # Ajouté pour une meilleure gestion future si besoin, mais pas critique pour l'URL
@@ -8,20 +7,11 @@ def load_data(uploaded_file):
     """
     Loads data from an uploaded Excel (.xlsx, .xls) or CSV file.
     Returns a DataFrame and the sheet name (for Excel).
+    Lecture rapide et mise en cache par empreinte du fichier : voir core.ingestion.
     """
-    file_extension = os.path.splitext(uploaded_file.name)[1].lower()
-    df = None
-    sheet_name = None
-
-    if file_extension == ".csv":
-        df = pd.read_csv(uploaded_file)
-    elif file_extension in [".xlsx", ".xls"]:
-        df = pd.read_excel(uploaded_file)
-        sheet_name = df.columns[0]
-    else:
-        raise ValueError("Unsupported file type. Please upload a CSV or Excel file.")
-
-    return df, sheet_name
+    from core.ingestion import lire_portefeuille
+    lecture = lire_portefeuille(uploaded_file)
+    return lecture.df, lecture.feuille
 
 def save_data(df, file_path):
     """
@@ -39,18 +29,26 @@ def save_data(df, file_path):
     else:
         st.error("Format de fichier non supporté pour la sauvegarde. Veuillez utiliser .csv ou .xlsx.")
 
+def _etats_sources():
+    """URL -> core.source_distante.EtatSource des chargements Google Sheets de la session."""
+    return st.session_state.setdefault("sources_google_sheets", {})
+
 # --- NOUVELLE FONCTION POUR CHARGEMENT DEPUIS URL (DOIT ÊTRE PRÉSENTE) ---
 def load_portfolio_from_google_sheets(url):
     """
     Loads portfolio data from a Google Sheets URL.
     The URL must be a 'publish to web' CSV export link.
+    Les validateurs HTTP (ETag, Last-Modified) sont conservés pour les rechargements conditionnels.
     """
     if not url:
         st.error("L'URL Google Sheets n'est pas configurée. Veuillez la saisir dans l'onglet 'Paramètres'.")
         return None
 
     try:
-        df = pd.read_csv(url)
+        from core.source_distante import charger_si_modifie
+        etat, _ = charger_si_modifie(url, _etats_sources().get(url))
+        _etats_sources()[url] = etat
+        df = etat.df
         # Vérifier si le DataFrame est vide après chargement
         if df.empty:
             st.warning("Le fichier Google Sheets est vide ou ne contient pas de données.")
@@ -60,3 +58,27 @@ def load_portfolio_from_google_sheets(url):
     except Exception as e:
         st.error(f"Erreur lors du chargement depuis Google Sheets : {e}. Assurez-vous que l'URL est correcte et publiée au format CSV.")
         return None
+
+def recharger_google_sheets(url, df_actuel=None):
+    """
+    Recharge un portefeuille Google Sheets seulement s'il a changé (requête conditionnelle,
+    voir core.source_distante). Le CSV n'est relu que si son contenu a changé.
+
+    Args:
+        url (str): Lien CSV « publié sur le web ».
+        df_actuel (pd.DataFrame, optional): Portefeuille affiché, référence des différences si l'URL
+            n'a pas encore été chargée dans la session.
+    Returns:
+        tuple: (DataFrame, DiffPortefeuille) si la feuille a changé, (None, None) sinon.
+    Raises:
+        Exception: erreur réseau ou CSV illisible (affichée par l'appelant).
+    """
+    from core.source_distante import charger_si_modifie, comparer_portefeuilles
+
+    etat_precedent = _etats_sources().get(url)
+    df_precedent = etat_precedent.df if etat_precedent is not None else df_actuel
+    etat, modifie = charger_si_modifie(url, etat_precedent)
+    _etats_sources()[url] = etat
+    if not modifie and df_precedent is not None:
+        return None, None
+    return etat.df, comparer_portefeuilles(df_precedent, etat.df)
@@ -0,0 +1,156 @@
+# foyer.py
+"""
+Plusieurs portefeuilles nommés dans la session, et vue consolidée du foyer.
+
+Les portefeuilles sont conservés dans st.session_state.portefeuilles (nom -> table canonique des
+positions, voir core.positions) ; st.session_state.df reste le portefeuille affiché par les onglets :
+celui qui est sélectionné, ou la consolidation de tous (CONSOLIDE). Les cotations et le momentum sont partagés par ticker
+(caches de session ticker_data_cache / momentum_results_cache) : un ticker présent dans
+plusieurs portefeuilles n'est récupéré qu'une fois, et la répartition du foyer valorise tous les
+portefeuilles sur le même instantané de cours et de taux (core.valoriser_portefeuilles).
+"""
+
+import streamlit as st
+
+from cache_dependances import invalider_portefeuille
+from core.positions import positions_canoniques
+
+CONSOLIDE = "Foyer (consolidé)"
+PORTEFEUILLE_PAR_DEFAUT = "Principal"
+
+
+def portefeuilles():
+    """Dictionnaire nom -> DataFrame des portefeuilles de la session."""
+    resultat = st.session_state.setdefault("portefeuilles", {})
+    if not resultat and st.session_state.get("df") is not None:
+        # Portefeuille chargé avant l'existence des portefeuilles nommés (ou directement dans df)
+        resultat[PORTEFEUILLE_PAR_DEFAUT] = positions_canoniques(st.session_state.df)
+    return resultat
+
+
+def portefeuille_actif():
+    return st.session_state.get("portefeuille_actif", PORTEFEUILLE_PAR_DEFAUT)
+
+
+def df_portefeuille(nom):
+    """DataFrame d'un portefeuille, ou la consolidation de tous (colonne 'Portefeuille') pour CONSOLIDE."""
+    if nom == CONSOLIDE:
+        from core import consolider_positions
+        return consolider_positions(portefeuilles())
+    return portefeuilles().get(nom)
+
+
+def activer_portefeuille(nom):
+    """Affiche un portefeuille (ou le foyer) : remplace st.session_state.df et réinitialise les totaux."""
+    st.session_state.portefeuille_actif = nom
+    st.session_state.df = df_portefeuille(nom)
+    st.session_state.total_valeur = None
+    st.session_state.total_actuelle = None
+    st.session_state.total_h52 = None
+    st.session_state.total_lt = None
+
+
+def enregistrer_portefeuille(nom, df, activer=True):
+    """
+    Ajoute (ou remplace) un portefeuille nommé et, par défaut, l'affiche. Le DataFrame importé est
+    analysé ici, une fois, en table canonique (core.positions) : les onglets la consomment telle quelle.
+    """
+    nom = (nom or "").strip() or PORTEFEUILLE_PAR_DEFAUT
+    portefeuilles()[nom] = positions_canoniques(df)
+    if activer:
+        activer_portefeuille(nom)
+    elif portefeuille_actif() == CONSOLIDE:
+        activer_portefeuille(CONSOLIDE) # La consolidation affichée inclut le portefeuille ajouté
+    return nom
+
+
+def supprimer_portefeuille(nom):
+    """Retire un portefeuille ; l'affichage passe au premier restant si c'était l'actif."""
+    invalider_portefeuille(portefeuilles().pop(nom, None))
+    restants = list(portefeuilles())
+    if portefeuille_actif() == nom or (portefeuille_actif() == CONSOLIDE and len(restants) < 2):
+        if restants:
+            activer_portefeuille(restants[0])
+        else:
+            st.session_state.portefeuille_actif = PORTEFEUILLE_PAR_DEFAUT
+            st.session_state.df = None
+    elif portefeuille_actif() == CONSOLIDE:
+        activer_portefeuille(CONSOLIDE)
+
+
+def portefeuille_historise():
+    """
+    Le journal et les totaux quotidiens suivent un seul portefeuille : le foyer consolidé dès qu'il
+    y en a plusieurs. Retourne True si la vue affichée est celle qui doit être historisée.
+    """
+    return len(portefeuilles()) <= 1 or portefeuille_actif() == CONSOLIDE
+
+
+def afficher_selecteur():
+    """Sélecteur du portefeuille affiché (barre latérale), visible dès qu'il y a plusieurs portefeuilles."""
+    noms = list(portefeuilles())
+    if len(noms) < 2:
+        return
+    options = noms + [CONSOLIDE]
+    actif = portefeuille_actif()
+    # Le choix est appliqué par le callback, avant le rerun ; ici on aligne seulement le widget
+    # sur le portefeuille actif (qui peut avoir changé ailleurs : import, suppression)
+    if actif in options and st.session_state.get("selecteur_portefeuille") != actif:
+        st.session_state.selecteur_portefeuille = actif
+    st.sidebar.selectbox(
+        "Portefeuille affiché",
+        options,
+        key="selecteur_portefeuille",
+        on_change=lambda: activer_portefeuille(st.session_state.selecteur_portefeuille),
+    )
+
+
+def instantane_session(tickers):
+    """
+    Instantané de marché (core.InstantaneMarche) construit depuis les caches de session : seuls les
+    tickers jamais vus sont récupérés, une fois chacun, quel que soit le nombre de portefeuilles.
+    """
+    from core import InstantaneMarche
+    from data_fetcher import fetch_fx_rates, fetch_yahoo_data, fetch_momentum_data
+
+    devise = st.session_state.get("devise_cible", "EUR")
+    if st.session_state.get("fx_rates") is None:
+        st.session_state.fx_rates = fetch_fx_rates(devise)
+    cotations = st.session_state.setdefault("ticker_data_cache", {})
+    momentums = st.session_state.setdefault("momentum_results_cache", {})
+    for ticker in tickers:
+        if ticker not in cotations:
+            cotations[ticker] = fetch_yahoo_data(ticker)
+        if ticker not in momentums:
+            momentums[ticker] = fetch_momentum_data(ticker)
+    return InstantaneMarche(
+        devise,
+        st.session_state.fx_rates,
+        {t: cotations[t] for t in tickers},
+        {t: momentums[t] for t in tickers},
+    )
+
+
+def afficher_repartition_foyer():
+    """Totaux de chaque portefeuille et du foyer, valorisés sur le même instantané de marché."""
+    if len(portefeuilles()) < 2:
+        return None
+    from core import tickers_portefeuilles, valoriser_portefeuilles
+    from utils import afficher_alertes, format_fr
+
+    devise = st.session_state.get("devise_cible", "EUR")
+    instantane = instantane_session(tickers_portefeuilles(portefeuilles()))
+    resultat = valoriser_portefeuilles(portefeuilles(), devise, instantane)
+    afficher_alertes(resultat.consolidee.alertes)
+
+    st.markdown("#### Répartition du foyer")
+    tableau = resultat.totaux_par_portefeuille()
+    total_actuel = resultat.consolidee.total_actuel
+    tableau["Poids (%)"] = tableau["Valeur Actuelle"] / total_actuel * 100 if total_actuel else 0.0
+    for col in ["Valeur Acquisition", "Valeur Actuelle", "Valeur H52", "Valeur LT"]:
+        tableau[col] = tableau[col].map(lambda v: f"{format_fr(v, 2)} {devise}")
+    tableau["Poids (%)"] = tableau["Poids (%)"].map(lambda v: f"{format_fr(v, 2)} %")
+    st.dataframe(tableau, hide_index=True, use_container_width=True)
+    st.caption(f"{len(portefeuilles())} portefeuilles, {len(instantane.cotations)} tickers distincts "
+               f"(cours et taux communs à tous les portefeuilles).")
+    return resultat
@@ -1,15 +1,22 @@
 import pandas as pd
 from datetime import datetime, date
-from sqlalchemy import create_engine, Column, Integer, String, Date, Float
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy import Column, Integer, String, Date, Float, select, func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 import os
 
-# Configuration de la base de données SQLite
-DATABASE_URL = "sqlite:///portfolio.db" # Même fichier que portfolio_journal
-Engine = create_engine(DATABASE_URL)
-Session = sessionmaker(bind=Engine)
-Base = declarative_base()
+# Base de données SQLite partagée (moteur, pragmas et pool : voir storage.py)
+from storage import Base, Session, get_engine, initialiser_tables
+from core.metriques import DUREE_ECRITURE_JOURNAL, ERREURS_ECRITURE_JOURNAL
+
+# Colonnes du DataFrame d'historique (format de load_historical_data) -> colonnes SQL
+COLONNES_TOTAUX = {
+    "Date": "date",
+    "Valeur Acquisition": "acquisition_value",
+    "Valeur Actuelle": "current_value",
+    "Valeur H52": "h52_value",
+    "Valeur LT": "lt_value",
+    "Devise": "currency",
+}
 
 # Définition du modèle de données pour l'historique des totaux du portefeuille
 class PortfolioDailyTotal(Base):
@@ -25,81 +32,341 @@ class PortfolioDailyTotal(Base):
     def __repr__(self):
         return f"<PortfolioDailyTotal(date='{self.date}', current_value='{self.current_value}')>"
 
-# Assure-toi que les tables sont créées (à appeler une seule fois)
+# Agrégats hebdomadaires / mensuels de l'historique, tenus à jour à chaque écriture de totaux
+# quotidiens : les lectures sur de longues périodes lisent ces tables au lieu des données journalières.
+class AgregatTotauxMixin:
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    period_start = Column(Date, unique=True, nullable=False) # Premier jour calendaire de la période
+    period_end = Column(Date, nullable=False) # Dernière date disposant d'un total dans la période
+    open_value = Column(Float) # Valeur actuelle : première, plus haute, plus basse et dernière de la période
+    high_value = Column(Float)
+    low_value = Column(Float)
+    close_value = Column(Float)
+    sum_returns = Column(Float) # Somme des rendements quotidiens de la valeur actuelle
+    nb_days = Column(Integer)
+    acquisition_value = Column(Float) # Dernières valeurs de la période
+    h52_value = Column(Float)
+    lt_value = Column(Float)
+    currency = Column(String)
+
+class PortfolioWeeklyTotal(AgregatTotauxMixin, Base):
+    __tablename__ = 'portfolio_weekly_totals'
+
+class PortfolioMonthlyTotal(AgregatTotauxMixin, Base):
+    __tablename__ = 'portfolio_monthly_totals'
+
+# Granularité -> (modèle, fréquence pandas des périodes)
+AGREGATS = {
+    "semaine": (PortfolioWeeklyTotal, "W-SUN"),
+    "mois": (PortfolioMonthlyTotal, "M"),
+}
+
+# Choix automatique de la granularité selon la durée demandée (en jours)
+SEUILS_GRANULARITE = [(2 * 365, "jour"), (10 * 365, "semaine")] # Au-delà : "mois"
+TAILLE_BLOC = 10000 # Lignes lues à la fois par iter_historical_data
+
+_moteur_initialise = None
+
 def initialize_historical_data_db():
-    Base.metadata.create_all(Engine)
+    """
+    Crée les tables de ce module au premier accès à la base partagée, et non plus à l'import du module.
+    Une base antérieure aux agrégats (totaux quotidiens sans agrégat) est complétée à ce moment.
+    Les appels suivants ne font rien.
+    """
+    global _moteur_initialise
+    engine = get_engine()
+    if _moteur_initialise is not engine:
+        initialiser_tables(PortfolioDailyTotal, PortfolioWeeklyTotal, PortfolioMonthlyTotal)
+        _moteur_initialise = engine
+        with engine.connect() as connexion:
+            a_reconstruire = (connexion.execute(select(PortfolioWeeklyTotal.period_start).limit(1)).first() is None
+                              and connexion.execute(select(PortfolioDailyTotal.date).limit(1)).first() is not None)
+        if a_reconstruire:
+            reconstruire_agregats()
+    return engine
 
-# Appelle l'initialisation de la base de données
-initialize_historical_data_db()
+def _upsert_totaux(session, enregistrements):
+    """
+    INSERT ... ON CONFLICT(date) DO UPDATE pour une liste de dicts (colonnes SQL),
+    exécuté en une seule requête préparée (executemany) dans la transaction courante.
+    """
+    stmt = sqlite_insert(PortfolioDailyTotal)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[PortfolioDailyTotal.date],
+        set_={col: stmt.excluded[col] for col in COLONNES_TOTAUX.values() if col != "date"}
+    )
+    session.execute(stmt, enregistrements)
+    _mettre_a_jour_agregats(session, [e["date"] for e in enregistrements])
+
+
+def _mettre_a_jour_agregats(session, dates):
+    """
+    Recalcule, dans la transaction courante, les agrégats des semaines et des mois touchés par
+    les dates écrites, ainsi que la période suivante (dont le premier rendement dépend de la
+    dernière valeur de la période modifiée). Seules les lignes journalières de ces périodes sont lues.
+    """
+    if not dates:
+        return
+    table = PortfolioDailyTotal.__table__
+    jours = pd.to_datetime(pd.Series(dates))
+    for modele, frequence in AGREGATS.values():
+        periodes = jours.dt.to_period(frequence)
+        debut = periodes.min().start_time.date()
+        fin = (periodes.max() + 1).end_time.date()
 
+        # Dernière valeur avant la première période : base du premier rendement
+        precedent = session.execute(
+            select(table.c.current_value).where(table.c.date < debut).order_by(table.c.date.desc()).limit(1)
+        ).scalar()
+        df = pd.read_sql(
+            select(table).where(table.c.date.between(debut, fin)).order_by(table.c.date),
+            session.connection(), parse_dates=["date"]
+        )
+        if df.empty:
+            continue
+
+        valeurs = pd.concat([pd.Series([precedent], dtype="float64"), df["current_value"].astype("float64")], ignore_index=True)
+        df["rendement"] = valeurs.pct_change(fill_method=None).iloc[1:].to_numpy()
+        groupes = df.groupby(df["date"].dt.to_period(frequence))
+        agregats = pd.DataFrame({
+            "period_end": groupes["date"].max().dt.date,
+            "open_value": groupes["current_value"].first(),
+            "high_value": groupes["current_value"].max(),
+            "low_value": groupes["current_value"].min(),
+            "close_value": groupes["current_value"].last(),
+            "sum_returns": groupes["rendement"].sum(min_count=1),
+            "nb_days": groupes["date"].count(),
+            "acquisition_value": groupes["acquisition_value"].last(),
+            "h52_value": groupes["h52_value"].last(),
+            "lt_value": groupes["lt_value"].last(),
+            "currency": groupes["currency"].last(),
+        })
+        agregats.insert(0, "period_start", [p.start_time.date() for p in agregats.index])
+        enregistrements = agregats.astype(object).where(agregats.notna(), None).to_dict(orient="records")
+
+        stmt = sqlite_insert(modele)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[modele.period_start],
+            set_={col: stmt.excluded[col] for col in agregats.columns if col != "period_start"}
+        )
+        session.execute(stmt, enregistrements)
+
+
+def reconstruire_agregats(taille_bloc=TAILLE_BLOC):
+    """
+    Recalcule tous les agrégats hebdomadaires et mensuels depuis les totaux quotidiens (base existante).
+    Les dates sont parcourues par blocs (iter_historical_data) : seules les périodes touchées par un
+    bloc sont relues, la mémoire utilisée ne dépend pas de la longueur de l'historique.
+    """
+    initialize_historical_data_db()
+    session = Session()
+    try:
+        nb_dates = 0
+        for bloc in iter_historical_data(colonnes=["Date"], chunksize=taille_bloc):
+            _mettre_a_jour_agregats(session, bloc["Date"].dt.date.tolist())
+            nb_dates += len(bloc)
+        session.commit()
+        print(f"DEBUG: Agrégats reconstruits à partir de {nb_dates} totaux quotidiens.")
+    except Exception as e:
+        session.rollback()
+        print(f"ERREUR lors de la reconstruction des agrégats: {e}")
+    finally:
+        session.close()
+
+
+@DUREE_ECRITURE_JOURNAL.chronometrer_fonction(operation="totaux")
 def save_daily_totals(date_obj, acquisition_value, current_value, h52_value, lt_value, currency):
     """
     Sauvegarde les totaux quotidiens du portefeuille dans la base de données SQLite.
     Met à jour l'enregistrement s'il existe déjà pour la date donnée, sinon le crée.
     """
+    initialize_historical_data_db()
     session = Session()
     try:
-        # Vérifier si un enregistrement pour cette date existe déjà
-        existing_total = session.query(PortfolioDailyTotal).filter_by(date=date_obj).first()
-
-        if existing_total:
-            # Mettre à jour l'enregistrement existant
-            existing_total.acquisition_value = acquisition_value
-            existing_total.current_value = current_value
-            existing_total.h52_value = h52_value
-            existing_total.lt_value = lt_value
-            existing_total.currency = currency
-            print(f"DEBUG: Totaux du {date_obj} mis à jour.")
+        _upsert_totaux(session, [{
+            "date": date_obj,
+            "acquisition_value": acquisition_value,
+            "current_value": current_value,
+            "h52_value": h52_value,
+            "lt_value": lt_value,
+            "currency": currency,
+        }])
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        ERREURS_ECRITURE_JOURNAL.inc(operation="totaux")
+        print(f"ERREUR lors de la sauvegarde des totaux quotidiens: {e}")
+    finally:
+        session.close()
+
+
+@DUREE_ECRITURE_JOURNAL.chronometrer_fonction(operation="totaux")
+def save_daily_totals_bulk(df_totals, currency=None, lever_erreurs=False):
+    """
+    Sauvegarde en une seule transaction les totaux de nombreux jours (reconstruction d'historique).
+    Les dates déjà présentes sont mises à jour (INSERT ... ON CONFLICT DO UPDATE).
+
+    Args:
+        df_totals (pd.DataFrame): Une ligne par jour, colonnes au format de load_historical_data
+            ('Date', 'Valeur Acquisition', 'Valeur Actuelle', 'Valeur H52', 'Valeur LT', 'Devise').
+            Les colonnes de valeur absentes sont enregistrées à NULL.
+        currency (str, optional): Devise utilisée si la colonne 'Devise' est absente.
+        lever_erreurs (bool): Relève l'erreur après annulation de la transaction au lieu de retourner 0.
+    Returns:
+        int: Nombre de jours enregistrés.
+    """
+    if df_totals is None or df_totals.empty or "Date" not in df_totals.columns:
+        return 0
+
+    df = pd.DataFrame({"date": pd.to_datetime(df_totals["Date"]).dt.date})
+    for col, col_sql in COLONNES_TOTAUX.items():
+        if col_sql == "date":
+            continue
+        if col in df_totals.columns:
+            serie = df_totals[col] if col == "Devise" else pd.to_numeric(df_totals[col], errors="coerce")
+            df[col_sql] = serie.to_numpy()
         else:
-            # Créer un nouvel enregistrement
-            new_total = PortfolioDailyTotal(
-                date=date_obj,
-                acquisition_value=acquisition_value,
-                current_value=current_value,
-                h52_value=h52_value,
-                lt_value=lt_value,
-                currency=currency
-            )
-            session.add(new_total)
-            print(f"DEBUG: Nouveaux totaux du {date_obj} créés.")
+            df[col_sql] = currency if col == "Devise" else None
+    # Une date en double : la dernière ligne l'emporte, comme avec des appels successifs
+    df = df.drop_duplicates(subset="date", keep="last")
+    enregistrements = df.astype(object).where(df.notna(), None).to_dict(orient="records")
 
+    initialize_historical_data_db()
+    session = Session()
+    try:
+        _upsert_totaux(session, enregistrements)
         session.commit()
+        print(f"DEBUG: {len(enregistrements)} totaux quotidiens enregistrés.")
+        return len(enregistrements)
     except Exception as e:
         session.rollback()
-        print(f"ERREUR lors de la sauvegarde des totaux quotidiens: {e}")
+        ERREURS_ECRITURE_JOURNAL.inc(operation="totaux")
+        print(f"ERREUR lors de la sauvegarde groupée des totaux quotidiens: {e}")
+        if lever_erreurs:
+            raise
+        return 0
     finally:
         session.close()
 
 
-def load_historical_data():
+def _requete_totaux(start_date=None, end_date=None, colonnes=None):
+    """
+    Construit la requête SELECT des totaux : projection sur les colonnes demandées (noms du
+    DataFrame, 'Date' toujours incluse) et filtre de dates exécutés par SQLite.
+    Retourne (requête, dtypes pandas des colonnes numériques).
+    """
+    colonnes = list(COLONNES_TOTAUX) if colonnes is None else ["Date"] + [c for c in colonnes if c != "Date"]
+    inconnues = [c for c in colonnes if c not in COLONNES_TOTAUX]
+    if inconnues:
+        raise ValueError(f"Colonnes inconnues : {inconnues}. Colonnes disponibles : {list(COLONNES_TOTAUX)}")
+
+    table = PortfolioDailyTotal.__table__
+    query = select(*[table.c[COLONNES_TOTAUX[c]].label(c) for c in colonnes]).order_by(table.c.date)
+    if start_date is not None:
+        query = query.where(table.c.date >= start_date)
+    if end_date is not None:
+        query = query.where(table.c.date <= end_date)
+    dtypes = {c: "float64" for c in colonnes if c not in ("Date", "Devise")}
+    return query, dtypes
+
+
+def load_historical_data(start_date=None, end_date=None, colonnes=None):
     """
     Charge l'historique des totaux du portefeuille depuis la base de données SQLite.
+    Les lignes sont lues directement dans des colonnes typées (pd.read_sql), sans objets ORM.
     Retourne un DataFrame Pandas. Retourne un DataFrame vide si aucune donnée.
+
+    Args:
+        start_date (date, optional): Première date incluse.
+        end_date (date, optional): Dernière date incluse.
+        colonnes (list, optional): Colonnes à lire parmi COLONNES_TOTAUX ('Date' est toujours lue).
     """
-    session = Session()
     try:
-        all_totals = session.query(PortfolioDailyTotal).order_by(PortfolioDailyTotal.date).all()
-
-        if not all_totals:
-            return pd.DataFrame() # Retourne un DataFrame vide si pas de données
-
-        data = []
-        for total_obj in all_totals:
-            data.append({
-                "Date": total_obj.date,
-                "Valeur Acquisition": total_obj.acquisition_value,
-                "Valeur Actuelle": total_obj.current_value,
-                "Valeur H52": total_obj.h52_value,
-                "Valeur LT": total_obj.lt_value,
-                "Devise": total_obj.currency
-            })
-
-        df_history = pd.DataFrame(data)
-        df_history["Date"] = pd.to_datetime(df_history["Date"]) # S'assurer que la colonne est au bon format datetime
+        query, dtypes = _requete_totaux(start_date, end_date, colonnes)
+        initialize_historical_data_db()
+        with get_engine().connect() as connexion:
+            df_history = pd.read_sql(query, connexion, parse_dates=["Date"], dtype=dtypes)
         print(f"DEBUG: {len(df_history)} enregistrements historiques chargés depuis la base de données.")
         return df_history
     except Exception as e:
         print(f"ERREUR lors du chargement des données historiques: {e}")
         return pd.DataFrame()
-    finally:
-        session.close()
+
+
+def iter_historical_data(start_date=None, end_date=None, colonnes=None, chunksize=TAILLE_BLOC):
+    """
+    Parcourt l'historique des totaux par blocs de 'chunksize' lignes (DataFrames typés), pour les
+    historiques très longs : la mémoire utilisée ne dépend que de la taille d'un bloc.
+    Mêmes filtres et projection que load_historical_data.
+    """
+    query, dtypes = _requete_totaux(start_date, end_date, colonnes)
+    initialize_historical_data_db()
+    with get_engine().connect() as connexion:
+        yield from pd.read_sql(query, connexion, parse_dates=["Date"], dtype=dtypes, chunksize=chunksize)
+
+
+def choisir_granularite(start_date, end_date):
+    """Granularité ('jour', 'semaine' ou 'mois') adaptée à la durée de la période demandée."""
+    duree = (end_date - start_date).days
+    for seuil, granularite in SEUILS_GRANULARITE:
+        if duree <= seuil:
+            return granularite
+    return "mois"
+
+
+def load_historical_series(start_date=None, end_date=None, granularite="auto"):
+    """
+    Historique de la valeur du portefeuille à la granularité adaptée à la période : les données
+    journalières pour les périodes courtes, les agrégats hebdomadaires ou mensuels au-delà.
+
+    Les colonnes communes à toutes les granularités sont 'Date' (dernière date de la période),
+    'Valeur Acquisition', 'Valeur Actuelle' (clôture de la période), 'Valeur H52', 'Valeur LT' et
+    'Devise'. Les agrégats ajoutent 'Début', 'Ouverture', 'Plus Haut', 'Plus Bas',
+    'Somme Rendements' et 'Nb Jours'.
+
+    Args:
+        start_date (date, optional): Début de la période (défaut : premier total enregistré).
+        end_date (date, optional): Fin de la période (défaut : aujourd'hui).
+        granularite (str): 'auto', 'jour', 'semaine' ou 'mois'.
+    Returns:
+        tuple: (DataFrame, granularité utilisée).
+    """
+    try:
+        initialize_historical_data_db()
+        if granularite == "auto":
+            if start_date is None:
+                with get_engine().connect() as connexion:
+                    start_date = connexion.execute(select(func.min(PortfolioDailyTotal.date))).scalar()
+            if start_date is None:
+                return pd.DataFrame(), "jour"
+            granularite = choisir_granularite(start_date, end_date or date.today())
+
+        if granularite == "jour":
+            return load_historical_data(start_date, end_date), granularite
+
+        modele, _ = AGREGATS[granularite]
+        table = modele.__table__
+        query = select(
+            table.c.period_end.label("Date"),
+            table.c.period_start.label("Début"),
+            table.c.acquisition_value.label("Valeur Acquisition"),
+            table.c.close_value.label("Valeur Actuelle"),
+            table.c.h52_value.label("Valeur H52"),
+            table.c.lt_value.label("Valeur LT"),
+            table.c.currency.label("Devise"),
+            table.c.open_value.label("Ouverture"),
+            table.c.high_value.label("Plus Haut"),
+            table.c.low_value.label("Plus Bas"),
+            table.c.sum_returns.label("Somme Rendements"),
+            table.c.nb_days.label("Nb Jours"),
+        ).order_by(table.c.period_start)
+        if start_date is not None:
+            query = query.where(table.c.period_end >= start_date)
+        if end_date is not None:
+            query = query.where(table.c.period_start <= end_date)
+        with get_engine().connect() as connexion:
+            df = pd.read_sql(query, connexion, parse_dates=["Date", "Début"])
+        return df, granularite
+    except Exception as e:
+        print(f"ERREUR lors du chargement de l'historique agrégé: {e}")
+        return pd.DataFrame(), granularite
@@ -0,0 +1,148 @@
+# instruments.py
+"""
+Registre des instruments : nom court, devise, cotation en pence (GBp) et place de cotation
+de chaque ticker, conservés dans la table SQLite 'instruments' (portfolio.db).
+
+Ces informations ne changent presque jamais ; elles étaient pourtant redemandées à Yahoo
+(yf.Ticker(...).info, l'appel le plus lent) à chaque expiration des caches de cours (10 min)
+et de momentum (1 min). Elles sont désormais chargées une fois par ticker, puis rafraîchies
+au plus une fois par semaine. Le registre est lu en mémoire au premier accès et partagé par
+toutes les sessions du processus (fetchers Streamlit, API, CLI).
+
+Si Yahoo ne résout pas un ticker, rien n'est enregistré : le ticker est redemandé après
+DELAI_NOUVEL_ESSAI secondes, et une entrée expirée est conservée tant que le
+rafraîchissement échoue.
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import Boolean, Column, DateTime, String, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from storage import Base, Session, get_engine, initialiser_tables
+from core.modeles import Instrument
+
+DUREE_VALIDITE = timedelta(days=7) # Rafraîchissement hebdomadaire
+DELAI_NOUVEL_ESSAI = 600 # Secondes avant de redemander un ticker que Yahoo n'a pas résolu
+
+
+class InstrumentEnregistre(Base):
+    __tablename__ = 'instruments'
+    ticker = Column(String, primary_key=True)
+    short_name = Column(String)
+    currency = Column(String)
+    is_pence = Column(Boolean, nullable=False, default=False)
+    exchange = Column(String)
+    updated_at = Column(DateTime, nullable=False)
+
+    def __repr__(self):
+        return f"<InstrumentEnregistre(ticker='{self.ticker}', currency='{self.currency}', updated_at='{self.updated_at}')>"
+
+
+_verrou = threading.Lock()
+_instruments = {} # ticker -> Instrument (copie mémoire de la table)
+_echecs = {} # ticker -> time.monotonic() du dernier échec de chargement
+_moteur_charge = None # Moteur dont la table a été lue en mémoire
+
+
+def _vers_instrument(ligne):
+    return Instrument(ticker=ligne.ticker, nom=ligne.short_name or ligne.ticker, devise=ligne.currency,
+                      en_pence=bool(ligne.is_pence), bourse=ligne.exchange, date_maj=ligne.updated_at)
+
+
+def _charger_table():
+    """Crée la table si besoin et la lit en mémoire, une fois par moteur (voir storage.reinitialiser)."""
+    global _moteur_charge
+    engine = get_engine()
+    if _moteur_charge is engine:
+        return
+    with _verrou:
+        if _moteur_charge is engine:
+            return
+        initialiser_tables(InstrumentEnregistre)
+        session = Session()
+        try:
+            lignes = session.execute(select(InstrumentEnregistre)).scalars().all()
+        finally:
+            session.close()
+        _instruments.clear()
+        _instruments.update({ligne.ticker: _vers_instrument(ligne) for ligne in lignes})
+        _echecs.clear()
+        _moteur_charge = engine
+
+
+def enregistrer_instruments(instruments):
+    """INSERT ... ON CONFLICT(ticker) DO UPDATE des instruments donnés, en une transaction."""
+    instruments = [i for i in instruments if i is not None]
+    if not instruments:
+        return
+    _charger_table()
+    enregistrements = [{
+        "ticker": i.ticker,
+        "short_name": i.nom,
+        "currency": i.devise,
+        "is_pence": bool(i.en_pence),
+        "exchange": i.bourse,
+        "updated_at": i.date_maj or datetime.now(),
+    } for i in instruments]
+    stmt = sqlite_insert(InstrumentEnregistre)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[InstrumentEnregistre.ticker],
+        set_={col: stmt.excluded[col] for col in ("short_name", "currency", "is_pence", "exchange", "updated_at")}
+    )
+    session = Session()
+    try:
+        session.execute(stmt, enregistrements)
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        print(f"ERREUR lors de l'enregistrement des instruments: {e}")
+    finally:
+        session.close()
+    with _verrou:
+        for i in instruments:
+            _instruments[i.ticker] = i
+            _echecs.pop(i.ticker, None)
+
+
+def _a_rafraichir(ticker, maintenant):
+    instrument = _instruments.get(ticker)
+    if instrument is not None and instrument.date_maj is not None and maintenant - instrument.date_maj < DUREE_VALIDITE:
+        return False
+    echec = _echecs.get(ticker)
+    return echec is None or time.monotonic() - echec >= DELAI_NOUVEL_ESSAI
+
+
+def obtenir_instrument(ticker, charger=None):
+    """
+    Instrument d'un ticker depuis le registre ; chargé depuis Yahoo (charger, par défaut
+    core.yahoo.charger_instrument) s'il est absent ou date de plus d'une semaine.
+    Returns:
+        Instrument ou None si le ticker n'a jamais pu être résolu.
+    """
+    ticker = str(ticker).strip()
+    _charger_table()
+    with _verrou:
+        a_rafraichir = _a_rafraichir(ticker, datetime.now())
+        instrument = _instruments.get(ticker)
+    if not a_rafraichir:
+        return instrument
+
+    if charger is None:
+        from core.yahoo import charger_instrument as charger
+    nouveau = charger(ticker)
+    if nouveau is None:
+        with _verrou:
+            _echecs[ticker] = time.monotonic()
+        return instrument # Entrée expirée conservée tant que Yahoo ne répond pas
+    enregistrer_instruments([nouveau])
+    return nouveau
+
+
+def instruments_connus():
+    """Copie du registre en mémoire (ticker -> Instrument)."""
+    _charger_table()
+    with _verrou:
+        return dict(_instruments)
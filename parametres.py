@@ -1,6 +1,9 @@
 import streamlit as st
-import pandas as pd
 import datetime
+import os
+from foyer import enregistrer_portefeuille, portefeuilles, supprimer_portefeuille, PORTEFEUILLE_PAR_DEFAUT
+from profilage import NB_RERUNS_CONSERVES
+from cache_dependances import invalider_portefeuille
 
 def afficher_parametres_globaux():
     """
@@ -30,32 +33,39 @@ def afficher_parametres_globaux():
     st.markdown("#### Sources de Données et Importation")
     st.markdown("##### Importer un fichier CSV ou Excel")
     uploaded_file = st.file_uploader("Choisissez un fichier", type=["csv", "xlsx"], key="file_uploader_settings")
+    nom_portefeuille = st.text_input(
+        "Nom du portefeuille importé",
+        value=os.path.splitext(uploaded_file.name)[0] if uploaded_file is not None else PORTEFEUILLE_PAR_DEFAUT,
+        help="Un nom déjà utilisé remplace ce portefeuille ; un nouveau nom ajoute un portefeuille (vue consolidée du foyer)."
+    )
     if uploaded_file is not None:
         if "uploaded_file_id" not in st.session_state or st.session_state.uploaded_file_id != uploaded_file.file_id:
             try:
                 with st.spinner("Chargement du fichier..."):
-                    if uploaded_file.name.endswith('.csv'):
-                        df_uploaded = pd.read_csv(uploaded_file)
-                    elif uploaded_file.name.endswith('.xlsx'):
-                        df_uploaded = pd.read_excel(uploaded_file)
-
-                    st.session_state.df = df_uploaded
+                    # Colonnes utiles seulement, sans inférence de types ; fichier déjà lu : cache
+                    from core.ingestion import lire_portefeuille
+                    lecture = lire_portefeuille(uploaded_file)
+                    df_uploaded = lecture.df
+
+                    # Seuls les résultats calculés sur le portefeuille remplacé sont évincés des caches :
+                    # taux, cotations et historiques par ticker restent valables
+                    invalider_portefeuille(portefeuilles().get(nom_portefeuille.strip() or PORTEFEUILLE_PAR_DEFAUT))
+                    enregistrer_portefeuille(nom_portefeuille, df_uploaded)
                     st.session_state.uploaded_file_id = uploaded_file.file_id
                     st.session_state.url_data_loaded = False
-                    st.success("Fichier importé avec succès !")
+                    st.session_state.resume_import_fichier = lecture.resume()
 
                     st.session_state.sort_column = None
                     st.session_state.sort_direction = "asc"
                     st.session_state.ticker_names_cache = {}
                     st.session_state.last_update_time_fx = datetime.datetime.min
 
-                    st.cache_data.clear()
-                    st.cache_resource.clear()
-
                     st.rerun()
             except Exception as e:
                 st.error(f"❌ Erreur lors de la lecture du fichier : {e}")
                 st.session_state.df = None
+    if "resume_import_fichier" in st.session_state:
+        st.success(f"Fichier importé avec succès ! {st.session_state.pop('resume_import_fichier')}")
 
     st.markdown("<br>", unsafe_allow_html=True) 
     st.markdown("##### Charger depuis Google Sheets (URL)")
@@ -64,23 +74,37 @@ def afficher_parametres_globaux():
 
     if st.button("Rafraîchir les données depuis Google Sheets URL", key="refresh_portfolio_button_url"):
         try:
-            with st.spinner("Chargement des données du portefeuille depuis Google Sheets..."):
-                import requests
-                from io import StringIO
-                
-                response = requests.get(csv_url)
-                response.encoding = 'utf-8'
-                df_url = pd.read_csv(StringIO(response.text))
-
-                st.session_state.df = df_url
+            # Requête conditionnelle : la feuille n'est relue que si elle a changé, et seuls les
+            # tickers ajoutés seront récupérés (les cotations des autres restent en cache de session)
+            from data_loader import recharger_google_sheets
+            with st.spinner("Vérification des données du portefeuille sur Google Sheets..."):
+                df_url, diff = recharger_google_sheets(csv_url, portefeuilles().get(PORTEFEUILLE_PAR_DEFAUT))
+
+            if df_url is None:
+                st.info("Google Sheets : aucune modification depuis le dernier chargement.")
+            else:
+                invalider_portefeuille(portefeuilles().get(PORTEFEUILLE_PAR_DEFAUT))
+                enregistrer_portefeuille(PORTEFEUILLE_PAR_DEFAUT, df_url)
                 st.session_state.uploaded_file_id = "url_source_" + str(datetime.datetime.now())
                 st.session_state.url_data_loaded = True
-                st.success("Données du portefeuille importées avec succès depuis l'URL.")
-
-            st.session_state.last_update_time_fx = datetime.datetime.min
-            st.rerun()
+                st.session_state.resume_rechargement_url = diff.resume()
+                if diff.devises_ajoutees:
+                    st.session_state.last_update_time_fx = datetime.datetime.min
+                st.rerun()
         except Exception as e:
             st.error(f"❌ Erreur lors de l'import des données du portefeuille depuis l'URL : {e}")
+    if "resume_rechargement_url" in st.session_state:
+        st.success(f"Données du portefeuille importées depuis l'URL. {st.session_state.pop('resume_rechargement_url')}")
+
+    # Portefeuilles chargés dans la session
+    if len(portefeuilles()) > 1:
+        st.markdown("##### Portefeuilles chargés")
+        for nom, df_portefeuille in list(portefeuilles().items()):
+            col_nom, col_bouton = st.columns([4, 1])
+            col_nom.write(f"**{nom}** : {len(df_portefeuille)} lignes")
+            if col_bouton.button("Retirer", key=f"retirer_portefeuille_{nom}"):
+                supprimer_portefeuille(nom)
+                st.rerun()
 
     st.markdown("---")
 
@@ -130,6 +154,31 @@ def afficher_parametres_globaux():
         st.success(f"✅ Objectif de volatilité défini à {target_volatility:.1f}%.")
         st.rerun()
 
+    # Préchargement en arrière-plan des données du portefeuille dès son chargement (prechargement.py)
+    st.session_state.prechargement_portefeuille = st.checkbox(
+        "Précharger en arrière-plan les données du portefeuille dès son chargement",
+        value=st.session_state.get("prechargement_portefeuille", True),
+        key="prechargement_portefeuille_input",
+        help="Cours, puis momentum, puis historiques longs, des plus grosses positions aux plus petites ; "
+             "l'avancement est affiché dans la barre latérale."
+    )
+
+    # Mode profilage : durée de chaque étape des derniers reruns, affichée sous les onglets
+    st.session_state.profilage_actif = st.checkbox(
+        "Mode profilage",
+        value=st.session_state.get("profilage_actif", False),
+        key="profilage_actif_input",
+        help="Chronomètre les étapes de chaque rerun (cours, conversions, formatage, rendu, journal) et "
+             "affiche sous les onglets une cascade des derniers reruns, les appels et les succès de cache, avec export JSON."
+    )
+    if st.session_state.profilage_actif:
+        st.session_state.profilage_nb_reruns = st.number_input(
+            "Nombre de reruns conservés",
+            min_value=2, max_value=200, step=1,
+            value=st.session_state.get("profilage_nb_reruns", NB_RERUNS_CONSERVES),
+            key="profilage_nb_reruns_input",
+        )
+
     st.markdown("Cette section peut contenir d'autres options de configuration à l'avenir.")
 
     st.markdown("---")
@@ -141,3 +190,38 @@ def afficher_parametres_globaux():
         st.write(f"Dernière mise à jour des données : **{st.session_state['last_yfinance_update']}**")
     else:
         st.info("Aucune donnée yfinance n'a été chargée pour le moment.")
+
+    st.markdown("---")
+
+    # --- 6. Journal du Portefeuille ---
+    afficher_journal()
+
+def afficher_journal():
+    """
+    Consultation du journal (portfolio_journal) : état du portefeuille reconstruit à une date
+    quelconque (dernier checkpoint + événements), et compactage d'un journal ancien au format delta.
+    """
+    from portfolio_journal import compacter_journal, load_portfolio_as_of, load_snapshot_dates
+
+    st.markdown("#### Journal du Portefeuille")
+    dates = load_snapshot_dates()
+    if not dates:
+        st.info("Aucun snapshot n'a encore été enregistré dans le journal.")
+        return
+
+    st.write(f"{len(dates)} snapshot(s) du {dates[0].strftime('%d/%m/%Y')} au {dates[-1].strftime('%d/%m/%Y')}.")
+    date_etat = st.date_input(
+        "État du portefeuille au",
+        value=dates[-1],
+        min_value=dates[0],
+        max_value=datetime.date.today(),
+        format="DD/MM/YYYY",
+        key="journal_date_input"
+    )
+    st.dataframe(load_portfolio_as_of(date_etat), use_container_width=True, hide_index=True)
+
+    if st.button("Compacter le journal", key="journal_compacter_button",
+                 help="Réécrit les snapshots en checkpoints espacés et événements de positions "
+                      "(utile pour un journal enregistré avant le format delta)."):
+        nb_checkpoints, nb_evenements = compacter_journal()
+        st.success(f"✅ Journal compacté : {nb_checkpoints} checkpoint(s), {nb_evenements} événement(s).")
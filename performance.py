@@ -7,11 +7,12 @@ from pandas.tseries.offsets import BDay
 from data_fetcher import fetch_fx_rates
 import numpy as np
 
-from period_selector_component import period_selector
 from historical_data_fetcher import fetch_stock_history, fetch_historical_fx_rates
 from historical_performance_calculator import reconstruct_historical_portfolio_value
 from utils import format_fr
 from portfolio_display import convertir
+import profilage
+import core
 
 def calculate_rsi(data, periods=14):
     delta = data.diff()
@@ -66,52 +67,176 @@ def convertir_valeur_performance(val, source_devise, devise_cible, fx_rates_or_s
     valeur_ajustee = val * fx_adjustment_factor
     return valeur_ajustee * taux_scalar, taux_scalar
 
-def display_performance_history():  
+FENETRE_VOLATILITE = 20 # Jours de la volatilité glissante
+FENETRE_Z_36MOIS = 36 * 21 # ~756 jours ouvrables (21 par mois)
+
+PERIODES_PAR_AN = {"jour": 252, "semaine": 52, "mois": 12}
+
+def calculer_indicateurs(df_valeurs, periodes_par_an=252):
+    """
+    Moyennes mobiles, RSI, MACD, bandes de Bollinger, volatilité annualisée (et ses MA50/MA200)
+    et Z-scores sur 70 jours et 36 mois de la colonne 'Valeur Totale'. Les fenêtres sont exprimées
+    en jours ouvrés et converties en nombre de points selon periodes_par_an (252 pour une ligne
+    par jour, 52 par semaine, 12 par mois).
+    """
+    def points(jours):
+        return max(2, round(jours * periodes_par_an / 252))
+
+    df = df_valeurs.copy()
+    valeur = df['Valeur Totale']
+    df['MA50'] = valeur.rolling(window=points(50), min_periods=1).mean()
+    df['MA200'] = valeur.rolling(window=points(200), min_periods=1).mean()
+    df['RSI'] = calculate_rsi(valeur, periods=points(14))
+    df['MACD'], df['MACD_Signal'], df['MACD_Hist'] = calculate_macd(
+        valeur, fast_period=points(12), slow_period=points(26), signal_period=points(9))
+    df['BB_SMA20'], df['BB_Upper'], df['BB_Lower'] = calculate_bollinger_bands(valeur, periods=points(20), num_std=2)
+
+    df['Rendement Quotidien'] = valeur.pct_change()
+    df['Volatilité'] = df['Rendement Quotidien'].rolling(window=points(FENETRE_VOLATILITE), min_periods=1).std() * (periodes_par_an**0.5)
+    df['Volatilité_MA50'] = df['Volatilité'].rolling(window=points(50), min_periods=1).mean()
+    df['Volatilité_MA200'] = df['Volatilité'].rolling(window=points(200), min_periods=1).mean()
+
+    for suffixe, fenetre in (("70", 70), ("36mois", FENETRE_Z_36MOIS)):
+        moyenne = valeur.rolling(window=points(fenetre), min_periods=1).mean()
+        ecart_type = valeur.rolling(window=points(fenetre), min_periods=1).std()
+        df[f'Z-score_{suffixe}'] = ((valeur - moyenne) / ecart_type).fillna(0)
+    return df
+
+def serie_agregee(debut, fin, target_currency):
+    """
+    Valeur enregistrée du portefeuille pour une période longue, lue dans la table agrégée adaptée
+    (historical_data_manager.load_historical_series : semaine au-delà de 2 ans, mois au-delà de
+    10 ans), avec 3 ans d'amorce pour le Z-score 36 mois et la MA200, et ses indicateurs.
+    Returns:
+        tuple: (DataFrame des indicateurs de 'debut' à 'fin', granularité), ou (None, granularité)
+        si la période est courte ou si le journal ne la couvre pas entièrement dans la devise cible.
+    """
+    from historical_data_manager import choisir_granularite, load_historical_series
+
+    granularite = choisir_granularite(debut, fin)
+    if granularite == "jour":
+        return None, granularite
+    df, granularite = load_historical_series(debut - timedelta(days=3 * 365), fin, granularite)
+    if df.empty or (df['Devise'].dropna() != target_currency).any():
+        return None, granularite
+    if df['Début'].iloc[0] > pd.Timestamp(debut) or df['Date'].iloc[-1] < pd.Timestamp(fin - timedelta(days=31)):
+        return None, granularite # Journal plus court que la période : recalcul depuis les cours
+    df_valeurs = pd.DataFrame({'Date': df['Date'], 'Valeur Totale': df['Valeur Actuelle'].astype(float)})
+    df_indicateurs = calculer_indicateurs(df_valeurs, PERIODES_PAR_AN[granularite])
+    return df_indicateurs[df_indicateurs['Date'] >= pd.Timestamp(debut)].reset_index(drop=True), granularite
+
+def _trace(df, colonne, nom, couleur, format_valeur=".2f", pointilles=None, **options):
+    return go.Scatter(
+        x=df['Date'], y=df[colonne], mode='lines', name=nom,
+        line=dict(color=couleur, width=1, dash=pointilles),
+        hovertemplate=f'%{{x|%d/%m/%Y}}<br>{nom}: %{{y:{format_valeur}}}<extra></extra>',
+        **options
+    )
+
+def _figure_performance(df, target_currency, granularite="jour"):
+    """Valeur totale (moyennes mobiles, bandes de Bollinger), RSI et MACD sur la période affichée."""
+    fig = make_subplots(rows=3, cols=1, row_heights=[0.6, 0.2, 0.2], shared_xaxes=True,
+                        vertical_spacing=0.05, subplot_titles=["", "", ""])
+    fig.add_trace(_trace(df, 'Valeur Totale', f'Valeur Totale ({target_currency})', '#363636'), row=1, col=1)
+    fig.add_trace(_trace(df, 'MA50', 'MA50', 'orange', pointilles='dash'), row=1, col=1)
+    fig.add_trace(_trace(df, 'MA200', 'MA200', 'green', pointilles='dash'), row=1, col=1)
+    fig.add_trace(_trace(df, 'BB_Upper', 'Bande Supérieure (BB)', '#A9A9A9'), row=1, col=1)
+    fig.add_trace(_trace(df, 'BB_Lower', 'Bande Inférieure (BB)', '#A9A9A9',
+                         fill='tonexty', fillcolor='rgba(169, 169, 169, 0.2)'), row=1, col=1)
+    fig.add_trace(_trace(df, 'BB_SMA20', 'SMA20 (BB)', '#808080', pointilles='dot'), row=1, col=1)
+    fig.add_trace(_trace(df, 'RSI', 'RSI (14)', '#363636'), row=2, col=1)
+    fig.add_hline(y=70, line_dash="dash", line_color="grey", line_width=1, annotation_text="Surachat (70)",
+                  annotation_position="right", row=2, col=1)
+    fig.add_hline(y=30, line_dash="dash", line_color="grey", line_width=1, annotation_text="Survente (30)",
+                  annotation_position="right", row=2, col=1)
+    fig.add_trace(_trace(df, 'MACD', 'MACD', '#363636'), row=3, col=1)
+    fig.add_trace(_trace(df, 'MACD_Signal', 'Signal', '#A49B6D'), row=3, col=1)
+    fig.add_trace(go.Bar(
+        x=df['Date'], y=df['MACD_Hist'], name='Histogramme MACD',
+        marker_color=np.where(df['MACD_Hist'] >= 0, 'green', 'red'),
+        hovertemplate='%{x|%d/%m/%Y}<br>Hist: %{y:.2f}<extra></extra>'
+    ), row=3, col=1)
+    fig.update_layout(
+        height=800, showlegend=True, hovermode="x unified",
+        title=f"Valeur du Portefeuille | par {granularite} en {target_currency}",
+        xaxis_title="", yaxis_title="Valeur", yaxis2_title="RSI", yaxis3_title="MACD", xaxis3_title="",
+        title_x=0.0, margin=dict(t=50, b=50)
+    )
+    fig.update_yaxes(range=[0, 100], row=2, col=1)
+    return fig
+
+def _figure_volatilite(df, window_size, target_volatility):
+    fig = go.Figure()
+    fig.add_trace(_trace(df, 'Volatilité', 'Volatilité Annualisée', '#363636', ".4f"))
+    fig.add_trace(_trace(df, 'Volatilité_MA50', 'MA50 (Volatilité)', 'orange', ".4f", 'dash'))
+    fig.add_trace(_trace(df, 'Volatilité_MA200', 'MA200 (Volatilité)', 'green', ".4f", 'dash'))
+    fig.add_trace(go.Scatter(
+        x=[df['Date'].min(), df['Date'].max()], y=[target_volatility, target_volatility],
+        mode='lines', name='Objectif Volatilité', line=dict(color='red', dash='dot', width=1),
+        hovertemplate='Objectif Volatilité: %{y:.4f}<extra></extra>'
+    ))
+    fig.update_layout(title=f"Volatilité | Fenêtre de {window_size} jours", xaxis_title="",
+                      yaxis_title="Volatilité Annualisée", hovermode="x unified", showlegend=True)
+    return fig
+
+def _figure_z_score(df):
+    fig = go.Figure()
+    fig.add_trace(_trace(df, 'Z-score_70', 'Z-score (70 jours)', '#363636'))
+    fig.add_trace(_trace(df, 'Z-score_36mois', 'Z-score (36 mois)', '#A49B6D'))
+    fig.update_layout(title="Momentum | Z-scores sur 70 jours et 36 mois", xaxis_title="",
+                      yaxis_title="Z-score", hovermode="x unified", showlegend=True)
+    return fig
+
+def _afficher_statistiques_periode(df, target_currency):
+    """Ouverture, plus bas, moyenne, plus haut et clôture de la valeur totale sur la période affichée."""
+    if df.empty:
+        st.warning("⚠️ Aucune donnée disponible pour calculer les indicateurs sur la période sélectionnée.")
+        return
+    valeurs = df['Valeur Totale']
+    open_value, close_value = valeurs.iloc[0], valeurs.iloc[-1]
+    if pd.notna(open_value) and pd.notna(close_value) and open_value != 0:
+        delta_str = f"{((close_value - open_value) / open_value) * 100:+.2f}%"
+    else:
+        delta_str = "N/A"
+    cols = st.columns(5)
+    for col, (libelle, valeur) in zip(cols, [("Ouverture", open_value), ("Plus Bas", valeurs.min()),
+                                            ("Valeur Moyenne", valeurs.mean()), ("Plus Haut", valeurs.max())]):
+        with col:
+            st.metric(label=libelle, value=f"{format_fr(valeur, 0)} {target_currency}")
+    with cols[4]:
+        st.metric(label="Clôture", value=f"{format_fr(close_value, 0)} {target_currency}", delta=delta_str)
+
+# Périodes proposées ; les séries sont toujours calculées sur la plus longue
+PERIODES = {
+    "1W": timedelta(weeks=1), "1M": timedelta(days=30), "3M": timedelta(days=90),
+    "6M": timedelta(days=180), "1Y": timedelta(days=365),
+    "5Y": timedelta(days=365 * 5), "10Y": timedelta(days=365 * 10),
+    "20Y": timedelta(days=365 * 20)
+}
+
+def display_performance_history():
     if "df" not in st.session_state or st.session_state.df is None or st.session_state.df.empty:
         return
-    df_current_portfolio = st.session_state.df.copy()
-    if "Devise" in df_current_portfolio.columns:
-        df_current_portfolio["Devise"] = df_current_portfolio["Devise"].astype(str).str.strip()
-        df_current_portfolio["Devise_Originale"] = df_current_portfolio["Devise"]
-        df_current_portfolio["Facteur_Ajustement_FX"] = 1.0
-        df_current_portfolio.loc[
-            df_current_portfolio["Devise_Originale"].str.strip().str.upper() == "GBP",
-            "Facteur_Ajustement_FX"
-        ] = 0.01
+    chrono = profilage.chronometre("display_performance_history")
+    chrono.etape("Préparation et taux de change")
+    # Table canonique (core.positions) : devises nettoyées et quantités numériques dès le chargement
+    df_current_portfolio = core.positions_canoniques(st.session_state.df)
     target_currency = st.session_state.get("devise_cible", "EUR")
-    devises_uniques_df = df_current_portfolio["Devise"].dropna().unique().tolist()
-    devises_a_fetch = list(set([target_currency] + devises_uniques_df))
     st.session_state.fx_rates = fetch_fx_rates(target_currency)
     fx_rates = st.session_state.fx_rates
     tickers_in_portfolio = sorted(df_current_portfolio['Ticker'].dropna().unique().tolist()) if "Ticker" in df_current_portfolio.columns else []
     if not tickers_in_portfolio:
+        chrono.fin()
         return
-    period_options = {
-        "1W": timedelta(weeks=1), "1M": timedelta(days=30), "3M": timedelta(days=90),
-        "6M": timedelta(days=180), "1Y": timedelta(days=365),
-        "5Y": timedelta(days=365 * 5), "10Y": timedelta(days=365 * 10),
-        "20Y": timedelta(days=365 * 20)
-    }
-    period_labels = list(period_options.keys())
-    current_selected_label = st.session_state.get("selected_ticker_table_period_label", "1Y")
-    if current_selected_label not in period_labels:
-        current_selected_label = "1W"
-    default_period_index = period_labels.index(current_selected_label)
-    selected_label = st.radio(
-        "Sélectionnez une période:",
-        period_labels,
-        index=default_period_index,
-        key="selected_ticker_table_period_radio",
-        horizontal=True
-    )
-    st.session_state.selected_ticker_table_period_label = selected_label
-    selected_period_td = period_options[selected_label]
     end_date_table = datetime.now().date()
-    start_date_table = end_date_table - selected_period_td
+    # Les séries sont calculées sur la période la plus longue (mêmes entrées de cache quel que
+    # soit le choix, voir prechargement.bornes_historique) ; le choix de la période ne fait
+    # ensuite que les découper, dans un fragment (voir _afficher_periode).
+    start_date_table = end_date_table - max(PERIODES.values())
+    chrono.etape("Historiques et conversion")
     with st.spinner("Récupération et conversion des cours..."):
-        all_ticker_data = []
+        valeurs_par_ticker = {}
         fetch_start_date = start_date_table - timedelta(days=3*365)
-        business_days_for_display = pd.bdate_range(start=start_date_table, end=end_date_table)
         all_business_days = pd.bdate_range(start=fetch_start_date, end=end_date_table)
         for ticker in tickers_in_portfolio:
             ticker_devise = target_currency
@@ -119,380 +244,122 @@ def display_performance_history():
             fx_adjustment_factor = 1.0
             ticker_row = df_current_portfolio[df_current_portfolio["Ticker"] == ticker]
             if not ticker_row.empty:
-                if "Devise_Originale" in ticker_row.columns and pd.notnull(ticker_row["Devise_Originale"].iloc[0]):
-                    ticker_devise = str(ticker_row["Devise_Originale"].iloc[0]).strip().upper()
+                if pd.notnull(ticker_row["Devise"].iloc[0]):
+                    ticker_devise = ticker_row["Devise"].iloc[0]
                     if ticker_devise == "GBP":
                         fx_adjustment_factor = 0.01
-                        ticker_devise = "GBP"
                 if "Quantité" in ticker_row.columns:
-                    quantity = pd.to_numeric(ticker_row["Quantité"], errors='coerce').iloc[0] or 0.0
+                    quantity = ticker_row["Quantité"].iloc[0]
             data = fetch_stock_history(ticker, fetch_start_date, end_date_table)
             if data.empty:
                 data = pd.Series(0.0, index=all_business_days)
             else:
                 data = data.reindex(all_business_days).ffill().bfill()
-            for date_idx, price in data.items():
-                fx_key = ticker_devise
-                fx_rate_for_date = fx_rates.get(fx_key, 1.0)
-                converted_price, taux_scalar = convertir_valeur_performance(price, ticker_devise, target_currency, fx_rate_for_date, fx_adjustment_factor)
-                all_ticker_data.append({
-                    "Date": date_idx,
-                    "Ticker": ticker,
-                    f"Valeur Actuelle ({target_currency})": converted_price * quantity
-                })
-        df_display_values = pd.DataFrame(all_ticker_data)
+            # Le taux est le même pour toutes les dates : la conversion est linéaire, on calcule
+            # une fois le multiplicateur et on l'applique à toute la série.
+            fx_rate_for_date = fx_rates.get(ticker_devise, 1.0)
+            multiplicateur, _ = convertir_valeur_performance(1.0, ticker_devise, target_currency, fx_rate_for_date, fx_adjustment_factor)
+            valeurs_par_ticker[ticker] = data.astype(float) * multiplicateur * quantity
+        df_display_values = pd.DataFrame(valeurs_par_ticker, index=all_business_days)
+        chrono.etape("Indicateurs")
         if not df_display_values.empty:
-            df_total_daily_value = df_display_values.groupby('Date')[f"Valeur Actuelle ({target_currency})"].sum().reset_index()
-            df_total_daily_value.columns = ['Date', 'Valeur Totale']
-            df_total_daily_value['Date'] = pd.to_datetime(df_total_daily_value['Date'])
-            df_total_daily_value = df_total_daily_value.sort_values('Date')
-            df_total_daily_value['MA50'] = df_total_daily_value['Valeur Totale'].rolling(window=50, min_periods=1).mean()
-            df_total_daily_value['MA200'] = df_total_daily_value['Valeur Totale'].rolling(window=200, min_periods=1).mean()
-            df_total_daily_value['RSI'] = calculate_rsi(df_total_daily_value['Valeur Totale'], periods=14)
-            df_total_daily_value['MACD'], df_total_daily_value['MACD_Signal'], df_total_daily_value['MACD_Hist'] = calculate_macd(
-                df_total_daily_value['Valeur Totale'], fast_period=12, slow_period=26, signal_period=9
-            )
-            # Calcul des bandes de Bollinger
-            df_total_daily_value['BB_SMA20'], df_total_daily_value['BB_Upper'], df_total_daily_value['BB_Lower'] = calculate_bollinger_bands(
-                df_total_daily_value['Valeur Totale'], periods=20, num_std=2
-            )
+            df_total_daily_value = pd.DataFrame({
+                'Date': pd.to_datetime(df_display_values.index),
+                'Valeur Totale': df_display_values.sum(axis=1).to_numpy()
+            })
+            df_total_daily_value = df_total_daily_value.sort_values('Date').reset_index(drop=True)
+            df_total_daily_value = calculer_indicateurs(df_total_daily_value)
             min_date = df_total_daily_value['Date'].min()
             if pd.notna(min_date) and min_date > pd.Timestamp(end_date_table - timedelta(days=200)):
                 st.warning("⚠️ Données historiques insuffisantes pour calculer MA200 sur l'ensemble de la période. Essayez une période plus récente ou vérifiez les données des tickers.")
-            df_total_daily_value_display = df_total_daily_value[
-                (df_total_daily_value['Date'] >= pd.Timestamp(start_date_table)) &
-                (df_total_daily_value['Date'] <= pd.Timestamp(end_date_table))
-            ]
-            # st.markdown("---")
-            st.markdown("#### Performance du Portefeuille")
-            fig_total = make_subplots(
-                rows=3, cols=1,
-                row_heights=[0.6, 0.2, 0.2],
-                shared_xaxes=True,
-                vertical_spacing=0.05,
-                subplot_titles=["", "", ""]
-            )
-            fig_total.add_trace(
-                go.Scatter(
-                    x=df_total_daily_value_display['Date'],
-                    y=df_total_daily_value_display['Valeur Totale'],
-                    mode='lines',
-                    name=f'Valeur Totale ({target_currency})',
-                    line=dict(color='#363636', width=1),
-                    hovertemplate='%{x|%d/%m/%Y}<br>Valeur: %{y:.2f}<extra></extra>'
-                ),
-                row=1, col=1
-            )
-            fig_total.add_trace(
-                go.Scatter(
-                    x=df_total_daily_value_display['Date'],
-                    y=df_total_daily_value_display['MA50'],
-                    mode='lines',
-                    name='MA50',
-                    line=dict(color='orange', dash='dash', width=1),
-                    hovertemplate='%{x|%d/%m/%Y}<br>MA50: %{y:.2f}<extra></extra>'
-                ),
-                row=1, col=1
-            )
-            fig_total.add_trace(
-                go.Scatter(
-                    x=df_total_daily_value_display['Date'],
-                    y=df_total_daily_value_display['MA200'],
-                    mode='lines',
-                    name='MA200',
-                    line=dict(color='green', dash='dash', width=1),
-                    hovertemplate='%{x|%d/%m/%Y}<br>MA200: %{y:.2f}<extra></extra>'
-                ),
-                row=1, col=1
-            )
-            # Ajout des bandes de Bollinger
-            fig_total.add_trace(
-                go.Scatter(
-                    x=df_total_daily_value_display['Date'],
-                    y=df_total_daily_value_display['BB_Upper'],
-                    mode='lines',
-                    name='Bande Supérieure (BB)',
-                    line=dict(color='#A9A9A9', width=1),
-                    hovertemplate='%{x|%d/%m/%Y}<br>Bande Sup: %{y:.2f}<extra></extra>'
-                ),
-                row=1, col=1
-            )
-            fig_total.add_trace(
-                go.Scatter(
-                    x=df_total_daily_value_display['Date'],
-                    y=df_total_daily_value_display['BB_Lower'],
-                    mode='lines',
-                    name='Bande Inférieure (BB)',
-                    line=dict(color='#A9A9A9', width=1),
-                    fill='tonexty',  # Remplissage entre les bandes
-                    fillcolor='rgba(169, 169, 169, 0.2)',  # Gris semi-transparent
-                    hovertemplate='%{x|%d/%m/%Y}<br>Bande Inf: %{y:.2f}<extra></extra>'
-                ),
-                row=1, col=1
-            )
-            fig_total.add_trace(
-                go.Scatter(
-                    x=df_total_daily_value_display['Date'],
-                    y=df_total_daily_value_display['BB_SMA20'],
-                    mode='lines',
-                    name='SMA20 (BB)',
-                    line=dict(color='#808080', width=1, dash='dot'),
-                    hovertemplate='%{x|%d/%m/%Y}<br>SMA20: %{y:.2f}<extra></extra>'
-                ),
-                row=1, col=1
-            )
-            fig_total.add_trace(
-                go.Scatter(
-                    x=df_total_daily_value_display['Date'],
-                    y=df_total_daily_value_display['RSI'],
-                    mode='lines',
-                    name='RSI (14)',
-                    line=dict(color='#363636', width=1),
-                    hovertemplate='%{x|%d/%m/%Y}<br>RSI: %{y:.2f}<extra></extra>'
-                ),
-                row=2, col=1
-            )
-            fig_total.add_hline(
-                y=70, line_dash="dash", line_color="grey", line_width=1, annotation_text="Surachat (70)",
-                annotation_position="right", row=2, col=1
-            )
-            fig_total.add_hline(
-                y=30, line_dash="dash", line_color="grey", line_width=1, annotation_text="Survente (30)",
-                annotation_position="right", row=2, col=1
-            )
-            fig_total.add_trace(
-                go.Scatter(
-                    x=df_total_daily_value_display['Date'],
-                    y=df_total_daily_value_display['MACD'],
-                    mode='lines',
-                    name='MACD',
-                    line=dict(color='#363636', width=1),
-                    hovertemplate='%{x|%d/%m/%Y}<br>MACD: %{y:.2f}<extra></extra>'
-                ),
-                row=3, col=1
-            )
-            fig_total.add_trace(
-                go.Scatter(
-                    x=df_total_daily_value_display['Date'],
-                    y=df_total_daily_value_display['MACD_Signal'],
-                    mode='lines',
-                    name='Signal',
-                    line=dict(color='#A49B6D', width=1),
-                    hovertemplate='%{x|%d/%m/%Y}<br>Signal: %{y:.2f}<extra></extra>'
-                ),
-                row=3, col=1
-            )
-            fig_total.add_trace(
-                go.Bar(
-                    x=df_total_daily_value_display['Date'],
-                    y=df_total_daily_value_display['MACD_Hist'],
-                    name='Histogramme MACD',
-                    marker_color=df_total_daily_value_display['MACD_Hist'].apply(lambda x: 'green' if x >= 0 else 'red'),
-                    hovertemplate='%{x|%d/%m/%Y}<br>Hist: %{y:.2f}<extra></extra>'
-                ),
-                row=3, col=1
-            )
-            fig_total.update_layout(
-                height=800,
-                showlegend=True,
-                hovermode="x unified",
-                title=f"Valeur du Portefeuille | par jour en {target_currency}",
-                xaxis_title="",
-                yaxis_title=f"Valeur",
-                yaxis2_title="RSI",
-                yaxis3_title="MACD",
-                xaxis3_title="",
-                title_x=0.0,
-                margin=dict(t=50, b=50)
-            )
-            fig_total.update_yaxes(range=[0, 100], row=2, col=1)
-            st.plotly_chart(fig_total, use_container_width=True)
-            if not df_total_daily_value_display.empty:
-                high_value = df_total_daily_value_display['Valeur Totale'].max()
-                low_value = df_total_daily_value_display['Valeur Totale'].min()
-                open_value = df_total_daily_value_display.loc[df_total_daily_value_display['Date'] == df_total_daily_value_display['Date'].min(), 'Valeur Totale'].iloc[0] if not df_total_daily_value_display.empty else np.nan
-                mean_value = df_total_daily_value_display['Valeur Totale'].mean()
-                close_value = df_total_daily_value_display.loc[df_total_daily_value_display['Date'] == df_total_daily_value_display['Date'].max(), 'Valeur Totale'].iloc[0] if not df_total_daily_value_display.empty else np.nan
-                if pd.notna(open_value) and pd.notna(close_value) and open_value != 0:
-                    percentage_change = ((close_value - open_value) / open_value) * 100
-                    delta_str = f"{percentage_change:+.2f}%"
-                else:
-                    delta_str = "N/A"
-                cols = st.columns(5)
-                with cols[0]:
-                    st.metric(label="Ouverture", value=f"{format_fr(open_value, 0)} {target_currency}")
-                with cols[1]:
-                    st.metric(label="Plus Bas", value=f"{format_fr(low_value, 0)} {target_currency}")
-                with cols[2]:
-                    st.metric(label="Valeur Moyenne", value=f"{format_fr(mean_value, 0)} {target_currency}")
-                with cols[3]:
-                    st.metric(label="Plus Haut", value=f"{format_fr(high_value, 0)} {target_currency}")
-                with cols[4]:
-                    st.metric(label="Clôture", value=f"{format_fr(close_value, 0)} {target_currency}", delta=delta_str)
-            else:
-                st.warning("⚠️ Aucune donnée disponible pour calculer les indicateurs sur la période sélectionnée.")
-
-            # Graphique : Volatilité avec MA50, MA200 et objectif de volatilité
-            # st.markdown("---")
-            # st.markdown("#### Volatilité Quotidienne du Portefeuille")
-            # Utiliser la valeur de target_volatility définie dans parametres.py
-            target_volatility = st.session_state.get("target_volatility", 0.15)
-
-            df_total_daily_value['Rendement Quotidien'] = df_total_daily_value['Valeur Totale'].pct_change()
-            window_size = 20
-            df_total_daily_value['Volatilité'] = df_total_daily_value['Rendement Quotidien'].rolling(window=window_size, min_periods=1).std() * (252**0.5)
-            df_total_daily_value['Volatilité_MA50'] = df_total_daily_value['Volatilité'].rolling(window=50, min_periods=1).mean()
-            df_total_daily_value['Volatilité_MA200'] = df_total_daily_value['Volatilité'].rolling(window=200, min_periods=1).mean()
-
-            if not df_total_daily_value['Volatilité'].dropna().empty:
-                df_volatility_display = df_total_daily_value[
-                    (df_total_daily_value['Date'] >= pd.Timestamp(start_date_table)) &
-                    (df_total_daily_value['Date'] <= pd.Timestamp(end_date_table))
-                ]
-                fig_volatility = go.Figure()
-                fig_volatility.add_trace(go.Scatter(
-                    x=df_volatility_display['Date'],
-                    y=df_volatility_display['Volatilité'],
-                    mode='lines',
-                    name='Volatilité Annualisée',
-                    line=dict(color='#363636', width=1),
-                    hovertemplate='%{x|%d/%m/%Y}<br>Volatilité: %{y:.4f}<extra></extra>'
-                ))
-                fig_volatility.add_trace(go.Scatter(
-                    x=df_volatility_display['Date'],
-                    y=df_volatility_display['Volatilité_MA50'],
-                    mode='lines',
-                    name='MA50 (Volatilité)',
-                    line=dict(color='orange', dash='dash', width=1),
-                    hovertemplate='%{x|%d/%m/%Y}<br>MA50: %{y:.4f}<extra></extra>'
-                ))
-                fig_volatility.add_trace(go.Scatter(
-                    x=df_volatility_display['Date'],
-                    y=df_volatility_display['Volatilité_MA200'],
-                    mode='lines',
-                    name='MA200 (Volatilité)',
-                    line=dict(color='green', dash='dash', width=1),
-                    hovertemplate='%{x|%d/%m/%Y}<br>MA200: %{y:.4f}<extra></extra>'
-                ))
-                fig_volatility.add_trace(go.Scatter(
-                    x=[df_volatility_display['Date'].min(), df_volatility_display['Date'].max()],
-                    y=[target_volatility, target_volatility],
-                    mode='lines',
-                    name='Objectif Volatilité',
-                    line=dict(color='red', dash='dot', width=1),
-                    hovertemplate='Objectif Volatilité: %{y:.4f}<extra></extra>'
-                ))
-                fig_volatility.update_layout(
-                    title=f"Volatilité | Fenêtre de {window_size} jours",
-                    xaxis_title="",
-                    yaxis_title="Volatilité Annualisée",
-                    hovermode="x unified",
-                    showlegend=True
-                )
-                st.plotly_chart(fig_volatility, use_container_width=True)
-
-            # Graphique : Z-score (Momentum) avec Z-score_70 et Z-score_36mois
-            # st.markdown("---")
-            # st.markdown("#### Momentum du Portefeuille")
-            # Calcul du Z-score pour une fenêtre de 70 jours
-            df_total_daily_value['MA_Z_70'] = df_total_daily_value['Valeur Totale'].rolling(window=70, min_periods=1).mean()
-            df_total_daily_value['STD_Z_70'] = df_total_daily_value['Valeur Totale'].rolling(window=70, min_periods=1).std()
-            df_total_daily_value['Z-score_70'] = (
-                (df_total_daily_value['Valeur Totale'] - df_total_daily_value['MA_Z_70']) / 
-                df_total_daily_value['STD_Z_70']
-            ).fillna(0)
-            # Calcul du Z-score pour une fenêtre de 36 mois (~756 jours ouvrables)
-            z_score_36mois_window = 36 * 21  # 21 jours ouvrables par mois
-            df_total_daily_value['MA_Z_36mois'] = df_total_daily_value['Valeur Totale'].rolling(window=z_score_36mois_window, min_periods=1).mean()
-            df_total_daily_value['STD_Z_36mois'] = df_total_daily_value['Valeur Totale'].rolling(window=z_score_36mois_window, min_periods=1).std()
-            df_total_daily_value['Z-score_36mois'] = (
-                (df_total_daily_value['Valeur Totale'] - df_total_daily_value['MA_Z_36mois']) / 
-                df_total_daily_value['STD_Z_36mois']
-            ).fillna(0)
-
-            # Vérifier si les données couvrent au moins 36 mois
-            min_date_z = df_total_daily_value['Date'].min()
-            if pd.notna(min_date_z) and min_date_z > pd.Timestamp(end_date_table - timedelta(days=3*365)):
+            if pd.notna(min_date) and min_date > pd.Timestamp(end_date_table - timedelta(days=3*365)):
                 st.warning("⚠️ Données historiques insuffisantes pour calculer le Z-score sur 36 mois. Essayez une période plus récente ou vérifiez les données des tickers.")
 
-            if not df_total_daily_value['Z-score_70'].dropna().empty and not df_total_daily_value['Z-score_36mois'].dropna().empty:
-                df_z_score_display = df_total_daily_value[
-                    (df_total_daily_value['Date'] >= pd.Timestamp(start_date_table)) &
-                    (df_total_daily_value['Date'] <= pd.Timestamp(end_date_table))
-                ]
-                fig_z_score = go.Figure()
-                fig_z_score.add_trace(go.Scatter(
-                    x=df_z_score_display['Date'],
-                    y=df_z_score_display['Z-score_70'],
-                    mode='lines',
-                    name='Z-score (70 jours)',
-                    line=dict(color='#363636', width=1),
-                    hovertemplate='%{x|%d/%m/%Y}<br>Z-score (70 jours): %{y:.2f}<extra></extra>'
-                ))
-                fig_z_score.add_trace(go.Scatter(
-                    x=df_z_score_display['Date'],
-                    y=df_z_score_display['Z-score_36mois'],
-                    mode='lines',
-                    name='Z-score (36 mois)',
-                    line=dict(color='#A49B6D', width=1),
-                    hovertemplate='%{x|%d/%m/%Y}<br>Z-score (36 mois): %{y:.2f}<extra></extra>'
-                ))
-                fig_z_score.update_layout(
-                    title="Momentum | Z-scores sur 70 jours et 36 mois",
-                    xaxis_title="",
-                    yaxis_title="Z-score",
-                    hovermode="x unified",
-                    showlegend=True
-                )
-                st.plotly_chart(fig_z_score, use_container_width=True)
+            chrono.etape("Rendu de la période")
+            _afficher_periode(df_total_daily_value, df_display_values, target_currency, end_date_table)
+    chrono.fin()
 
-                # Ajout des indicateurs Signal, Action, Justification
-                latest_z_score = df_z_score_display[df_z_score_display['Date'] == df_z_score_display['Date'].max()]
-                if not latest_z_score.empty:
-                    z_score_70 = latest_z_score['Z-score_70'].iloc[0]
-                    z_score_36mois = latest_z_score['Z-score_36mois'].iloc[0]
+@st.fragment
+def _afficher_periode(df_total_daily_value, df_display_values, target_currency, end_date_table):
+    """
+    Sélecteur de période, graphiques, signal et tableau par ticker. Fragment : changer de période
+    ne réexécute que cette fonction sur les séries déjà calculées, pas l'application entière.
+    """
+    period_labels = list(PERIODES.keys())
+    current_selected_label = st.session_state.get("selected_ticker_table_period_label", "1Y")
+    if current_selected_label not in period_labels:
+        current_selected_label = "1W"
+    selected_label = st.radio(
+        "Sélectionnez une période:",
+        period_labels,
+        index=period_labels.index(current_selected_label),
+        key="selected_ticker_table_period_radio",
+        horizontal=True
+    )
+    st.session_state.selected_ticker_table_period_label = selected_label
+    start_date_selection = end_date_table - PERIODES[selected_label]
+
+    target_volatility = st.session_state.get("target_volatility", 0.15)
+    # Périodes longues : valeurs du journal lues dans la table hebdomadaire ou mensuelle
+    df_total_daily_value_display, granularite = serie_agregee(start_date_selection, end_date_table, target_currency)
+    if df_total_daily_value_display is None:
+        df_total_daily_value_display = df_total_daily_value[
+            (df_total_daily_value['Date'] >= pd.Timestamp(start_date_selection)) &
+            (df_total_daily_value['Date'] <= pd.Timestamp(end_date_table))
+        ]
+        if granularite != "jour":
+            st.caption("Journal incomplet sur cette période : valeurs recalculées chaque jour depuis les cours, aux quantités actuelles.")
+    else:
+        st.caption(f"Valeurs enregistrées par le journal, agrégées par {granularite} (fenêtres des indicateurs converties).")
+    st.markdown("#### Performance du Portefeuille")
+    st.plotly_chart(_figure_performance(df_total_daily_value_display, target_currency, granularite), use_container_width=True)
+    _afficher_statistiques_periode(df_total_daily_value_display, target_currency)
+    if not df_total_daily_value_display['Volatilité'].dropna().empty:
+        st.plotly_chart(_figure_volatilite(df_total_daily_value_display, FENETRE_VOLATILITE, target_volatility), use_container_width=True)
+    if not df_total_daily_value_display['Z-score_70'].dropna().empty and not df_total_daily_value_display['Z-score_36mois'].dropna().empty:
+        st.plotly_chart(_figure_z_score(df_total_daily_value_display), use_container_width=True)
 
-                    # Déterminer le Signal
-                    if z_score_70 > 1 and z_score_36mois > 0:
-                        signal = "Haussier"
-                        action = "Acheter"
-                        justification = "Court terme fort avec tendance long terme positive"
-                    elif z_score_70 < -1 and z_score_36mois < 0:
-                        signal = "Baissier"
-                        action = "Vendre"
-                        justification = "Court terme faible avec tendance long terme négative"
-                    else:
-                        signal = "Neutre"
-                        action = "Conserver"
-                        justification = "Pas d'alignement clair pour une action décisive"
+    # Ajout des indicateurs Signal, Action, Justification (dernière date, indépendante de la période)
+    if not df_total_daily_value_display.empty:
+        latest_z_score = df_total_daily_value_display.iloc[[-1]]
+        z_score_70 = latest_z_score['Z-score_70'].iloc[0]
+        z_score_36mois = latest_z_score['Z-score_36mois'].iloc[0]
 
-                    cols = st.columns([1, 1, 3])
-                    with cols[0]:
-                        st.metric(label="Signal", value=signal)
-                    with cols[1]:
-                        st.metric(label="Action", value=action)
-                    with cols[2]:
-                        st.metric(label="Justification", value=justification)
-            else:
-                st.warning("⚠️ Aucune donnée disponible pour calculer les Z-scores sur la période sélectionnée.")
+        # Déterminer le Signal
+        if z_score_70 > 1 and z_score_36mois > 0:
+            signal = "Haussier"
+            action = "Acheter"
+            justification = "Court terme fort avec tendance long terme positive"
+        elif z_score_70 < -1 and z_score_36mois < 0:
+            signal = "Baissier"
+            action = "Vendre"
+            justification = "Court terme faible avec tendance long terme négative"
+        else:
+            signal = "Neutre"
+            action = "Conserver"
+            justification = "Pas d'alignement clair pour une action décisive"
 
-            # Tableau des valeurs actuelles par ticker
-            st.markdown("---")
-            df_pivot_current_value = df_display_values.pivot_table(index="Ticker", columns="Date", values=f"Valeur Actuelle ({target_currency})", dropna=False)
-            df_pivot_current_value = df_pivot_current_value.sort_index(axis=1)
-            df_pivot_current_value = df_pivot_current_value.loc[:, (df_pivot_current_value.columns >= pd.Timestamp(start_date_table)) & (df_pivot_current_value.columns <= pd.Timestamp(end_date_table))]
-            df_pivot_current_value.columns = [f"Valeur Actuelle ({col.strftime('%d/%m/%Y')})" for col in df_pivot_current_value.columns]
-            df_final_display = df_pivot_current_value.reset_index()
+        cols = st.columns([1, 1, 3])
+        with cols[0]:
+            st.metric(label="Signal", value=signal)
+        with cols[1]:
+            st.metric(label="Action", value=action)
+        with cols[2]:
+            st.metric(label="Justification", value=justification)
+    else:
+        st.warning("⚠️ Aucune donnée disponible pour calculer les Z-scores sur la période sélectionnée.")
 
-            sorted_columns = ['Ticker']
-            dates_ordered = sorted(list(set([col.date() for col in df_display_values['Date']])))
-            for d in dates_ordered:
-                date_str = d.strftime('%d/%m/%Y')
-                sorted_columns.append(f"Valeur Actuelle ({date_str})")
-            final_columns_to_display = [col for col in sorted_columns if col in df_final_display.columns]
-            df_final_display = df_final_display[final_columns_to_display]
+    # Tableau des valeurs actuelles par ticker (une colonne par jour de la période choisie)
+    st.markdown("---")
+    df_pivot_current_value = df_display_values.loc[
+        (df_display_values.index >= pd.Timestamp(start_date_selection)) &
+        (df_display_values.index <= pd.Timestamp(end_date_table))
+    ].T.sort_index(axis=1)
+    df_pivot_current_value.columns = [f"Valeur Actuelle ({col.strftime('%d/%m/%Y')})" for col in df_pivot_current_value.columns]
+    df_pivot_current_value.index.name = "Ticker"
+    df_final_display = df_pivot_current_value.reset_index()
 
-            format_dict = {col: lambda x: f"{format_fr(x, 2)} {target_currency}" if pd.notnull(x) else "N/A" for col in df_final_display.columns if "Valeur Actuelle (" in col}
+    format_dict = {col: lambda x: f"{format_fr(x, 2)} {target_currency}" if pd.notnull(x) else "N/A" for col in df_final_display.columns if "Valeur Actuelle (" in col}
 
-            st.markdown(f"#### Valeur Actuelle du Portefeuille | en {target_currency}")
-            st.dataframe(df_final_display.style.format(format_dict), use_container_width=True, hide_index=True)
+    st.markdown(f"#### Valeur Actuelle du Portefeuille | en {target_currency}")
+    st.dataframe(df_final_display.style.format(format_dict), use_container_width=True, hide_index=True)
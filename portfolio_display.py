@@ -8,10 +8,13 @@ import datetime
 import pytz
 
 # Import des fonctions utilitaires
-from utils import safe_escape, format_fr
+from utils import safe_escape, format_fr, afficher_alertes
+import core
+import profilage
 
 # Import des fonctions de récupération de données
 from data_fetcher import fetch_fx_rates, fetch_yahoo_data, fetch_momentum_data
+from reequilibrage import afficher_ordres_reequilibrage
 
 def calculer_reallocation_miniere(df, allocations_reelles, objectifs, colonne_cat="Catégorie", colonne_valeur="Valeur Actuelle"):
     if "Minières" not in allocations_reelles or "Minières" not in objectifs:
@@ -49,127 +52,35 @@ def calculer_reallocation_miniere(df, allocations_reelles, objectifs, colonne_ca
 
 def convertir(val, source_devise, devise_cible, fx_rates_or_scalar, fx_adjustment_factor=1.0):
     """
-    Convertit une valeur d'une devise source vers la devise cible en utilisant les taux de change fournis.
-    Peut accepter un dictionnaire de taux de change (clé: devise source, valeur: taux)
-    ou un taux scalaire direct.
-    Applique également un facteur d'ajustement supplémentaire au taux de change.
+    Convertit une valeur vers la devise cible (voir core.change.convertir) et affiche
+    les éventuels avertissements.
     Retourne la valeur convertie et le taux utilisé (après ajustement).
     """
-    if pd.isnull(val):
-        return np.nan, np.nan  # Retourne NaN pour la valeur et le taux si la valeur est NaN
+    alertes = []
+    resultat = core.convertir(val, source_devise, devise_cible, fx_rates_or_scalar, fx_adjustment_factor, alertes)
+    afficher_alertes(alertes)
+    return resultat
 
-    source_devise = str(source_devise).strip().upper()  # Nettoyer et normaliser
-    devise_cible = str(devise_cible).strip().upper()
-    
-    if source_devise == devise_cible:
-        return val, 1.0  # Si c'est la même devise, pas de conversion, taux = 1.0
-
-    taux_scalar = np.nan
-    if isinstance(fx_rates_or_scalar, dict):
-        # Si c'est un dictionnaire, on cherche le taux par la devise source
-        fx_key = source_devise
-        raw_taux = fx_rates_or_scalar.get(fx_key)
-        try:
-            taux_scalar = float(raw_taux)
-        except (TypeError, ValueError):
-            taux_scalar = np.nan
-    elif isinstance(fx_rates_or_scalar, (float, int, np.floating, np.integer)):
-        # Si c'est un scalaire, on l'utilise directement
-        taux_scalar = float(fx_rates_or_scalar)
-    else:
-        st.warning(f"Type de taux de change inattendu: {type(fx_rates_or_scalar)}. Utilisation de 1.0.")
-        taux_scalar = 1.0  # Valeur par défaut si le type est inattendu
-
-    if pd.isna(taux_scalar) or taux_scalar == 0:
-        st.warning(f"Pas de conversion pour {source_devise} vers {devise_cible}: taux manquant ou invalide ({taux_scalar}).")
-        return val, np.nan  # Retourne la valeur originale et un taux NaN
-    
-    # Appliquer le facteur d'ajustement au taux de change
-    if pd.notnull(fx_adjustment_factor) and fx_adjustment_factor != 0:
-        taux_scalar /= fx_adjustment_factor
-        
-    return val * taux_scalar, taux_scalar  # Retourne la valeur convertie ET le taux utilisé
-
-def afficher_portefeuille():
+def calculer_portefeuille():
     """
-    Affiche le portefeuille de l'utilisateur, gère les calculs et l'affichage.
-    Récupère les données externes via des fonctions dédiées.
-    Retourne les totaux convertis pour la synthèse.
+    Calcule la valorisation du portefeuille (cours, momentum, conversions, totaux) sans rien afficher
+    d'autre que les alertes. Le calcul est fait par core.valoriser_portefeuille ; cette fonction
+    fournit les taux et les cotations depuis la session (et leurs caches).
+    Utilisé par afficher_portefeuille et par la synthèse lorsque l'onglet Portefeuille
+    n'a pas encore été ouvert.
+    Retourne le DataFrame enrichi et les totaux convertis, ou (None, None, None, None, None).
     """
     if "df" not in st.session_state or st.session_state.df is None or st.session_state.df.empty:
-        st.warning("Aucune donnée de portefeuille n’a encore été importée.")
-        return None, None, None, None
+        return None, None, None, None, None
 
-    df = st.session_state.df.copy()
-
-    # Assurez-vous que 'LT' est renommé en 'Objectif_LT'
-    if "LT" in df.columns and "Objectif_LT" not in df.columns:
-        df.rename(columns={"LT": "Objectif_LT"}, inplace=True)
-    
+    df = st.session_state.df
     devise_cible = st.session_state.get("devise_cible", "EUR")
-    
-    # --- Étape 1 : récupérer les devises sans les upper pour ne pas écraser "GBp" ---
+
+    chrono = profilage.chronometre("calculer_portefeuille")
+    chrono.etape("Taux de change")
     if "fx_rates" not in st.session_state or st.session_state.fx_rates is None:
-        devises_uniques_df = df["Devise"].dropna().astype(str).str.strip().unique().tolist() if "Devise" in df.columns else []
-    
-        # --- Étape 2 : créer la version upper uniquement pour la requête des taux ---
-        devises_uppercase = [d.upper() for d in devises_uniques_df]
-        devises_a_fetch = list(set([devise_cible.upper()] + devises_uppercase))
-    
-        # --- Étape 3 : récupérer les taux ---
         st.session_state.fx_rates = fetch_fx_rates(devise_cible)
-    
-    fx_rates = st.session_state.fx_rates
-    
-    # --- Vérification des taux manquants (on utilise ici les uppercase uniquement pour la vérification) ---
-    devises_utilisees_upper = df["Devise"].dropna().astype(str).str.strip().str.upper().unique().tolist() if "Devise" in df.columns else []
-    missing_rates = [
-        devise for devise in devises_utilisees_upper
-        if fx_rates.get(devise) is None and devise != devise_cible.upper()
-    ]
-    
-    if missing_rates:
-        st.warning(
-            f"Taux de change manquants pour les devises : {', '.join(missing_rates)}. "
-            f"Les valeurs ne seront pas converties pour ces devises."
-        )
-
-
-    # Nettoyage et migration des colonnes numériques
-    for col in ["Quantité", "Acquisition", "Objectif_LT"]:
-        if col in df.columns:
-            df[col] = df[col].astype(str).str.replace(" ", "", regex=False).str.replace(",", ".", regex=False)
-            df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0)
 
-    # Lecture et traitement de la colonne 'H' pour le facteur d'ajustement FX
-    if "H" in df.columns:
-        df["Facteur_Ajustement_FX"] = df["H"].astype(str).str.replace(" ", "", regex=False).str.replace(",", ".", regex=False)
-        df["Facteur_Ajustement_FX"] = pd.to_numeric(df["Facteur_Ajustement_FX"], errors="coerce").fillna(1.0)
-    else:
-        df["Facteur_Ajustement_FX"] = 1.0
-
-    # Nettoyage de la colonne Devise
-    if "Devise" in df.columns:
-        df["Devise"] = df["Devise"].astype(str).str.strip().str.upper().fillna(devise_cible)
-    else:
-        st.error("Colonne 'Devise' absente. Utilisation de la devise cible par défaut.")
-        df["Devise"] = devise_cible
-
-    # GESTION DE LA COLONNE 'CATÉGORIES'
-    if "Categories" in df.columns:  
-        df["Catégories"] = df["Categories"].astype(str).fillna("").str.strip()  
-        df["Catégories"] = df["Catégories"].replace("", np.nan).fillna("Non classé")
-    elif any(col.strip().lower() in ["categories", "catégorie", "category"] for col in df.columns):
-        cat_col = next(col for col in df.columns if col.strip().lower() in ["categories", "catégorie", "category"])
-        df["Catégories"] = df[cat_col].astype(str).fillna("").str.strip()
-        df["Catégories"] = df["Catégories"].replace("", np.nan).fillna("Non classé")
-    else:
-        st.warning("ATTENTION: Aucune colonne 'Categories' ou équivalente introuvable. 'Catégories' sera 'Non classé'.")
-        df["Catégories"] = "Non classé"
-
-    # Déterminer la colonne Ticker
-    ticker_col = "Ticker" if "Ticker" in df.columns else "Tickers" if "Tickers" in df.columns else None
-    
     # Initialisation des caches
     if "ticker_data_cache" not in st.session_state:
         st.session_state.ticker_data_cache = {}
@@ -177,9 +88,10 @@ def afficher_portefeuille():
         st.session_state.momentum_results_cache = {}
 
     # Récupération des données pour chaque ticker
+    chrono.etape("Cours et momentum")
+    ticker_col = core.colonne_ticker(df)
     if ticker_col and not df[ticker_col].dropna().empty:
-        unique_tickers = df[ticker_col].dropna().unique()
-        for ticker in unique_tickers:
+        for ticker in df[ticker_col].dropna().unique():
             if ticker not in st.session_state.ticker_data_cache:
                 st.session_state.ticker_data_cache[ticker] = fetch_yahoo_data(ticker)
             if ticker not in st.session_state.momentum_results_cache:
@@ -194,65 +106,36 @@ def afficher_portefeuille():
         except pytz.UnknownTimeZoneError:
             st.warning("Erreur de fuseau horaire 'Europe/Paris'. Affichage en UTC.")
             st.session_state["last_yfinance_update"] = datetime.datetime.now().strftime("%d/%m/%Y à %H:%M:%S")
-        
-        df["shortName"] = df[ticker_col].map(lambda t: st.session_state.ticker_data_cache.get(t, {}).get("shortName", f"https://finance.yahoo.com/quote/{t}"))
-        df["currentPrice"] = df[ticker_col].map(lambda t: st.session_state.ticker_data_cache.get(t, {}).get("currentPrice", np.nan))
-        df["fiftyTwoWeekHigh"] = df[ticker_col].map(lambda t: st.session_state.ticker_data_cache.get(t, {}).get("fiftyTwoWeekHigh", np.nan))
-
-        df["Momentum (%)"] = df[ticker_col].map(lambda t: st.session_state.momentum_results_cache.get(t, {}).get("Momentum (%)", np.nan))
-        df["Z-Score"] = df[ticker_col].map(lambda t: st.session_state.momentum_results_cache.get(t, {}).get("Z-Score", np.nan))
-        df["Signal"] = df[ticker_col].map(lambda t: st.session_state.momentum_results_cache.get(t, {}).get("Action", ""))
-        df["Action"] = df[ticker_col].map(lambda t: st.session_state.momentum_results_cache.get(t, {}).get("Action", ""))
-        df["Justification"] = df[ticker_col].map(lambda t: st.session_state.momentum_results_cache.get(t, {}).get("Justification", ""))
-    else:
-        df["shortName"] = ""
-        df["currentPrice"] = np.nan
-        df["fiftyTwoWeekHigh"] = np.nan
-        df["Momentum (%)"] = np.nan
-        df["Z-Score"] = np.nan
-        df["Signal"] = ""
-        df["Action"] = ""
-        df["Justification"] = ""
-
-    # Calcul des valeurs du portefeuille
-    df["Valeur Acquisition"] = df["Quantité"] * df["Acquisition"]
-    df["Valeur_H52"] = df["Quantité"] * df["fiftyTwoWeekHigh"]
-    df["Valeur_Actuelle"] = df["Quantité"] * df["currentPrice"]
-    df["Valeur_LT"] = df["Quantité"] * df["Objectif_LT"]
-
-    # Conversion des valeurs à la devise cible
-    df[['Valeur_conv', 'Taux_FX_Acquisition']] = df.apply(
-        lambda x: convertir(x["Valeur Acquisition"], x["Devise"], devise_cible, fx_rates, x["Facteur_Ajustement_FX"]), 
-        axis=1, result_type='expand'
-    )
-    df[['Valeur_Actuelle_conv', 'Taux_FX_Actuel']] = df.apply(
-        lambda x: convertir(x["Valeur_Actuelle"], x["Devise"], devise_cible, fx_rates, x["Facteur_Ajustement_FX"]), 
-        axis=1, result_type='expand'
-    )
-    df[['Valeur_H52_conv', 'Taux_FX_H52']] = df.apply(
-        lambda x: convertir(x["Valeur_H52"], x["Devise"], devise_cible, fx_rates, x["Facteur_Ajustement_FX"]), 
-        axis=1, result_type='expand'
-    )
-    df[['Valeur_LT_conv', 'Taux_FX_LT']] = df.apply(
-        lambda x: convertir(x["Valeur_LT"], x["Devise"], devise_cible, fx_rates, x["Facteur_Ajustement_FX"]), 
-        axis=1, result_type='expand'
-    )
 
-    # Calcul des totaux pour la synthèse
-    total_valeur = pd.to_numeric(df["Valeur_conv"], errors='coerce').sum(skipna=True)
-    total_actuelle = pd.to_numeric(df["Valeur_Actuelle_conv"], errors='coerce').sum(skipna=True)
-    total_h52 = pd.to_numeric(df["Valeur_H52_conv"], errors='coerce').sum(skipna=True)
-    total_lt = pd.to_numeric(df["Valeur_LT_conv"], errors='coerce').sum(skipna=True)
-
-    # Calcul Gain/Perte
-    df['Gain/Perte'] = df['Valeur_Actuelle_conv'] - df['Valeur_conv']
-    df['Gain/Perte (%)'] = np.where(
-        df['Valeur_conv'] != 0,
-        (df['Gain/Perte'] / df['Valeur_conv']) * 100,
-        0
+    chrono.etape("Valorisation (core)")
+    valorisation = core.valoriser_portefeuille(
+        df, devise_cible, st.session_state.fx_rates,
+        cotations=st.session_state.ticker_data_cache,
+        momentums=st.session_state.momentum_results_cache,
     )
+    afficher_alertes(valorisation.alertes)
+    chrono.fin()
+    return (valorisation.positions, *valorisation.totaux())
+
+def afficher_portefeuille():
+    """
+    Affiche le portefeuille de l'utilisateur, gère les calculs et l'affichage.
+    Récupère les données externes via des fonctions dédiées.
+    Retourne les totaux convertis pour la synthèse.
+    """
+    chrono = profilage.chronometre("afficher_portefeuille")
+    chrono.etape("Calcul")
+    df, total_valeur, total_actuelle, total_h52, total_lt = calculer_portefeuille()
+    if df is None:
+        chrono.fin()
+        st.warning("Aucune donnée de portefeuille n’a encore été importée.")
+        return None, None, None, None
+
+    devise_cible = st.session_state.get("devise_cible", "EUR")
+    ticker_col = "Ticker" if "Ticker" in df.columns else "Tickers" if "Tickers" in df.columns else None
 
     # Formatage des colonnes pour l'affichage
+    chrono.etape("Formatage")
     # Les colonnes avec "_fmt" seront celles affichées dans le dataframe final
     for col_name, dec_places in [
         ("Quantité", 0), ("Acquisition", 4), ("currentPrice", 4),
@@ -286,6 +169,7 @@ def afficher_portefeuille():
                 df[f"{col_name}_fmt"] = df[col_name].apply(lambda x: f"{format_fr(x, dec_places)}" if pd.notnull(x) else "")
 
     # Définition des colonnes à afficher et de leurs libellés
+    chrono.etape("Colonnes et styles")
     cols = [
         ticker_col, "shortName", "Catégories", "Devise", 
         "Quantité_fmt", "Acquisition_fmt", 
@@ -331,6 +215,7 @@ def afficher_portefeuille():
             existing_labels.append(labels[i])
 
     if not existing_cols_in_df:
+        chrono.fin()
         st.warning("Aucune colonne de données valide à afficher.")
         return total_valeur, total_actuelle, total_h52, total_lt
 
@@ -414,6 +299,7 @@ def afficher_portefeuille():
                 }}
             """
 
+    chrono.etape("Rendu HTML et tableau")
     st.markdown(f"""
         <style>
             {css_alignments}
@@ -425,6 +311,7 @@ def afficher_portefeuille():
     st.dataframe(df_disp.style.format(filtered_format_dict_portfolio), use_container_width=True, hide_index=True)
 
     st.session_state.df = df  
+    chrono.fin()
 
     return total_valeur, total_actuelle, total_h52, total_lt
 
@@ -501,7 +388,7 @@ def afficher_synthese_globale(total_valeur, total_actuelle, total_h52, total_lt)
         df['Valeur_Actuelle_conv'] = pd.to_numeric(df['Valeur_Actuelle_conv'], errors='coerce').fillna(0)
         
         # Regroupe par la colonne "Catégories"
-        category_values = df.groupby('Catégories')['Valeur_Actuelle_conv'].sum()
+        category_values = df.groupby('Catégories', observed=True)['Valeur_Actuelle_conv'].sum()
         
         # Calcul de la base pour l'objectif
         current_minieres_value = category_values.get("Minières", 0.0)
@@ -585,5 +472,8 @@ def afficher_synthese_globale(total_valeur, total_actuelle, total_h52, total_lt)
         # Affichage du tableau de répartition
         st.dataframe(df_disp_cat.style.format(filtered_format_dict_category), use_container_width=True, hide_index=True)
 
+        # Traduction des objectifs en ordres en titres entiers
+        afficher_ordres_reequilibrage(df, devise_cible)
+
     else:
         st.info("Aucune donnée de portefeuille chargée pour calculer la répartition par catégories.")
@@ -1,18 +1,33 @@
 import pandas as pd
-from datetime import datetime, date
-from sqlalchemy import create_engine, Column, Integer, String, Date, Text
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.ext.declarative import declarative_base
+from datetime import datetime, date, timedelta
+from sqlalchemy import Column, Integer, String, Date, Text, Float, Boolean, UniqueConstraint, exists, insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 import json
 import os
 
-# Configuration de la base de données SQLite
-DATABASE_URL = "sqlite:///portfolio.db"
-Engine = create_engine(DATABASE_URL)
-Session = sessionmaker(bind=Engine)
-Base = declarative_base()
+# Base de données SQLite partagée (moteur, pragmas et pool : voir storage.py)
+from storage import Base, Session, get_engine, initialiser_tables
+from profilage import fonction_chronometree
+from core.metriques import DUREE_ECRITURE_JOURNAL, ERREURS_ECRITURE_JOURNAL
+
+# Colonnes du portefeuille conservées dans le journal (colonne DataFrame -> colonne SQL des événements)
+COLONNES_JOURNAL = {
+    "Quantité": "quantite",
+    "Acquisition": "acquisition",
+    "Devise": "devise",
+    "Catégorie": "categorie",
+    "Objectif_LT": "objectif_lt",
+}
+COLONNES_NUMERIQUES = ["Quantité", "Acquisition", "Objectif_LT"]
+COLONNES_ETAT = ["Ticker"] + list(COLONNES_JOURNAL)
+
+# Un snapshot complet (checkpoint) est écrit au plus tard tous les N jours ; les autres jours
+# ne stockent que les positions modifiées dans portfolio_position_events.
+INTERVALLE_CHECKPOINT_JOURS = 30
 
 # Définition du modèle de données pour les snapshots du portefeuille
+# Une ligne par date de snapshot : portfolio_data_json n'est renseigné que pour les checkpoints
+# (NULL les autres jours, l'état étant reconstruit à partir du dernier checkpoint et des événements).
 class PortfolioSnapshot(Base):
     __tablename__ = 'portfolio_snapshots'
     id = Column(Integer, primary_key=True, autoincrement=True)
@@ -23,92 +38,475 @@ class PortfolioSnapshot(Base):
     def __repr__(self):
         return f"<PortfolioSnapshot(date='{self.snapshot_date}', currency='{self.target_currency}')>"
 
-# Assure-toi que les tables sont créées (à appeler une seule fois au démarrage de l'app ou lors de l'initialisation)
-def initialize_portfolio_journal_db():
-    Base.metadata.create_all(Engine)
+# Événements de position : une ligne par (date, ticker) seulement quand la position change
+class PortfolioPositionEvent(Base):
+    __tablename__ = 'portfolio_position_events'
+    __table_args__ = (UniqueConstraint('event_date', 'ticker', 'rang', name='uq_position_event'),)
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    event_date = Column(Date, nullable=False)
+    ticker = Column(String, nullable=False)
+    rang = Column(Integer, nullable=False, default=0) # Occurrence du ticker s'il apparaît sur plusieurs lignes
+    quantite = Column(Float)
+    acquisition = Column(Float)
+    devise = Column(String)
+    categorie = Column(String)
+    objectif_lt = Column(Float)
+    supprime = Column(Boolean, nullable=False, default=False) # Position sortie du portefeuille
 
-# Appelle l'initialisation de la base de données
-initialize_portfolio_journal_db()
+    def __repr__(self):
+        return f"<PortfolioPositionEvent(date='{self.event_date}', ticker='{self.ticker}', supprime={self.supprime})>"
+
+_moteur_initialise = None
 
-def save_portfolio_snapshot(snapshot_date, df_portfolio_state, target_currency):
+def initialize_portfolio_journal_db():
     """
-    Sauvegarde un snapshot complet de l'état du portefeuille pour une date donnée dans la base de données SQLite.
-    Le DataFrame est converti en JSON pour le stockage.
+    Crée les tables de ce module au premier accès à la base partagée, et non plus à l'import du module.
+    Les appels suivants ne font rien.
     """
-    if df_portfolio_state is None or df_portfolio_state.empty:
-        print(f"DEBUG: df_portfolio_state est vide ou None pour la date {snapshot_date}. Rien à sauvegarder.")
-        return
+    global _moteur_initialise
+    engine = get_engine()
+    if _moteur_initialise is not engine:
+        initialiser_tables(PortfolioSnapshot, PortfolioPositionEvent)
+        _moteur_initialise = engine
+    return engine
 
-    cols_to_save = [
-        "Ticker", "Quantité", "Acquisition", "Devise", "Catégorie", "Objectif_LT"
-    ]
-    df_save = df_portfolio_state.copy()
-    existing_cols = [col for col in cols_to_save if col in df_save.columns]
-    df_save = df_save[existing_cols]
+def _preparer_portefeuille(df_portfolio_state):
+    """
+    Restreint le portefeuille aux colonnes du journal et normalise les colonnes numériques.
+    Les portefeuilles de la session sont des tables canoniques (core.positions) dont les colonnes
+    numériques sont déjà en float64 : seules les autres sources (journal importé) sont converties.
+    """
+    cols_to_save = ["Ticker"] + list(COLONNES_JOURNAL)
+    existing_cols = [col for col in cols_to_save if col in df_portfolio_state.columns]
+    df_save = df_portfolio_state[existing_cols].copy()
 
-    for col in ["Quantité", "Acquisition", "Objectif_LT"]:
+    for col in COLONNES_NUMERIQUES:
         if col in df_save.columns:
-            df_save[col] = pd.to_numeric(df_save[col], errors='coerce')
+            if df_save[col].dtype != "float64":
+                df_save[col] = pd.to_numeric(df_save[col], errors='coerce')
             df_save[col] = df_save[col].fillna(0)
+    return df_save
+
+
+def _colonnes_etat(df):
+    """
+    Valeurs des colonnes du journal (Ticker puis COLONNES_JOURNAL) sous forme de listes Python,
+    None pour les valeurs manquantes et pour les colonnes absentes.
+    """
+    colonnes = []
+    for col in COLONNES_ETAT:
+        if col in df.columns:
+            serie = df[col]
+            colonnes.append(serie.astype(object).where(serie.notna(), None).tolist())
+        else:
+            colonnes.append([None] * len(df))
+    return colonnes
+
+
+def _lignes_par_cle(df):
+    """
+    Indexe les lignes du portefeuille par (ticker, rang) dans l'ordre du DataFrame.
+    Chaque ligne est un tuple de valeurs (ordre de COLONNES_ETAT) : deux états se comparent
+    directement, ligne à ligne ou en entier.
+    """
+    if df is None or df.empty or "Ticker" not in df.columns:
+        return {}
+    tickers = df["Ticker"].astype(object).where(df["Ticker"].notna(), "").astype(str)
+    rangs = tickers.groupby(tickers).cumcount()
+    return {(t, int(r)): ligne for t, r, ligne in zip(tickers, rangs, zip(*_colonnes_etat(df)))}
 
-    portfolio_data_json = df_save.to_json(orient="records")
 
+def _lignes_par_date(df, dates):
+    """
+    Équivalent de _lignes_par_cle pour un journal de plusieurs jours (une ligne par position et par
+    date) : la normalisation est faite une seule fois sur tout le DataFrame.
+    Retourne {date: {(ticker, rang): ligne}}.
+    """
+    df = _preparer_portefeuille(df)
+    if "Ticker" not in df.columns:
+        return {d: {} for d in pd.unique(dates)}
+    tickers = df["Ticker"].astype(object).where(df["Ticker"].notna(), "").astype(str).to_numpy()
+    rangs = pd.Series(tickers).groupby([pd.Series(dates), pd.Series(tickers)]).cumcount().tolist()
+    etats = {}
+    for d, t, r, ligne in zip(dates, tickers, rangs, zip(*_colonnes_etat(df))):
+        etats.setdefault(d, {})[(t, r)] = ligne
+    return etats
+
+
+def _lignes_vers_dataframe(lignes):
+    """Reconstruit le DataFrame d'un état (les colonnes absentes à la sauvegarde restent absentes)."""
+    if not lignes:
+        return pd.DataFrame()
+    df = pd.DataFrame(list(lignes.values()), columns=COLONNES_ETAT)
+    colonnes = ["Ticker"] + [col for col in COLONNES_JOURNAL if df[col].notna().any()]
+    df = df[colonnes]
+    for col in COLONNES_NUMERIQUES:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+    return df
+
+
+def _lignes_vers_json(lignes):
+    """
+    JSON 'records' d'un état, équivalent à _lignes_vers_dataframe(lignes).to_json(orient="records")
+    sans construire de DataFrame (un checkpoint par mois sur des années d'historique).
+    """
+    valeurs = list(lignes.values())
+    indices = [0] + [k for k in range(1, len(COLONNES_ETAT)) if any(v[k] is not None for v in valeurs)]
+    return json.dumps([{COLONNES_ETAT[k]: v[k] for k in indices} for v in valeurs])
+
+
+def _etat_au(session, date_etat):
+    """
+    Reconstruit l'état du portefeuille à une date : dernier checkpoint <= date, puis application
+    des événements postérieurs au checkpoint, dans l'ordre. Deux requêtes indexées.
+    Retourne un dict {(ticker, rang): ligne}.
+    """
+    checkpoint = (
+        session.query(PortfolioSnapshot.snapshot_date, PortfolioSnapshot.portfolio_data_json)
+        .filter(PortfolioSnapshot.snapshot_date <= date_etat, PortfolioSnapshot.portfolio_data_json.isnot(None))
+        .order_by(PortfolioSnapshot.snapshot_date.desc())
+        .first()
+    )
+    query = session.query(PortfolioPositionEvent).filter(PortfolioPositionEvent.event_date <= date_etat)
+    if checkpoint is not None:
+        lignes = _lignes_par_cle(_portfolio_depuis_json(checkpoint.portfolio_data_json, checkpoint.snapshot_date))
+        query = query.filter(PortfolioPositionEvent.event_date > checkpoint.snapshot_date)
+    else:
+        lignes = {}
+
+    for evenement in query.order_by(PortfolioPositionEvent.event_date, PortfolioPositionEvent.id):
+        cle = (evenement.ticker, evenement.rang)
+        if evenement.supprime:
+            lignes.pop(cle, None)
+        else:
+            lignes[cle] = (evenement.ticker or None,) + tuple(getattr(evenement, attribut) for attribut in COLONNES_JOURNAL.values())
+    return lignes
+
+
+def _evenements(date_evenement, lignes_avant, lignes_apres):
+    """
+    Différence entre deux états, sous forme de lignes de portfolio_position_events :
+    une par position ajoutée ou modifiée, une 'supprime' par position sortie.
+    """
+    if lignes_avant == lignes_apres:
+        # Cas le plus fréquent (aucun mouvement) : une seule comparaison de dicts
+        return []
+    evenements = []
+    for (ticker, rang), ligne in lignes_apres.items():
+        if lignes_avant.get((ticker, rang)) == ligne:
+            continue
+        evenement = {"event_date": date_evenement, "ticker": ticker, "rang": rang, "supprime": False}
+        evenement.update(zip(COLONNES_JOURNAL.values(), ligne[1:]))
+        evenements.append(evenement)
+    for ticker, rang in lignes_avant.keys() - lignes_apres.keys():
+        evenement = {"event_date": date_evenement, "ticker": ticker, "rang": rang, "supprime": True}
+        evenement.update({attribut: None for attribut in COLONNES_JOURNAL.values()})
+        evenements.append(evenement)
+    return evenements
+
+
+def _upsert_snapshots(session, enregistrements):
+    """INSERT ... ON CONFLICT(snapshot_date) DO UPDATE des lignes de snapshot, en une requête préparée."""
+    stmt = sqlite_insert(PortfolioSnapshot)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[PortfolioSnapshot.snapshot_date],
+        set_={"target_currency": stmt.excluded.target_currency,
+              "portfolio_data_json": stmt.excluded.portfolio_data_json}
+    )
+    session.execute(stmt, enregistrements)
+
+
+@fonction_chronometree("journal.save_portfolio_snapshots_bulk")
+@DUREE_ECRITURE_JOURNAL.chronometrer_fonction(operation="snapshots")
+def save_portfolio_snapshots_bulk(df_journal, target_currency, colonne_date="Date",
+                                  intervalle_checkpoint=INTERVALLE_CHECKPOINT_JOURS, lever_erreurs=False):
+    """
+    Sauvegarde en une seule transaction l'état du portefeuille sur de nombreux jours
+    (une ligne par position et par date), au format delta : checkpoints au plus tous les
+    'intervalle_checkpoint' jours, événements pour les positions modifiées d'un jour à l'autre.
+
+    Les snapshots déjà enregistrés dans la période et absents de df_journal sont conservés ;
+    les événements de la période et du premier snapshot suivant sont recalculés pour que
+    chaque état reste reconstructible.
+
+    Avec lever_erreurs=True, un échec est relevé après annulation de la transaction au lieu de
+    retourner 0 (écrivain différé, qui remet alors les écritures en file).
+
+    Returns:
+        int: Nombre de dates enregistrées.
+    """
+    if df_journal is None or df_journal.empty or colonne_date not in df_journal.columns:
+        return 0
+
+    dates = pd.to_datetime(df_journal[colonne_date]).dt.date.to_numpy()
+    etats_saisis = _lignes_par_date(df_journal.drop(columns=[colonne_date]), dates)
+    debut, fin = min(etats_saisis), max(etats_saisis)
+
+    initialize_portfolio_journal_db()
     session = Session()
     try:
-        # Vérifier si un snapshot pour cette date existe déjà
-        existing_snapshot = session.query(PortfolioSnapshot).filter_by(snapshot_date=snapshot_date).first()
-
-        if existing_snapshot:
-            # Mettre à jour l'enregistrement existant
-            existing_snapshot.target_currency = target_currency
-            existing_snapshot.portfolio_data_json = portfolio_data_json
-            print(f"DEBUG: Snapshot du {snapshot_date} mis à jour.")
-        else:
-            # Créer un nouvel enregistrement
-            new_snapshot = PortfolioSnapshot(
-                snapshot_date=snapshot_date,
-                target_currency=target_currency,
-                portfolio_data_json=portfolio_data_json
+        existants = (
+            session.query(PortfolioSnapshot.snapshot_date, PortfolioSnapshot.target_currency,
+                          PortfolioSnapshot.portfolio_data_json.isnot(None).label("checkpoint"))
+            .filter(PortfolioSnapshot.snapshot_date.between(debut, fin))
+            .all()
+        )
+        devises = {d: target_currency for d in etats_saisis}
+        etats = {}
+        for row in existants:
+            if row.snapshot_date not in etats_saisis:
+                etats[row.snapshot_date] = _etat_au(session, row.snapshot_date)
+                devises[row.snapshot_date] = row.target_currency
+        etats.update(etats_saisis)
+        checkpoints_existants = {row.snapshot_date for row in existants if row.checkpoint}
+
+        etat_precedent = _etat_au(session, debut - timedelta(days=1))
+        snapshot_suivant = (
+            session.query(PortfolioSnapshot.snapshot_date)
+            .filter(PortfolioSnapshot.snapshot_date > fin)
+            .order_by(PortfolioSnapshot.snapshot_date)
+            .first()
+        )
+        etat_suivant = _etat_au(session, snapshot_suivant.snapshot_date) if snapshot_suivant else None
+        dernier_checkpoint = (
+            session.query(PortfolioSnapshot.snapshot_date)
+            .filter(PortfolioSnapshot.snapshot_date < debut, PortfolioSnapshot.portfolio_data_json.isnot(None))
+            .order_by(PortfolioSnapshot.snapshot_date.desc())
+            .first()
+        )
+        dernier_checkpoint = dernier_checkpoint.snapshot_date if dernier_checkpoint else None
+
+        snapshots, evenements, nb_checkpoints = [], [], 0
+        for d in sorted(etats):
+            lignes = etats[d]
+            est_checkpoint = (
+                d in checkpoints_existants
+                or dernier_checkpoint is None
+                or (d - dernier_checkpoint).days >= intervalle_checkpoint
             )
-            session.add(new_snapshot)
-            print(f"DEBUG: Nouveau snapshot du {snapshot_date} créé.")
+            if est_checkpoint:
+                dernier_checkpoint = d
+                nb_checkpoints += 1
+            snapshots.append({
+                "snapshot_date": d,
+                "target_currency": devises[d],
+                "portfolio_data_json": _lignes_vers_json(lignes) if est_checkpoint else None,
+            })
+            evenements += _evenements(d, etat_precedent, lignes)
+            etat_precedent = lignes
+
+        evenements_a_remplacer = PortfolioPositionEvent.event_date.between(debut, fin)
+        if snapshot_suivant is not None:
+            evenements += _evenements(snapshot_suivant.snapshot_date, etat_precedent, etat_suivant)
+            evenements_a_remplacer = evenements_a_remplacer | (PortfolioPositionEvent.event_date == snapshot_suivant.snapshot_date)
 
+        session.query(PortfolioPositionEvent).filter(evenements_a_remplacer).delete(synchronize_session=False)
+        _upsert_snapshots(session, snapshots)
+        if evenements:
+            session.execute(insert(PortfolioPositionEvent), evenements)
         session.commit()
+        print(f"DEBUG: {len(snapshots)} snapshot(s) du {debut} au {fin} enregistré(s) "
+              f"({nb_checkpoints} checkpoint(s), {len(evenements)} position(s) modifiée(s)).")
+        return len(snapshots)
     except Exception as e:
         session.rollback()
+        ERREURS_ECRITURE_JOURNAL.inc(operation="snapshots")
         print(f"ERREUR lors de la sauvegarde du snapshot: {e}")
+        if lever_erreurs:
+            raise
+        return 0
+    finally:
+        session.close()
+
+
+@fonction_chronometree("journal.save_portfolio_snapshot")
+def save_portfolio_snapshot(snapshot_date, df_portfolio_state, target_currency,
+                            intervalle_checkpoint=INTERVALLE_CHECKPOINT_JOURS):
+    """
+    Sauvegarde l'état du portefeuille pour une date donnée dans la base de données SQLite.
+    Seules les positions modifiées depuis le snapshot précédent sont écrites (portfolio_position_events) ;
+    un snapshot complet en JSON n'est conservé qu'aux checkpoints (voir save_portfolio_snapshots_bulk).
+    """
+    if df_portfolio_state is None or df_portfolio_state.empty:
+        print(f"DEBUG: df_portfolio_state est vide ou None pour la date {snapshot_date}. Rien à sauvegarder.")
+        return
+    save_portfolio_snapshots_bulk(
+        df_portfolio_state.assign(Date=snapshot_date), target_currency,
+        colonne_date="Date", intervalle_checkpoint=intervalle_checkpoint
+    )
+
+
+@fonction_chronometree("journal.load_portfolio_as_of")
+def load_portfolio_as_of(as_of_date):
+    """
+    Reconstruit l'état du portefeuille à une date quelconque (dernier checkpoint + événements).
+    Retourne un DataFrame (vide si aucun snapshot n'est antérieur à la date).
+    """
+    initialize_portfolio_journal_db()
+    session = Session()
+    try:
+        return _lignes_vers_dataframe(_etat_au(session, as_of_date))
+    except Exception as e:
+        print(f"ERREUR lors de la reconstruction du portefeuille au {as_of_date}: {e}")
+        return pd.DataFrame()
+    finally:
+        session.close()
+
+
+def compacter_journal(intervalle_checkpoint=INTERVALLE_CHECKPOINT_JOURS):
+    """
+    Convertit un journal existant (un JSON complet par jour) au format delta : les états de
+    chaque date sont reconstruits, puis réécrits en checkpoints espacés et événements.
+    Retourne (nombre de checkpoints, nombre d'événements).
+    """
+    initialize_portfolio_journal_db()
+    session = Session()
+    try:
+        snapshots = session.query(PortfolioSnapshot).order_by(PortfolioSnapshot.snapshot_date).all()
+        etats = [_etat_au(session, snapshot.snapshot_date) for snapshot in snapshots]
+
+        session.query(PortfolioPositionEvent).delete()
+        nb_checkpoints = 0
+        evenements = []
+        dernier_checkpoint = None
+        etat_precedent = {}
+        for snapshot, lignes in zip(snapshots, etats):
+            if dernier_checkpoint is None or (snapshot.snapshot_date - dernier_checkpoint).days >= intervalle_checkpoint:
+                snapshot.portfolio_data_json = _lignes_vers_json(lignes)
+                dernier_checkpoint = snapshot.snapshot_date
+                nb_checkpoints += 1
+            else:
+                snapshot.portfolio_data_json = None
+            evenements += _evenements(snapshot.snapshot_date, etat_precedent, lignes)
+            etat_precedent = lignes
+        if evenements:
+            session.execute(insert(PortfolioPositionEvent), evenements)
+        nb_evenements = len(evenements)
+
+        session.commit()
+        print(f"DEBUG: Journal compacté : {nb_checkpoints} checkpoint(s), {nb_evenements} événement(s).")
+        return nb_checkpoints, nb_evenements
+    except Exception as e:
+        session.rollback()
+        print(f"ERREUR lors du compactage du journal: {e}")
+        return 0, 0
     finally:
         session.close()
 
-def load_portfolio_journal():
+def _portfolio_depuis_json(portfolio_data_json, snapshot_date=None):
+    """Désérialise le JSON d'un snapshot en DataFrame (DataFrame vide si absent ou invalide)."""
+    portfolio_df = pd.DataFrame()
+    if portfolio_data_json:
+        try:
+            portfolio_df = pd.DataFrame(json.loads(portfolio_data_json))
+            # Reconverting types might be necessary if JSON serialization changed them
+            for col in ["Quantité", "Acquisition", "Objectif_LT"]:
+                if col in portfolio_df.columns:
+                    portfolio_df[col] = pd.to_numeric(portfolio_df[col], errors='coerce')
+        except json.JSONDecodeError as e:
+            print(f"WARNING: Erreur de décodage JSON pour le snapshot du {snapshot_date}: {e}")
+            portfolio_df = pd.DataFrame() # Retourne un DataFrame vide en cas d'erreur
+    return portfolio_df
+
+
+class EntreeJournal(dict):
+    """
+    Entrée du journal ('date', 'target_currency', 'portfolio_data') dont le DataFrame
+    'portfolio_data' n'est désérialisé qu'au premier accès, puis conservé.
+    """
+
+    def __init__(self, date_entree, target_currency, chargeur):
+        super().__init__(date=date_entree, target_currency=target_currency)
+        self._chargeur = chargeur
+
+    def __missing__(self, key):
+        if key != "portfolio_data":
+            raise KeyError(key)
+        self["portfolio_data"] = self._chargeur()
+        return self["portfolio_data"]
+
+    def __contains__(self, key):
+        return key == "portfolio_data" or super().__contains__(key)
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+
+@fonction_chronometree("journal.has_snapshot_for_date")
+def has_snapshot_for_date(snapshot_date):
+    """
+    Indique si un snapshot existe pour la date donnée.
+    Simple requête EXISTS sur l'index unique de snapshot_date : aucun JSON n'est lu.
+    """
+    initialize_portfolio_journal_db()
+    session = Session()
+    try:
+        return session.query(exists().where(PortfolioSnapshot.snapshot_date == snapshot_date)).scalar()
+    except Exception as e:
+        print(f"ERREUR lors de la vérification du snapshot du {snapshot_date}: {e}")
+        return False
+    finally:
+        session.close()
+
+
+@fonction_chronometree("journal.load_snapshot_dates")
+def load_snapshot_dates(start_date=None, end_date=None):
+    """
+    Retourne la liste triée des dates de snapshot (bornes incluses, optionnelles),
+    sans lire le contenu des snapshots.
+    """
+    initialize_portfolio_journal_db()
+    session = Session()
+    try:
+        query = session.query(PortfolioSnapshot.snapshot_date)
+        if start_date is not None:
+            query = query.filter(PortfolioSnapshot.snapshot_date >= start_date)
+        if end_date is not None:
+            query = query.filter(PortfolioSnapshot.snapshot_date <= end_date)
+        return [row.snapshot_date for row in query.order_by(PortfolioSnapshot.snapshot_date)]
+    except Exception as e:
+        print(f"ERREUR lors du chargement des dates du journal: {e}")
+        return []
+    finally:
+        session.close()
+
+
+@fonction_chronometree("journal.load_portfolio_journal")
+def load_portfolio_journal(start_date=None, end_date=None):
     """
     Charge le journal historique du portefeuille depuis la base de données SQLite.
     Retourne une liste de dictionnaires, chaque dict contenant 'date', 'target_currency' et 'portfolio_data'.
-    'portfolio_data' est un DataFrame Pandas.
+    'portfolio_data' est un DataFrame Pandas, désérialisé seulement au premier accès (voir EntreeJournal).
+
+    Args:
+        start_date (date, optional): Première date incluse.
+        end_date (date, optional): Dernière date incluse.
     """
+    initialize_portfolio_journal_db()
     session = Session()
     try:
-        all_snapshots = session.query(PortfolioSnapshot).order_by(PortfolioSnapshot.snapshot_date).all()
-
-        loaded_data = []
-        for snapshot_obj in all_snapshots:
-            portfolio_df = pd.DataFrame()
-            if snapshot_obj.portfolio_data_json:
-                try:
-                    portfolio_df = pd.DataFrame(json.loads(snapshot_obj.portfolio_data_json))
-                    # Reconverting types might be necessary if JSON serialization changed them
-                    for col in ["Quantité", "Acquisition", "Objectif_LT"]:
-                        if col in portfolio_df.columns:
-                            portfolio_df[col] = pd.to_numeric(portfolio_df[col], errors='coerce')
-                except json.JSONDecodeError as e:
-                    print(f"WARNING: Erreur de décodage JSON pour le snapshot du {snapshot_obj.snapshot_date}: {e}")
-                    portfolio_df = pd.DataFrame() # Retourne un DataFrame vide en cas d'erreur
-
-            loaded_data.append({
-                "date": snapshot_obj.snapshot_date,
-                "target_currency": snapshot_obj.target_currency,
-                "portfolio_data": portfolio_df
-            })
+        query = session.query(
+            PortfolioSnapshot.snapshot_date,
+            PortfolioSnapshot.target_currency,
+            PortfolioSnapshot.portfolio_data_json
+        )
+        if start_date is not None:
+            query = query.filter(PortfolioSnapshot.snapshot_date >= start_date)
+        if end_date is not None:
+            query = query.filter(PortfolioSnapshot.snapshot_date <= end_date)
+
+        loaded_data = [
+            EntreeJournal(
+                row.snapshot_date,
+                row.target_currency,
+                # Checkpoint : JSON complet ; autre date : reconstruction à partir des événements
+                (lambda texte=row.portfolio_data_json, d=row.snapshot_date: _portfolio_depuis_json(texte, d))
+                if row.portfolio_data_json is not None
+                else (lambda d=row.snapshot_date: load_portfolio_as_of(d))
+            )
+            for row in query.order_by(PortfolioSnapshot.snapshot_date)
+        ]
         print(f"DEBUG: {len(loaded_data)} snapshots chargés depuis la base de données.")
         return loaded_data
     except Exception as e:
@@ -0,0 +1,205 @@
+# prechargement.py
+"""
+Préchargement en arrière-plan des données de marché des portefeuilles de la session.
+
+Dès qu'un portefeuille est chargé, les téléchargements sont mis en file par priorité : d'abord
+le registre des instruments et les cours quotidiens récents (cotations de la Synthèse et du
+Portefeuille), puis les clôtures hebdomadaires du momentum, enfin l'historique quotidien long
+de l'onglet Performance. Dans chaque étape, les plus grosses positions passent en premier.
+
+Les tâches remplissent directement les caches partagés du processus (instruments.py,
+core.historique.MAGASIN) : elles n'appellent aucune fonction Streamlit, les threads n'ayant pas
+de contexte de script. À la première visite d'un onglet, ses fetchers en cache ne demandent plus
+à Yahoo que le cours en temps réel.
+
+La file et ses threads sont partagés par toutes les sessions (st.cache_resource). Un lot est
+identifié par l'empreinte des tables canoniques des portefeuilles (foyer.portefeuilles()) :
+il ne change qu'à l'import d'un portefeuille, pas quand les cours bougent, et n'est remis en
+file qu'après expiration. Le dernier lot soumis passe devant les précédents. L'avancement est
+affiché dans la barre latérale.
+"""
+
+import itertools
+import queue
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, timedelta
+
+import streamlit as st
+
+import foyer
+
+NB_THREADS = 4
+ETAPES = ["Cours", "Momentum", "Historique"] # Ordre de priorité des téléchargements
+DUREE_VALIDITE_LOT = 600 # Secondes, comme le cache de fetch_yahoo_data
+NB_LOTS_CONSERVES = 16
+INTERVALLE_AFFICHAGE = 1.0 # Secondes entre deux mises à jour de la barre de progression
+
+
+def bornes_historique(aujourdhui=None):
+    """Période chargée par display_performance_history : 20 ans affichés et 3 ans d'amorce des indicateurs."""
+    fin = aujourdhui or date.today()
+    return fin - timedelta(days=365 * 20) - timedelta(days=3 * 365), fin
+
+
+def tickers_par_valeur(df, fx_rates=None):
+    """
+    Tickers du portefeuille, de la plus grosse position à la plus petite. La valeur est estimée
+    au prix d'acquisition converti en devise cible (les cours ne sont pas encore chargés).
+    """
+    from core.positions import colonne_ticker, positions_canoniques
+
+    positions = positions_canoniques(df)
+    ticker_col = colonne_ticker(positions) if positions is not None else None
+    if ticker_col is None or positions.empty:
+        return []
+    fx_rates = fx_rates or {}
+    taux = positions["Devise"].astype(object).map(lambda d: fx_rates.get(d) or 1.0).astype(float)
+    valeur = positions.get("Quantité", 1.0) * positions.get("Acquisition", 1.0) * positions["Facteur_Ajustement_FX"] * taux
+    valeurs = valeur.abs().groupby(positions[ticker_col].astype(object)).sum()
+    return valeurs.sort_values(ascending=False, kind="stable").index.astype(str).tolist()
+
+
+def _precharger_cours(ticker):
+    from core.historique import MAGASIN
+    from instruments import obtenir_instrument
+
+    obtenir_instrument(ticker)
+    MAGASIN.journalier(ticker) # Couverture minimale : 52 semaines des cotations et 5 ans du momentum
+
+
+def _precharger_momentum(ticker):
+    from core.historique import MAGASIN
+
+    MAGASIN.clotures(ticker, date.today() - timedelta(days=5 * 365), granularite="semaine")
+
+
+def _precharger_historique(ticker, debut, fin):
+    from core.historique import MAGASIN
+
+    MAGASIN.journalier(ticker, debut, fin)
+
+
+def taches_prechargement(tickers):
+    """(étape, fonction, *args) dans l'ordre de priorité : cotations, momentum, puis historique quotidien."""
+    debut, fin = bornes_historique()
+    return ([("Cours", _precharger_cours, t) for t in tickers]
+            + [("Momentum", _precharger_momentum, t) for t in tickers]
+            + [("Historique", _precharger_historique, t, debut, fin) for t in tickers])
+
+
+class Prechargeur:
+    """File de priorité (étape, lot le plus récent, rang de la position) servie par des threads démons."""
+
+    def __init__(self, nb_threads=NB_THREADS):
+        self._file = queue.PriorityQueue()
+        self._numeros = itertools.count()
+        self._verrou = threading.Lock()
+        self._lots = OrderedDict() # clé du lot -> avancement
+        for i in range(nb_threads):
+            threading.Thread(target=self._travailler, name=f"prechargement-{i}", daemon=True).start()
+
+    def a_soumettre(self, cle):
+        """True si le lot est inconnu, ou terminé depuis plus de DUREE_VALIDITE_LOT."""
+        with self._verrou:
+            lot = self._lots.get(cle)
+            return lot is None or (lot["fin"] is not None and time.monotonic() - lot["fin"] >= DUREE_VALIDITE_LOT)
+
+    def soumettre(self, cle, taches):
+        """Met en file les tâches (étape, fonction, *args) d'un lot, déjà triées par priorité."""
+        numero = next(self._numeros)
+        with self._verrou:
+            self._lots[cle] = {
+                "total": len(taches), "faits": 0, "erreurs": 0,
+                "debut": time.monotonic(), "fin": time.monotonic() if not taches else None,
+                "etapes": {etape: [0, sum(1 for t in taches if t[0] == etape)] for etape in ETAPES},
+            }
+            self._lots.move_to_end(cle)
+            while len(self._lots) > NB_LOTS_CONSERVES:
+                self._lots.popitem(last=False)
+        for rang, (etape, fonction, *args) in enumerate(taches):
+            self._file.put(((ETAPES.index(etape), -numero, rang), cle, etape, fonction, args))
+
+    def _travailler(self):
+        while True:
+            _, cle, etape, fonction, args = self._file.get()
+            erreur = False
+            try:
+                fonction(*args)
+            except Exception as e:
+                erreur = True
+                print(f"WARNING: Préchargement {fonction.__name__}{tuple(args)} impossible : {e}")
+            with self._verrou:
+                lot = self._lots.get(cle)
+                if lot is not None:
+                    lot["faits"] += 1
+                    lot["erreurs"] += erreur
+                    lot["etapes"][etape][0] += 1
+                    if lot["faits"] >= lot["total"]:
+                        lot["fin"] = time.monotonic()
+            self._file.task_done()
+
+    def avancement(self, cle):
+        """Copie de l'avancement d'un lot, ou None s'il est inconnu."""
+        with self._verrou:
+            lot = self._lots.get(cle)
+            return None if lot is None else {**lot, "etapes": {e: tuple(v) for e, v in lot["etapes"].items()}}
+
+
+@st.cache_resource
+def obtenir_prechargeur():
+    """Préchargeur partagé par toutes les sessions."""
+    return Prechargeur()
+
+
+def cle_lot(portefeuilles):
+    """Clé du lot : empreintes des tables canoniques (calculées une fois par table, voir core.positions)."""
+    from core.positions import empreinte_positions
+
+    return tuple(sorted((nom, empreinte_positions(df)) for nom, df in portefeuilles.items() if df is not None))
+
+
+def demarrer_prechargement():
+    """
+    Met en file le préchargement des portefeuilles de la session (appelé à chaque rerun) :
+    seulement si l'un d'eux a été importé ou si leur lot a expiré. Retourne la clé du lot, ou None.
+    """
+    portefeuilles = foyer.portefeuilles()
+    if not portefeuilles or not st.session_state.get("prechargement_portefeuille", True):
+        st.session_state._prechargement_lot = None
+        return None
+    cle = cle_lot(portefeuilles)
+    st.session_state._prechargement_lot = cle
+    prechargeur = obtenir_prechargeur()
+    if prechargeur.a_soumettre(cle):
+        from core import consolider_positions
+
+        df = next(iter(portefeuilles.values())) if len(portefeuilles) == 1 else consolider_positions(portefeuilles)
+        tickers = tickers_par_valeur(df, st.session_state.get("fx_rates"))
+        prechargeur.soumettre(cle, taches_prechargement(tickers))
+    return cle
+
+
+def _barre_avancement(cle):
+    lot = obtenir_prechargeur().avancement(cle)
+    if lot is None or lot["total"] == 0:
+        return
+    if lot["fin"] is None:
+        etape = next((e for e in ETAPES if lot["etapes"][e][0] < lot["etapes"][e][1]), ETAPES[-1])
+        faits, total = lot["etapes"][etape]
+        st.progress(lot["faits"] / lot["total"], text=f"Préchargement — {etape} : {faits}/{total}")
+    else:
+        erreurs = f", {lot['erreurs']} en erreur" if lot["erreurs"] else ""
+        st.caption(f"Données préchargées : {lot['total']} téléchargements en {lot['fin'] - lot['debut']:.0f} s{erreurs}.")
+
+
+def afficher_avancement():
+    """Avancement du préchargement dans la barre latérale, mis à jour toutes les secondes tant qu'il dure."""
+    cle = st.session_state.get("_prechargement_lot")
+    if cle is None:
+        return
+    lot = obtenir_prechargeur().avancement(cle)
+    en_cours = lot is not None and lot["fin"] is None
+    with st.sidebar:
+        st.fragment(_barre_avancement, run_every=INTERVALLE_AFFICHAGE if en_cours else None)(cle)
@@ -0,0 +1,318 @@
+# profilage.py
+"""
+Mode profilage : chronométrage des étapes de chaque rerun Streamlit.
+
+Chaque rerun (entre demarrer_rerun et terminer_rerun) enregistre ses sections chronométrées
+(début, durée, profondeur d'imbrication) et, par fonction, le nombre d'appels, les succès et
+échecs de cache et le temps cumulé. Les N derniers reruns sont gardés dans la session et
+affichés par afficher_panneau_profilage (cascade par étape, comparaison des reruns, export JSON).
+
+Le rerun courant est rattaché au thread du script : hors rerun profilé (mode désactivé,
+threads de préchargement, écrivain différé), section() et les fonctions chronométrées ne font
+qu'un test et n'enregistrent rien. Ce module n'importe Streamlit que dans les fonctions
+d'affichage et de cache : portfolio_journal peut l'utiliser sans dépendre de Streamlit.
+
+Indépendamment du mode profilage, la durée de chaque rerun et les appels des fonctions
+cache_instrumente alimentent en permanence les métriques de production (core.metriques).
+"""
+
+import functools
+import json
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from datetime import datetime
+
+NB_RERUNS_CONSERVES = 20
+NB_CLES_SUIVIES = 1024 # Arguments déjà exécutés mémorisés par fonction (détection des évictions)
+
+_local = threading.local()
+
+
+class Rerun:
+    """Mesures d'un rerun : sections chronométrées et compteurs d'appels par fonction."""
+
+    def __init__(self):
+        self.debut = time.perf_counter()
+        self.horodatage = datetime.now().isoformat(timespec="seconds")
+        self.onglet = None
+        self.duree_ms = None
+        self.sections = [] # dicts nom, debut_ms, duree_ms, profondeur
+        self.appels = {} # nom -> dict appels, hits, misses, duree_ms
+        self.profondeur = 0
+
+    def compter(self, nom, duree, execute=None):
+        """Ajoute un appel de fonction (execute : True si le cache a été manqué, None hors cache)."""
+        compteur = self.appels.setdefault(nom, {"appels": 0, "hits": 0, "misses": 0, "duree_ms": 0.0})
+        compteur["appels"] += 1
+        compteur["duree_ms"] += duree * 1000
+        if execute is not None:
+            compteur["misses" if execute else "hits"] += 1
+
+    def vers_dict(self):
+        return {
+            "horodatage": self.horodatage,
+            "onglet": self.onglet,
+            "duree_ms": self.duree_ms,
+            "sections": self.sections,
+            "appels": self.appels,
+        }
+
+
+def rerun_courant():
+    """Rerun profilé du thread courant, ou None."""
+    return getattr(_local, "rerun", None)
+
+
+def demarrer_rerun(actif=True):
+    """Début d'un rerun (à appeler en tête de script). Les étapes ne sont enregistrées que si actif."""
+    _local.debut_rerun = time.perf_counter()
+    _local.rerun = Rerun() if actif else None
+
+
+def terminer_rerun(onglet=None, nb_conserves=NB_RERUNS_CONSERVES):
+    """Mesure la durée du rerun (métriques) et, en mode profilage, l'ajoute aux derniers reruns de la session."""
+    from core import metriques
+
+    debut = getattr(_local, "debut_rerun", None)
+    if debut is not None:
+        metriques.DUREE_RERUN.observer(time.perf_counter() - debut, onglet=onglet or "-")
+        _local.debut_rerun = None
+    rerun = rerun_courant()
+    _local.rerun = None
+    if rerun is None:
+        return None
+    import streamlit as st
+    rerun.onglet = onglet
+    rerun.duree_ms = (time.perf_counter() - rerun.debut) * 1000
+    historique = st.session_state.get("profilage_reruns")
+    if historique is None or historique.maxlen != nb_conserves:
+        historique = deque(historique or [], maxlen=nb_conserves)
+        st.session_state.profilage_reruns = historique
+    historique.append(rerun.vers_dict())
+    return rerun
+
+
+@contextmanager
+def section(nom):
+    """Chronomètre un bloc et l'ajoute aux sections du rerun courant (imbrication possible)."""
+    rerun = rerun_courant()
+    if rerun is None:
+        yield
+        return
+    debut = time.perf_counter()
+    entree = {"nom": nom, "debut_ms": (debut - rerun.debut) * 1000, "duree_ms": None, "profondeur": rerun.profondeur}
+    rerun.sections.append(entree)
+    rerun.profondeur += 1
+    try:
+        yield
+    finally:
+        rerun.profondeur -= 1
+        entree["duree_ms"] = (time.perf_counter() - debut) * 1000
+
+
+class Chronometre:
+    """
+    Étapes successives d'une fonction, sans réindenter son code :
+    chrono.etape("formatage") clôt l'étape précédente et ouvre la suivante ; chrono.fin() clôt tout.
+    """
+
+    def __init__(self, nom):
+        self._parent = section(nom)
+        self._parent.__enter__()
+        self._etape = None
+
+    def etape(self, nom):
+        if self._etape is not None:
+            self._etape.__exit__(None, None, None)
+        self._etape = section(nom)
+        self._etape.__enter__()
+
+    def fin(self):
+        if self._etape is not None:
+            self._etape.__exit__(None, None, None)
+            self._etape = None
+        if self._parent is not None:
+            self._parent.__exit__(None, None, None)
+            self._parent = None
+
+
+class _ChronometreInactif:
+    def etape(self, nom):
+        pass
+
+    def fin(self):
+        pass
+
+
+_CHRONOMETRE_INACTIF = _ChronometreInactif()
+
+
+def chronometre(nom):
+    """Chronometre si le rerun courant est profilé, sinon un objet sans effet."""
+    return Chronometre(nom) if rerun_courant() is not None else _CHRONOMETRE_INACTIF
+
+
+def fonction_chronometree(nom):
+    """Décorateur : chaque appel est une section et compte dans les appels de 'nom'."""
+    def decorer(fonction):
+        @functools.wraps(fonction)
+        def appel(*args, **kwargs):
+            rerun = rerun_courant()
+            if rerun is None:
+                return fonction(*args, **kwargs)
+            debut = time.perf_counter()
+            try:
+                with section(nom):
+                    return fonction(*args, **kwargs)
+            finally:
+                rerun.compter(nom, time.perf_counter() - debut)
+        return appel
+    return decorer
+
+
+def cache_instrumente(nom=None, erreur=None, amont=True, dependances=None, **options_cache):
+    """
+    Remplace @st.cache_data(**options_cache) en mesurant chaque appel :
+    - métriques (core.metriques), en permanence : succès et échecs de cache, évictions (arguments
+      déjà chargés qui doivent l'être à nouveau) et, si amont, latence et résultat des exécutions
+      réelles, qui interrogent la source externe. erreur(résultat) signale un échec absorbé
+      par la fonction (cours NaN, série vide...) ;
+    - en mode profilage, appels, hits et misses du rerun courant.
+    dependances(*args, **kwargs) retourne les données dont dépend le résultat (voir
+    cache_dependances) : cache_dependances.invalider n'évince alors que les entrées concernées.
+    La fonction décorée garde son nom, sa signature et sa méthode clear().
+    """
+    import streamlit as st
+    import cache_dependances
+    from core import metriques
+
+    def decorer(fonction):
+        nom_mesure = nom or fonction.__name__
+        deja_charges = OrderedDict() # Clés déjà exécutées (les NB_CLES_SUIVIES plus récentes)
+        verrou = threading.Lock()
+
+        @functools.wraps(fonction)
+        def execution(*args, **kwargs):
+            # Le corps ne s'exécute qu'en cas d'échec du cache. La clé (None si un argument n'est
+            # pas hachable) sert au registre des dépendances et au suivi des évictions.
+            cle = cache_dependances.cle_arguments(args, kwargs)
+            try:
+                if dependances is not None:
+                    cache_dependances.enregistrer(nom_mesure, cachee, args, kwargs, dependances(*args, **kwargs),
+                                                  cle, options_cache.get("ttl"))
+                if amont:
+                    return metriques.mesurer_appel_amont(nom_mesure, fonction, *args, est_erreur=erreur, **kwargs)
+                return fonction(*args, **kwargs)
+            finally:
+                # Après le corps : un appel instrumenté imbriqué ne remplace pas l'état de celui-ci
+                _local.execute, _local.cle = True, cle
+
+        cachee = st.cache_data(**options_cache)(execution)
+
+        @functools.wraps(fonction)
+        def appel(*args, **kwargs):
+            _local.execute = False
+            debut = time.perf_counter()
+            try:
+                return cachee(*args, **kwargs)
+            finally:
+                duree = time.perf_counter() - debut
+                execute = _local.execute
+                metriques.REQUETES_CACHE.inc(fonction=nom_mesure, resultat="miss" if execute else "hit")
+                if execute:
+                    cle = _local.cle
+                    if cle is not None: # Sans clé, une éviction ne peut pas être détectée
+                        with verrou:
+                            evincee = cle in deja_charges
+                            deja_charges[cle] = None
+                            deja_charges.move_to_end(cle)
+                            while len(deja_charges) > NB_CLES_SUIVIES:
+                                deja_charges.popitem(last=False)
+                        if evincee:
+                            metriques.EVICTIONS_CACHE.inc(fonction=nom_mesure)
+                rerun = rerun_courant()
+                if rerun is not None:
+                    rerun.compter(nom_mesure, duree, execute)
+
+        appel.clear = cachee.clear
+        return appel
+    return decorer
+
+
+# --- Panneau d'affichage ---
+
+def synthese_appels(reruns):
+    """Totaux par fonction sur plusieurs reruns : appels, hits, misses, durée totale et moyenne."""
+    totaux = {}
+    for rerun in reruns:
+        for nom, compteur in rerun["appels"].items():
+            total = totaux.setdefault(nom, {"appels": 0, "hits": 0, "misses": 0, "duree_ms": 0.0})
+            for cle in total:
+                total[cle] += compteur[cle]
+    return totaux
+
+
+def export_json(reruns):
+    """Reruns profilés sérialisés pour une comparaison hors ligne."""
+    return json.dumps({"reruns": list(reruns), "synthese_appels": synthese_appels(reruns)}, ensure_ascii=False, indent=1)
+
+
+def afficher_panneau_profilage():
+    """Cascade des étapes du rerun choisi, comparaison des derniers reruns, appels et cache, export JSON."""
+    import pandas as pd
+    import plotly.graph_objects as go
+    import streamlit as st
+
+    reruns = list(st.session_state.get("profilage_reruns") or [])
+    with st.expander(f"Profilage des reruns ({len(reruns)} conservés)", expanded=True):
+        if not reruns:
+            st.info("Aucun rerun profilé pour l'instant.")
+            return
+
+        libelles = [f"#{i + 1} · {r['horodatage'][11:]} · {r['onglet'] or '-'} · {r['duree_ms']:.0f} ms" for i, r in enumerate(reruns)]
+        choix = st.selectbox("Rerun", range(len(reruns)), index=len(reruns) - 1, format_func=lambda i: libelles[i],
+                             key="profilage_rerun_choisi")
+        rerun = reruns[choix]
+
+        # Cascade : une ligne par section, dans l'ordre d'exécution, décalée selon l'imbrication
+        sections = [s for s in rerun["sections"] if s["duree_ms"] is not None]
+        if sections:
+            noms = [f"{'· ' * s['profondeur']}{s['nom']}" for s in sections]
+            fig = go.Figure(go.Bar(
+                y=noms, x=[s["duree_ms"] for s in sections], base=[s["debut_ms"] for s in sections],
+                orientation="h", marker_color=[["#363636", "#A49B6D", "#808080", "#C8C8C8"][min(s["profondeur"], 3)] for s in sections],
+                hovertemplate="%{y}<br>début %{base:.1f} ms<br>durée %{x:.1f} ms<extra></extra>",
+            ))
+            fig.update_layout(height=max(200, 24 * len(sections) + 80), margin=dict(l=10, r=10, t=30, b=10),
+                              title=f"Cascade du rerun #{choix + 1} ({rerun['duree_ms']:.0f} ms)", xaxis_title="ms",
+                              yaxis=dict(autorange="reversed"))
+            st.plotly_chart(fig, use_container_width=True)
+
+        # Comparaison des derniers reruns : étapes de premier niveau empilées
+        df_etapes = pd.DataFrame([
+            {"Rerun": libelles[i], "Étape": s["nom"], "Durée (ms)": s["duree_ms"]}
+            for i, r in enumerate(reruns) for s in r["sections"]
+            if s["profondeur"] == 0 and s["duree_ms"] is not None
+        ])
+        if not df_etapes.empty:
+            fig = go.Figure([
+                go.Bar(name=etape, y=groupe["Rerun"], x=groupe["Durée (ms)"], orientation="h")
+                for etape, groupe in df_etapes.groupby("Étape", sort=False)
+            ])
+            fig.update_layout(barmode="stack", height=max(200, 22 * len(reruns) + 100), margin=dict(l=10, r=10, t=30, b=10),
+                              title=f"{len(reruns)} derniers reruns", xaxis_title="ms", yaxis=dict(autorange="reversed"))
+            st.plotly_chart(fig, use_container_width=True)
+
+        # Appels et cache : rerun choisi et ensemble des reruns conservés
+        for titre, appels in [(f"Appels du rerun #{choix + 1}", rerun["appels"]), ("Appels sur les reruns conservés", synthese_appels(reruns))]:
+            if appels:
+                df_appels = pd.DataFrame.from_dict(appels, orient="index").rename_axis("Fonction").reset_index()
+                df_appels["Moyenne (ms)"] = df_appels["duree_ms"] / df_appels["appels"]
+                df_appels = df_appels.rename(columns={"appels": "Appels", "hits": "Hits cache", "misses": "Misses cache", "duree_ms": "Total (ms)"})
+                st.markdown(f"**{titre}**")
+                st.dataframe(df_appels.sort_values("Total (ms)", ascending=False).round(1), hide_index=True, use_container_width=True)
+
+        st.download_button("Exporter en JSON", export_json(reruns), file_name=f"profilage_{rerun['horodatage'].replace(':', '')}.json",
+                           mime="application/json", key="profilage_export")
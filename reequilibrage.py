@@ -0,0 +1,290 @@
+# -*- coding: utf-8 -*-
+# reequilibrage.py
+
+import streamlit as st
+import pandas as pd
+import numpy as np
+import time
+
+from utils import format_fr
+
+
+def _prix_en_devise_cible(df, devise_cible, fx_rates, colonne_prix="currentPrice"):
+    """
+    Convertit les prix unitaires de la devise source vers la devise cible (vectorisé).
+    Reprend la logique de portfolio_display.convertir : pas de conversion (ni de facteur
+    d'ajustement) si la devise source est la devise cible, sinon taux / facteur 'H'.
+    """
+    prix = pd.to_numeric(df[colonne_prix], errors="coerce")
+    devises = df["Devise"].astype(str).str.strip().str.upper() if "Devise" in df.columns else pd.Series(devise_cible, index=df.index)
+    facteurs = pd.to_numeric(df["Facteur_Ajustement_FX"], errors="coerce") if "Facteur_Ajustement_FX" in df.columns else pd.Series(1.0, index=df.index)
+    facteurs = facteurs.where(facteurs.notna() & (facteurs != 0), 1.0)
+
+    taux = pd.to_numeric(devises.map(lambda d: (fx_rates or {}).get(d)), errors="coerce") / facteurs
+    taux = taux.where(devises != devise_cible.upper(), 1.0)
+    return (prix * taux).to_numpy(dtype=float)
+
+
+def _poids_cibles_par_ticker(categories, valeurs, target_allocations):
+    """
+    Répartit l'objectif de chaque catégorie entre ses lignes au prorata de leur valeur actuelle
+    (ou à parts égales si la catégorie est vide). Les catégories sans ligne restent en liquidités.
+    """
+    poids = np.zeros(len(categories))
+    for categorie, cible in target_allocations.items():
+        masque = categories == categorie
+        if not masque.any() or cible <= 0:
+            continue
+        valeurs_cat = valeurs[masque]
+        total_cat = valeurs_cat.sum()
+        if total_cat > 0:
+            poids[masque] = cible * valeurs_cat / total_cat
+        else:
+            poids[masque] = cible / masque.sum()
+    return poids
+
+
+def generer_ordres_reequilibrage(df_positions, target_allocations, fx_rates, devise_cible="EUR",
+                                 prix=None, tailles_lots=None, frais_fixes=0.0, liquidites=0.0,
+                                 colonne_cat="Catégories", ticker_col="Ticker", time_limit=0.9,
+                                 mip_rel_gap=1e-3):
+    """
+    Transforme les objectifs de répartition par catégorie en ordres en titres entiers par ticker.
+
+    Le problème est résolu en programmation linéaire en nombres entiers (scipy.optimize.milp) :
+    - variables : lots achetés / vendus (entiers), indicateur d'ordre (binaire), écart à la cible (continu) ;
+    - objectif : minimiser la somme des écarts absolus à la valeur cible de chaque ligne
+      (erreur de suivi en devise cible) plus les frais fixes des ordres passés ;
+    - contraintes : tailles de lots, pas de vente à découvert, liquidités disponibles suffisantes
+      pour couvrir les achats nets et les frais.
+
+    Les lignes dont la catégorie n'a pas d'objectif, ou dont le prix / taux de change est inconnu,
+    sont conservées telles quelles.
+
+    La résolution est plafonnée à time_limit secondes : sur un gros portefeuille (300 lignes avec
+    frais fixes), l'optimalité n'est en général pas prouvée dans ce délai et le résultat est la
+    meilleure solution trouvée. resume["optimal"] l'indique et resume["ecart_optimum"] donne
+    l'écart relatif maximal à l'optimum garanti par le solveur.
+
+    Args:
+        df_positions (pd.DataFrame): Positions avec au moins Ticker, Quantité, Devise et la colonne de catégorie.
+        target_allocations (dict): Objectifs par catégorie (fractions, ex: {"Minières": 0.41}).
+        fx_rates (dict): Taux de change vers la devise cible (clé: devise source).
+        devise_cible (str): Devise de référence.
+        prix (dict, optional): Prix actuels en devise source par ticker (cache des cours).
+                               À défaut, la colonne 'currentPrice' est utilisée.
+        tailles_lots (dict, optional): Taille de lot par ticker (défaut : colonne 'Lot' ou 1).
+        frais_fixes (float): Frais fixes par ordre, en devise cible.
+        liquidites (float): Liquidités disponibles, en devise cible.
+        time_limit (float): Temps maximal de résolution en secondes ; au-delà, la meilleure
+                            solution trouvée est retournée, sans garantie d'optimalité.
+        mip_rel_gap (float): Écart relatif toléré à l'optimum prouvé.
+
+    Returns:
+        tuple: (DataFrame des ordres, dict de synthèse) ou (DataFrame vide, dict) si aucun ordre n'est possible.
+    """
+    # scipy n'est chargé qu'à la première génération d'ordres (démarrage de l'application plus rapide)
+    from scipy.optimize import milp, LinearConstraint, Bounds
+    from scipy.sparse import coo_matrix, vstack
+
+    resume = {"statut": "Aucune position", "liquidites_finales": liquidites, "frais_totaux": 0.0,
+              "erreur_suivi": np.nan, "duree_s": 0.0, "optimal": False, "ecart_optimum": np.nan}
+    if df_positions is None or df_positions.empty or ticker_col not in df_positions.columns:
+        return pd.DataFrame(), resume
+
+    debut = time.perf_counter()
+    df = df_positions.dropna(subset=[ticker_col]).copy()
+    if prix is not None:
+        # Le cache de session stocke un dict par ticker ; un prix scalaire est aussi accepté
+        prix_scalaires = {t: (v.get("currentPrice") if isinstance(v, dict) else v) for t, v in prix.items()}
+        df["currentPrice"] = pd.to_numeric(df[ticker_col].map(prix_scalaires), errors="coerce")
+    elif "currentPrice" not in df.columns:
+        df["currentPrice"] = np.nan
+
+    quantites = pd.to_numeric(df["Quantité"], errors="coerce").fillna(0).to_numpy(dtype=float)
+    prix_conv = _prix_en_devise_cible(df, devise_cible, fx_rates)
+    categories = df[colonne_cat].astype(str).to_numpy() if colonne_cat in df.columns else np.full(len(df), "Non classé")
+
+    if tailles_lots is not None:
+        lots = df[ticker_col].map(lambda t: tailles_lots.get(t, 1)).to_numpy(dtype=float)
+    elif "Lot" in df.columns:
+        lots = pd.to_numeric(df["Lot"], errors="coerce").fillna(1).to_numpy(dtype=float)
+    else:
+        lots = np.ones(len(df))
+    lots = np.where(lots > 0, lots, 1.0)
+
+    valeurs = np.where(np.isfinite(prix_conv), quantites * prix_conv, 0.0)
+    optimisable = np.isfinite(prix_conv) & (prix_conv > 0) & np.isin(categories, list(target_allocations.keys()))
+
+    idx = np.flatnonzero(optimisable)
+    n = len(idx)
+    if n == 0:
+        resume["statut"] = "Aucune ligne optimisable (prix, taux de change ou catégorie manquants)"
+        return pd.DataFrame(), resume
+
+    richesse = valeurs[idx].sum() + liquidites
+    poids_cibles = _poids_cibles_par_ticker(categories[idx], valeurs[idx], target_allocations)
+    cibles = poids_cibles * richesse
+    valeur_lot = prix_conv[idx] * lots[idx]
+    # Acheter (ou vendre) au-delà de l'écart arrondi au lot supérieur ne peut qu'augmenter
+    # l'écart et les frais : ces bornes serrées accélèrent fortement la résolution.
+    ecarts = cibles - valeurs[idx]
+    lots_vendables = np.minimum(
+        np.floor(quantites[idx] / lots[idx] + 1e-9).clip(min=0),
+        np.ceil(np.clip(-ecarts, 0, None) / valeur_lot)
+    )
+    lots_achetables = np.ceil(np.clip(ecarts, 0, None) / valeur_lot)
+    grand_m = np.maximum(lots_achetables + lots_vendables, 1)
+    # La valeur finale d'une ligne reste sur la grille v_i + k * P_i : l'écart ne peut pas
+    # descendre sous la distance de la cible au point de grille le plus proche.
+    residus = np.mod(ecarts, valeur_lot)
+    ecart_min = np.minimum(residus, valeur_lot - residus)
+
+    # Les bornes excluent d'acheter et vendre la même ligne : une seule variable entière k_i
+    # (lots nets, négative pour une vente) suffit.
+    # Ordre des variables : [lots nets (n), indicateurs d'ordre (n), écarts (n)]
+    c = np.concatenate([np.zeros(n), np.full(n, float(frais_fixes)), np.ones(n)])
+    integralite = np.concatenate([np.ones(2 * n), np.zeros(n)])
+    bornes = Bounds(
+        lb=np.concatenate([-lots_vendables, np.zeros(n), ecart_min]),
+        ub=np.concatenate([lots_achetables, np.ones(n), np.full(n, np.inf)])
+    )
+
+    lignes = np.arange(n)
+    def bloc(colonnes_valeurs):
+        rows, cols, vals = [], [], []
+        for decalage, coef in colonnes_valeurs:
+            rows.append(lignes)
+            cols.append(lignes + decalage * n)
+            vals.append(np.broadcast_to(coef, n))
+        return coo_matrix((np.concatenate(vals), (np.concatenate(rows), np.concatenate(cols))), shape=(n, 3 * n))
+
+    # e_i >= (v_i + P_i k_i) - t_i  et  e_i >= t_i - (v_i + P_i k_i)
+    ecart_haut = bloc([(0, valeur_lot), (2, -1.0)])
+    ecart_bas = bloc([(0, -valeur_lot), (2, -1.0)])
+    # |k_i| <= M_i z_i
+    indicateur_achat = bloc([(0, 1.0), (1, -grand_m)])
+    indicateur_vente = bloc([(0, -1.0), (1, -grand_m)])
+    # Achats nets + frais <= liquidités
+    budget = coo_matrix(np.concatenate([valeur_lot, np.full(n, float(frais_fixes)), np.zeros(n)]).reshape(1, -1))
+
+    contraintes = LinearConstraint(
+        vstack([ecart_haut, ecart_bas, indicateur_achat, indicateur_vente, budget]).tocsr(),
+        lb=np.full(4 * n + 1, -np.inf),
+        ub=np.concatenate([ecarts, -ecarts, np.zeros(2 * n), [liquidites]])
+    )
+
+    resultat = milp(c, integrality=integralite, bounds=bornes, constraints=contraintes,
+                    options={"time_limit": time_limit, "disp": False, "mip_rel_gap": mip_rel_gap})
+    resume["duree_s"] = time.perf_counter() - debut
+
+    if resultat.x is None:
+        resume["statut"] = f"Pas de solution : {resultat.message}"
+        return pd.DataFrame(), resume
+
+    x = np.round(resultat.x[:2 * n]).astype(np.int64)
+    lots_nets = x[:n]
+    ordres_titres = lots_nets * lots[idx]
+    montants = lots_nets * valeur_lot
+    frais = x[n:2 * n] * float(frais_fixes)
+    valeurs_finales = valeurs[idx] + montants
+
+    df_ordres = pd.DataFrame({
+        "Ticker": df[ticker_col].to_numpy()[idx],
+        "Catégories": categories[idx],
+        f"Prix ({devise_cible})": prix_conv[idx],
+        "Lot": lots[idx],
+        "Quantité Actuelle": quantites[idx],
+        "Ordre (titres)": ordres_titres,
+        "Sens": np.where(ordres_titres > 0, "Achat", np.where(ordres_titres < 0, "Vente", "")),
+        f"Montant ({devise_cible})": montants,
+        f"Frais ({devise_cible})": frais,
+        "Quantité Cible": quantites[idx] + ordres_titres,
+        "Poids Actuel (%)": valeurs[idx] / richesse * 100 if richesse > 0 else 0.0,
+        "Poids Cible (%)": poids_cibles * 100,
+        "Poids Final (%)": valeurs_finales / richesse * 100 if richesse > 0 else 0.0,
+    })
+
+    optimal = resultat.status == 0
+    ecart_optimum = float(getattr(resultat, "mip_gap", np.nan) or 0.0) if not optimal else 0.0
+    resume.update({
+        "statut": "Optimal" if optimal else
+                  f"Meilleure solution trouvée (temps limite atteint, jusqu'à {format_fr(ecart_optimum * 100, 1)} % de l'optimum)",
+        "optimal": optimal,
+        "ecart_optimum": ecart_optimum,
+        "liquidites_finales": liquidites - montants.sum() - frais.sum(),
+        "frais_totaux": frais.sum(),
+        "erreur_suivi": np.abs(valeurs_finales - cibles).sum(),
+        "nb_ordres": int((ordres_titres != 0).sum()),
+    })
+    return df_ordres, resume
+
+
+def afficher_ordres_reequilibrage(df, devise_cible):
+    """
+    Affiche le formulaire de génération des ordres de rééquilibrage (titres entiers) dans la synthèse.
+    Utilise les cours du cache de session (ticker_data_cache) et les taux de change courants.
+    """
+    with st.expander("Ordres de rééquilibrage (titres entiers)"):
+        with st.form("form_ordres_reequilibrage"):
+            col1, col2 = st.columns(2)
+            with col1:
+                liquidites = st.number_input(f"Liquidités disponibles ({devise_cible})", min_value=0.0, value=0.0, step=100.0)
+            with col2:
+                frais_fixes = st.number_input(f"Frais fixes par ordre ({devise_cible})", min_value=0.0, value=0.0, step=1.0)
+            submitted = st.form_submit_button("Calculer les ordres")
+
+        if submitted:
+            df_ordres, resume = generer_ordres_reequilibrage(
+                df,
+                st.session_state.get("target_allocations", {}),
+                st.session_state.get("fx_rates") or {},
+                devise_cible,
+                prix=st.session_state.get("ticker_data_cache") or None,
+                frais_fixes=frais_fixes,
+                liquidites=liquidites,
+            )
+            st.session_state.ordres_reequilibrage = (df_ordres, resume)
+
+        if "ordres_reequilibrage" not in st.session_state:
+            return
+
+        df_ordres, resume = st.session_state.ordres_reequilibrage
+        if df_ordres.empty:
+            st.warning(resume["statut"])
+            return
+
+        st.caption(
+            f"{resume['statut']} en {resume['duree_s']:.2f} s — {resume['nb_ordres']} ordres, "
+            f"frais {format_fr(resume['frais_totaux'], 2)} {devise_cible}, "
+            f"liquidités restantes {format_fr(resume['liquidites_finales'], 2)} {devise_cible}, "
+            f"écart résiduel {format_fr(resume['erreur_suivi'], 2)} {devise_cible}"
+        )
+        if not resume["optimal"]:
+            st.warning(
+                "Ordres non optimaux : le calcul a atteint sa limite de temps avant de prouver l'optimalité. "
+                f"Le coût total (écart résiduel et frais) est au plus à {format_fr(resume['ecart_optimum'] * 100, 1)} % de l'optimum."
+            )
+        df_affiche = df_ordres[df_ordres["Ordre (titres)"] != 0]
+        format_dict = {col: (lambda x: format_fr(x, 2)) for col in df_affiche.columns if df_affiche[col].dtype.kind == "f"}
+        st.dataframe(df_affiche.style.format(format_dict), use_container_width=True, hide_index=True)
+
+
+if __name__ == "__main__":
+    # Banc d'essai : portefeuille synthétique de 300 lignes
+    rng = np.random.default_rng(0)
+    categories_test = ["Minières", "Asie", "Energie", "Matériaux", "Devises"]
+    n_lignes = 300
+    df_test = pd.DataFrame({
+        "Ticker": [f"T{i:03d}" for i in range(n_lignes)],
+        "Quantité": rng.integers(0, 500, n_lignes),
+        "currentPrice": rng.uniform(1, 300, n_lignes),
+        "Devise": rng.choice(["EUR", "USD", "GBP"], n_lignes),
+        "Catégories": rng.choice(categories_test, n_lignes),
+        "Lot": rng.choice([1, 1, 1, 10, 100], n_lignes),
+    })
+    cibles_test = {"Minières": 0.41, "Asie": 0.25, "Energie": 0.25, "Matériaux": 0.01, "Devises": 0.08}
+    ordres, synthese = generer_ordres_reequilibrage(
+        df_test, cibles_test, {"USD": 0.92, "GBP": 1.17}, "EUR", frais_fixes=5.0, liquidites=50_000.0
+    )
+    print(f"{synthese['statut']} : {synthese['nb_ordres']} ordres en {synthese['duree_s']:.3f} s")
@@ -0,0 +1,86 @@
+# storage.py
+"""
+Accès partagé à la base SQLite du portefeuille (portfolio.db).
+
+Un seul moteur SQLAlchemy, une seule Base déclarative et une seule fabrique de sessions
+pour portfolio_journal et historical_data_manager. Chaque nouvelle connexion du pool est
+configurée en mode WAL : les lectures (une par session Streamlit) ne bloquent pas
+l'écriture du snapshot quotidien, et inversement.
+"""
+
+import threading
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.pool import QueuePool
+
+DATABASE_URL = "sqlite:///portfolio.db"
+
+# Pragmas appliqués à chaque connexion ouverte par le pool
+PRAGMAS = {
+    "journal_mode": "WAL",      # Lecteurs et écrivain concurrents
+    "synchronous": "NORMAL",    # Suffisant en WAL : pas de fsync à chaque commit
+    "cache_size": -32768,       # Négatif = en Kio, soit 32 Mio de cache de pages par connexion
+    "busy_timeout": 5000,       # Un second écrivain attend jusqu'à 5 s au lieu d'échouer
+    "foreign_keys": "ON",
+}
+
+# Taille du pool : une connexion par session Streamlit active, plus le préchargement
+TAILLE_POOL = 5
+DEPASSEMENT_POOL = 10
+
+Base = declarative_base()
+Session = sessionmaker()
+Engine = None # Créé au premier accès à la base (voir get_engine)
+_verrou = threading.Lock()
+
+
+def _configurer_connexion(dbapi_connection, connection_record):
+    """Applique PRAGMAS à une nouvelle connexion sqlite3."""
+    cursor = dbapi_connection.cursor()
+    for nom, valeur in PRAGMAS.items():
+        cursor.execute(f"PRAGMA {nom}={valeur}")
+    cursor.close()
+
+
+def get_engine():
+    """
+    Retourne le moteur partagé, créé au premier appel (thread-safe).
+    Les connexions sont partagées entre threads (sessions Streamlit, préchargement) :
+    check_same_thread est donc désactivé, chaque session ORM gardant sa propre connexion.
+    """
+    global Engine
+    if Engine is None:
+        with _verrou:
+            if Engine is None:
+                engine = create_engine(
+                    DATABASE_URL,
+                    poolclass=QueuePool,
+                    pool_size=TAILLE_POOL,
+                    max_overflow=DEPASSEMENT_POOL,
+                    connect_args={"check_same_thread": False, "timeout": 30},
+                )
+                event.listen(engine, "connect", _configurer_connexion)
+                Session.configure(bind=engine)
+                Engine = engine
+    return Engine
+
+
+def initialiser_tables(*modeles):
+    """Crée les tables des modèles donnés si elles n'existent pas, et retourne le moteur."""
+    engine = get_engine()
+    Base.metadata.create_all(engine, tables=[modele.__table__ for modele in modeles])
+    return engine
+
+
+def reinitialiser(database_url=DATABASE_URL):
+    """
+    Ferme le moteur courant et pointe vers une autre base (utilisé par les benchmarks
+    et les scripts hors application). Le moteur est recréé au prochain accès.
+    """
+    global Engine, DATABASE_URL
+    with _verrou:
+        if Engine is not None:
+            Engine.dispose()
+        Engine = None
+        DATABASE_URL = database_url
@@ -1,13 +1,6 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
 import datetime
-from PIL import Image
 import base64
-from io import BytesIO
-import os
-import yfinance as yf
-import pytz
 import builtins
 
 if not callable(str):
@@ -17,20 +10,26 @@ if not callable(str):
 print(f"Type de str dans streamlit_app.py : {type(builtins.str)}")
 
 # Importation des modules fonctionnels
-from portfolio_display import afficher_portefeuille, afficher_synthese_globale
-from performance import display_performance_history
-from transactions import afficher_transactions
-from od_comptables import afficher_od_comptables
-from taux_change import afficher_tableau_taux_change
-from data_fetcher import fetch_fx_rates, fetch_yahoo_data, fetch_momentum_data # Assurez-vous que ces fonctions ont les @st.cache_data(ttl=...)
-from utils import safe_escape, format_fr
-from portfolio_journal import save_portfolio_snapshot, load_portfolio_journal
+# Seuls les modules légers nécessaires à chaque rerun sont importés ici. Les vues
+# (portefeuille, performance, journal SQLite, ...) importent leurs dépendances lourdes
+# (yfinance, SQLAlchemy, scipy, ...) dans la fonction de l'onglet qui les utilise.
+# Budget de temps d'import suivi par benchmark_startup.py.
+from data_fetcher import fetch_fx_rates # Assurez-vous que ces fonctions ont les @st.cache_data(ttl=...)
 from streamlit_autorefresh import st_autorefresh
-from data_loader import load_data, save_data, load_portfolio_from_google_sheets # Importation correcte et unique
+from data_loader import load_portfolio_from_google_sheets # Importation correcte et unique
+from tab_router import afficher_onglets
+from foyer import afficher_selecteur, enregistrer_portefeuille, PORTEFEUILLE_PAR_DEFAUT
+from core.metriques import demarrer_serveur as demarrer_serveur_metriques
+from profilage import demarrer_rerun, terminer_rerun, section, afficher_panneau_profilage, NB_RERUNS_CONSERVES
+from prechargement import afficher_avancement, demarrer_prechargement
 
 # Configuration de la page
 st.set_page_config(page_title="BEAM Portfolio Manager", layout="wide")
 
+# Métriques de production (latences Yahoo, caches, reruns, écritures du journal) au format
+# Prometheus sur http://127.0.0.1:8503/metrics ; démarré une seule fois par processus
+demarrer_serveur_metriques()
+
 # Configuration de l'actualisation automatique pour les données
 # Le script entier sera relancé toutes les 600 secondes (60000 millisecondes)
 # N'oubliez pas que cela relance TOUTE l'application Streamlit.
@@ -41,11 +40,14 @@ PRIMARY_COLOR = "#363636"
 SECONDARY_COLOR = "#E8E8E8"
 ACCENT_COLOR = "#A49B6D"
 
-st.markdown(f"""
+@st.cache_resource
+def construire_css(primary_color, secondary_color, accent_color):
+    """Feuille de style de l'application, construite une seule fois par processus."""
+    return f"""
     <style>
         body {{
-            background-color: {SECONDARY_COLOR};
-            color: {PRIMARY_COLOR};
+            background-color: {secondary_color};
+            color: {primary_color};
         }}
         .stApp {{
             font-family: 'Arial', sans-serif;
@@ -57,7 +59,7 @@ st.markdown(f"""
             padding-right: 1rem;
         }}
         .st-emotion-cache-18ni7ap {{
-            background-color: {ACCENT_COLOR};
+            background-color: {accent_color};
             padding: 10px;
             border-radius: 0 0 10px 10px;
             margin-bottom: 25px;
@@ -67,14 +69,22 @@ st.markdown(f"""
             margin-top: -55px;
         }}
     </style>
-""", unsafe_allow_html=True)
+"""
+
+st.markdown(construire_css(PRIMARY_COLOR, SECONDARY_COLOR, ACCENT_COLOR), unsafe_allow_html=True)
 
 # Chargement du logo
+@st.cache_resource
+def charger_logo_base64(chemin="Logo.png.png"):
+    """
+    Encode le logo en base64 une seule fois par processus.
+    Le fichier est déjà un PNG : ses octets sont encodés directement, sans décodage/réencodage PIL.
+    """
+    with open(chemin, "rb") as f:
+        return base64.b64encode(f.read()).decode("utf-8")
+
 try:
-    logo = Image.open("Logo.png.png")
-    buffer = BytesIO()
-    logo.save(buffer, format="PNG")
-    logo_base64 = base64.b64encode(buffer.getvalue()).decode("utf-8")
+    logo_base64 = charger_logo_base64()
 except FileNotFoundError:
     st.warning("Logo.png.png non trouvé. Assurez-vous qu'il est dans le même répertoire que streamlit_app.py.")
     logo_base64 = ""
@@ -127,6 +137,9 @@ for key, default in {
     if key not in st.session_state:
         st.session_state[key] = default
 
+# Mode profilage (Paramètres) : les étapes de ce rerun sont chronométrées jusqu'à terminer_rerun
+demarrer_rerun(st.session_state.get("profilage_actif", False))
+
 # --- NOUVEAU BLOC DE VÉRIFICATION DE LA COHÉRENCE DE last_update_time_fx ---
 # Cela garantit que last_update_time_fx est TOUJOURS un datetime timezone-aware
 # avant d'être utilisé dans les comparaisons de temps.
@@ -143,7 +156,7 @@ if st.session_state.df is None and not st.session_state.url_data_loaded:
         # Utilisation de la fonction load_portfolio_from_google_sheets de data_loader.py
         df_initial = load_portfolio_from_google_sheets(st.session_state.google_sheets_url)
         if df_initial is not None:
-            st.session_state.df = df_initial
+            enregistrer_portefeuille(PORTEFEUILLE_PAR_DEFAUT, df_initial)
             st.session_state.url_data_loaded = True
             st.session_state.uploaded_file_id = "initial_url_load"
             st.session_state._last_processed_file_id = "initial_url_load"
@@ -167,7 +180,7 @@ if st.session_state.last_update_time_fx is None or \
 
     devise_cible_to_use = st.session_state.get("devise_cible", "EUR")
 
-    with st.spinner(f"Mise à jour automatique des devises pour {devise_cible_to_use}..."):
+    with st.spinner(f"Mise à jour automatique des devises pour {devise_cible_to_use}..."), section("Actualisation des taux de change"):
         try:
             # Appel à fetch_fx_rates qui est décoré avec @st.cache_data(ttl=60)
             st.session_state.fx_rates = fetch_fx_rates(devise_cible_to_use)
@@ -185,74 +198,133 @@ if st.session_state.last_update_time_fx is None or \
 # --- Fin Logique d'Actualisation des Taux de Change ---
 
 
-# Fonction principale de l'application
-def main():
-    onglets = st.tabs([
-        "Synthèse",
-        "Portefeuille",
-        "Performance",
-        "OD Comptables",
-        "Transactions",
-        "Taux de change",
-        "Paramètres"
-    ])
-
-    with onglets[0]:
-        afficher_synthese_globale(
-            st.session_state.total_valeur,
-            st.session_state.total_actuelle,
-            st.session_state.total_h52,
-            st.session_state.total_lt
-        )
-
-    with onglets[1]:
-        if st.session_state.df is None:
-            st.warning("Veuillez importer un fichier Excel ou CSV via l'onglet 'Paramètres' ou charger depuis l'URL de Google Sheets.")
-        else:
-            total_valeur, total_actuelle, total_h52, total_lt = afficher_portefeuille()
+# --- Vues des onglets ---
+# Chaque onglet est une fonction : seul l'onglet actif est exécuté à chaque rerun.
+MESSAGE_AUCUNE_DONNEE = "Veuillez importer un fichier Excel ou CSV via l'onglet 'Paramètres' ou charger depuis l'URL de Google Sheets"
+
+def onglet_synthese():
+    from portfolio_display import afficher_synthese_globale, calculer_portefeuille
+
+    # Si l'onglet Portefeuille n'a pas encore été ouvert, on calcule les totaux sans l'afficher
+    if st.session_state.total_valeur is None and st.session_state.df is not None and not st.session_state.df.empty:
+        df_calcule, total_valeur, total_actuelle, total_h52, total_lt = calculer_portefeuille()
+        if df_calcule is not None:
+            st.session_state.df = df_calcule
             st.session_state.total_valeur = total_valeur
             st.session_state.total_actuelle = total_actuelle
             st.session_state.total_h52 = total_h52
             st.session_state.total_lt = total_lt
 
-            current_date = datetime.date.today()
-            devise_cible = st.session_state.get("devise_cible", "EUR")
+    afficher_synthese_globale(
+        st.session_state.total_valeur,
+        st.session_state.total_actuelle,
+        st.session_state.total_h52,
+        st.session_state.total_lt
+    )
 
-            journal_entries = load_portfolio_journal()
-            journal_dates = [entry['date'] for entry in journal_entries]
+    # Plusieurs portefeuilles : totaux de chacun et du foyer, sur les mêmes cours et taux
+    from foyer import afficher_repartition_foyer
+    afficher_repartition_foyer()
 
-            if st.session_state.df is not None and not st.session_state.df.empty and current_date not in journal_dates:
-                with st.spinner("Enregistrement du snapshot quotidien du portefeuille..."):
-                    save_portfolio_snapshot(current_date, st.session_state.df, devise_cible)
-                st.info(f"Snapshot du portefeuille du {current_date.strftime('%Y-%m-%d')} enregistré pour l'historique.")
+def onglet_portefeuille():
+    if st.session_state.df is None:
+        st.warning(f"{MESSAGE_AUCUNE_DONNEE}.")
+        return None
+    from portfolio_display import afficher_portefeuille
+    from portfolio_journal import has_snapshot_for_date
+    from write_behind import ecrivain, SNAPSHOT, TOTAUX
+    from foyer import portefeuille_historise
 
-    with onglets[2]:
-        if st.session_state.df is None:
-            st.warning("Veuillez importer un fichier Excel ou CSV via l'onglet 'Paramètres' ou charger depuis l'URL de Google Sheets pour voir les performances.")
-        else:
-            display_performance_history()
+    total_valeur, total_actuelle, total_h52, total_lt = afficher_portefeuille()
+    st.session_state.total_valeur = total_valeur
+    st.session_state.total_actuelle = total_actuelle
+    st.session_state.total_h52 = total_h52
+    st.session_state.total_lt = total_lt
 
-    with onglets[3]:
-        if st.session_state.df is None:
-            st.warning("Veuillez importer un fichier Excel ou CSV via l'onglet 'Paramètres' ou charger depuis l'URL de Google Sheets pour générer les OD Comptables.")
-        else:
-            afficher_od_comptables()
+    # Avec plusieurs portefeuilles, seul le foyer consolidé est historisé (journal et totaux quotidiens)
+    if not portefeuille_historise():
+        return total_valeur, total_actuelle, total_h52, total_lt
 
-    with onglets[4]:
-        if st.session_state.df is None:
-            st.warning("Veuillez importer un fichier Excel ou CSV via l'onglet 'Paramètres' ou charger depuis l'URL de Google Sheets pour gérer les transactions.")
-        else:
-            afficher_transactions()
+    current_date = datetime.date.today()
+    devise_cible = st.session_state.get("devise_cible", "EUR")
 
-    with onglets[5]:
-        # Le bouton d'actualisation manuelle est maintenant géré dans afficher_tableau_taux_change
-        afficher_tableau_taux_change(st.session_state.get("devise_cible", "EUR"), st.session_state.fx_rates)
+    # Les écritures sont déposées dans la file de l'écrivain différé : le rendu n'attend jamais le disque.
+    # Le snapshot quotidien n'est vérifié (une requête indexée) qu'une fois par jour et par session,
+    # ou à nouveau si l'écrivain a abandonné son enregistrement.
+    if ecrivain().abandonnee(SNAPSHOT, current_date):
+        st.session_state.pop("date_snapshot_quotidien", None)
+    if ecrivain().abandonnee(TOTAUX, current_date):
+        st.session_state.pop("derniers_totaux_soumis", None)
+    if st.session_state.df is not None and not st.session_state.df.empty \
+            and st.session_state.get("date_snapshot_quotidien") != current_date:
+        if has_snapshot_for_date(current_date) or ecrivain().en_attente(SNAPSHOT, current_date):
+            st.session_state.date_snapshot_quotidien = current_date
+        elif ecrivain().soumettre_snapshot(current_date, st.session_state.df, devise_cible):
+            st.session_state.date_snapshot_quotidien = current_date
+            st.info(f"Snapshot du portefeuille du {current_date.strftime('%Y-%m-%d')} enregistré pour l'historique.")
+
+    # Totaux du jour : resoumis seulement s'ils ont changé (les écritures d'une même date sont fusionnées)
+    totaux = (current_date, total_valeur, total_actuelle, total_h52, total_lt, devise_cible)
+    if total_actuelle is not None and st.session_state.get("derniers_totaux_soumis") != totaux:
+        if ecrivain().soumettre_totaux(*totaux):
+            st.session_state.derniers_totaux_soumis = totaux
+    return total_valeur, total_actuelle, total_h52, total_lt
+
+def onglet_performance():
+    if st.session_state.df is None:
+        st.warning(f"{MESSAGE_AUCUNE_DONNEE} pour voir les performances.")
+        return None
+    from performance import display_performance_history
+    display_performance_history()
+
+def onglet_od_comptables():
+    if st.session_state.df is None:
+        st.warning(f"{MESSAGE_AUCUNE_DONNEE} pour générer les OD Comptables.")
+        return None
+    from od_comptables import afficher_od_comptables
+    afficher_od_comptables()
+
+def onglet_transactions():
+    if st.session_state.df is None:
+        st.warning(f"{MESSAGE_AUCUNE_DONNEE} pour gérer les transactions.")
+        return None
+    from transactions import afficher_transactions
+    afficher_transactions()
+
+def onglet_taux_change():
+    from taux_change import afficher_tableau_taux_change
+    # Le bouton d'actualisation manuelle est maintenant géré dans afficher_tableau_taux_change
+    afficher_tableau_taux_change(st.session_state.get("devise_cible", "EUR"), st.session_state.fx_rates)
+
+def onglet_parametres():
+    from parametres import afficher_parametres_globaux
+    afficher_parametres_globaux()
+
+
+# Fonction principale de l'application
+def main():
+    afficher_selecteur()
+    # Cotations, momentum puis historiques des portefeuilles de la session, chargés en arrière-plan
+    with section("Préchargement"):
+        demarrer_prechargement()
+        afficher_avancement()
+    onglet = afficher_onglets(
+        {
+            "Synthèse": onglet_synthese,
+            "Portefeuille": onglet_portefeuille,
+            "Performance": onglet_performance,
+            "OD Comptables": onglet_od_comptables,
+            "Transactions": onglet_transactions,
+            "Taux de change": onglet_taux_change,
+            "Paramètres": onglet_parametres,
+        }
+    )
 
-    with onglets[6]:
-        from parametres import afficher_parametres_globaux
-        afficher_parametres_globaux()
-    
     st.markdown("---")
 
+    terminer_rerun(onglet, st.session_state.get("profilage_nb_reruns", NB_RERUNS_CONSERVES))
+    if st.session_state.get("profilage_actif", False):
+        afficher_panneau_profilage()
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,31 @@
+# tab_router.py
+
+import streamlit as st
+from profilage import section
+
+
+def afficher_onglets(onglets, key="onglet_actif"):
+    """
+    Remplace st.tabs : seul l'onglet actif est exécuté à chaque rerun. Les onglets inactifs ne
+    sont ni exécutés ni conservés : revenir sur un onglet le recalcule, en s'appuyant sur les
+    caches de données (st.cache_data, cours et historiques) plutôt que sur un rendu mémorisé.
+
+    Args:
+        onglets (dict): Libellé -> fonction sans argument affichant l'onglet.
+        key (str): Clé de session de l'onglet actif.
+    Returns:
+        str: Le libellé de l'onglet actif.
+    """
+    libelles = list(onglets.keys())
+    actif = st.radio(
+        "Navigation",
+        libelles,
+        key=key,
+        horizontal=True,
+        label_visibility="collapsed"
+    )
+
+    with section(f"Onglet {actif}"):
+        onglets[actif]()
+
+    return actif
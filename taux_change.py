@@ -3,6 +3,7 @@ import pandas as pd
 import datetime
 import pytz
 from data_fetcher import fetch_fx_rates
+from cache_dependances import devise, invalider
 
 def format_fr(value, decimals):
     """
@@ -24,6 +25,8 @@ def afficher_tableau_taux_change(devise_cible, fx_rates):
     if st.button("Actualiser les taux", key="manual_fx_refresh_btn_in_tab"):
         with st.spinner("Mise à jour manuelle des devises..."):
             try:
+                # Seuls les taux de la devise cible sont évincés du cache : cours et historiques sont conservés
+                invalider(devise(devise_cible))
                 st.session_state.fx_rates = fetch_fx_rates(devise_cible)
                 st.session_state.last_update_time_fx = datetime.datetime.now(datetime.timezone.utc)
                 st.session_state.last_devise_cible_for_currency_update = devise_cible
@@ -0,0 +1,103 @@
+# test_source_distante.py
+"""
+Rechargement conditionnel (core.source_distante) contre le serveur local de
+benchmark_google_sheets.py, qui imite une feuille Google Sheets publiée en CSV.
+
+    python -m pytest test_source_distante.py
+"""
+
+import threading
+
+import pandas as pd
+import pytest
+
+from benchmark_google_sheets import ServeurFeuille
+from core.source_distante import charger_si_modifie, comparer_portefeuilles
+
+
+def _portefeuille():
+    return pd.DataFrame({
+        "Ticker": [f"T{i}" for i in range(10)],
+        "Quantité": [float(10 * (i + 1)) for i in range(10)],
+        "Acquisition": [1.5 * (i + 1) for i in range(10)],
+        "Devise": ["EUR", "USD", "GBP", "CHF", "EUR"] * 2,
+        "Catégories": ["Minières", "Asie"] * 5,
+        "Objectif_LT": [2.0 * (i + 1) for i in range(10)],
+    })
+
+
+def _csv(df):
+    return df.to_csv(index=False).encode("utf-8")
+
+
+@pytest.fixture
+def demarrer_serveur():
+    serveurs = []
+
+    def demarrer(contenu, validateurs=True):
+        serveur = ServeurFeuille(contenu, validateurs=validateurs)
+        threading.Thread(target=serveur.serve_forever, daemon=True).start()
+        serveurs.append(serveur)
+        return serveur
+
+    yield demarrer
+    for serveur in serveurs:
+        serveur.shutdown()
+        serveur.server_close()
+
+
+def test_feuille_inchangee_304(demarrer_serveur):
+    serveur = demarrer_serveur(_csv(_portefeuille()))
+    etat, modifie = charger_si_modifie(serveur.url)
+    assert modifie and etat.etag == serveur.etag and len(etat.df) == 10
+    df = etat.df
+
+    etat, modifie = charger_si_modifie(serveur.url, etat)
+    assert not modifie
+    assert etat.df is df
+    assert (serveur.nb_complets, serveur.nb_non_modifies) == (1, 1)
+    assert (etat.nb_verifications, etat.nb_non_modifies) == (2, 1)
+
+
+def test_sans_validateurs_contenu_identique(demarrer_serveur):
+    serveur = demarrer_serveur(_csv(_portefeuille()), validateurs=False)
+    etat, modifie = charger_si_modifie(serveur.url)
+    assert modifie and etat.etag is None and etat.derniere_modification is None
+    df = etat.df
+
+    # Le serveur renvoie tout le contenu : l'empreinte identique évite la relecture du CSV
+    etat, modifie = charger_si_modifie(serveur.url, etat)
+    assert not modifie
+    assert etat.df is df
+    assert (serveur.nb_complets, serveur.nb_non_modifies) == (2, 0)
+    assert (etat.nb_verifications, etat.nb_non_modifies) == (2, 1)
+
+
+@pytest.mark.parametrize("validateurs", [True, False])
+def test_feuille_modifiee(demarrer_serveur, validateurs):
+    df = _portefeuille()
+    serveur = demarrer_serveur(_csv(df), validateurs=validateurs)
+    etat, _ = charger_si_modifie(serveur.url)
+    df_precedent = etat.df
+
+    # 3 quantités changées dont celle de T0, retiré ; 2 tickers ajoutés, dont une nouvelle devise
+    df_modifie = df.copy()
+    df_modifie.loc[df_modifie.index[:3], "Quantité"] += 10
+    df_modifie = pd.concat([df_modifie.iloc[1:], pd.DataFrame({
+        "Ticker": ["NOUVEAU1", "NOUVEAU2"], "Quantité": [5.0, 8.0], "Acquisition": [10.0, 20.0],
+        "Devise": ["JPY", "EUR"], "Catégories": ["Asie", "Energie"], "Objectif_LT": [15.0, 30.0],
+    })], ignore_index=True)
+    serveur.publier(_csv(df_modifie))
+
+    etat, modifie = charger_si_modifie(serveur.url, etat)
+    assert modifie
+    assert etat.df is not df_precedent and len(etat.df) == 11
+    assert serveur.nb_complets == 2 and serveur.nb_non_modifies == 0
+
+    diff = comparer_portefeuilles(df_precedent, etat.df)
+    assert (diff.lignes_ajoutees, diff.lignes_modifiees, diff.lignes_retirees, diff.lignes_inchangees) == (2, 2, 1, 7)
+    assert sorted(diff.tickers_ajoutes) == ["NOUVEAU1", "NOUVEAU2"]
+    assert sorted(diff.tickers_modifies) == ["T1", "T2"]
+    assert diff.tickers_retires == ["T0"]
+    assert diff.devises_ajoutees == ["JPY"]
+    assert not diff.inchange
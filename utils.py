@@ -22,3 +22,40 @@ def format_fr(number, decimal_places=2):
         return format_decimal(float(number), locale='fr_FR', format=f'#,##0.{ "0" * decimal_places if decimal_places > 0 else "" }')
     except (ValueError, TypeError) as e:
         return "N/A"  # Fallback for any formatting errors
+
+def dataframe_to_arrow_ipc(df):
+    """
+    Sérialise un DataFrame en flux Arrow IPC (bytes) avec des colonnes typées :
+    float64 pour les colonnes numériques (NaN conservés, pas de null), float64 en
+    millisecondes epoch pour les dates et utf8 pour le texte.
+    Utilisé par l'API (api.py) pour servir les tables au format Arrow.
+    """
+    import pyarrow as pa
+
+    arrays = []
+    for col in df.columns:
+        serie = df[col]
+        if pd.api.types.is_numeric_dtype(serie) and not pd.api.types.is_bool_dtype(serie):
+            arrays.append(pa.array(serie.to_numpy(dtype="float64", na_value=np.nan)))
+        elif pd.api.types.is_datetime64_any_dtype(serie):
+            # Millisecondes depuis l'epoch, directement utilisables par new Date() côté navigateur
+            millis = serie.astype("datetime64[ms]").astype("int64").to_numpy(dtype="float64")
+            millis[serie.isna().to_numpy()] = np.nan
+            arrays.append(pa.array(millis))
+        else:
+            arrays.append(pa.array([None if pd.isna(v) else str(v) for v in serie], type=pa.string()))
+    table = pa.Table.from_arrays(arrays, names=[str(c) for c in df.columns])
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+def afficher_alertes(alertes):
+    """Affiche dans Streamlit les alertes retournées par le noyau (core), sans doublons."""
+    import streamlit as st
+    for alerte in dict.fromkeys(alertes or []):
+        if alerte.niveau == "error":
+            st.error(alerte.message)
+        else:
+            st.warning(alerte.message)
@@ -0,0 +1,217 @@
+# write_behind.py
+"""
+Écriture différée (write-behind) des snapshots du journal et des totaux quotidiens.
+
+L'interface dépose les écritures dans une file bornée et continue immédiatement ; un thread
+d'arrière-plan les regroupe et les enregistre par lots (save_portfolio_snapshots_bulk,
+save_daily_totals_bulk). Deux écritures de même type pour la même date sont fusionnées :
+seule la dernière est enregistrée. La file est vidée à l'arrêt du processus (atexit).
+
+Une écriture en échec est remise en file et retentée (attente croissante entre les lots),
+sauf si une écriture plus récente de même type et même date l'a remplacée entre-temps.
+Après NB_TENTATIVES échecs, elle est abandonnée : abandonnee() le signale, pour que
+l'interface la soumette à nouveau, et ERREURS_ECRITURE_JOURNAL la compte (operation="abandon").
+"""
+
+import atexit
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+from core.metriques import ERREURS_ECRITURE_JOURNAL
+from profilage import fonction_chronometree
+
+SNAPSHOT = "snapshot"
+TOTAUX = "totaux"
+
+COLONNE_DATE_SNAPSHOT = "_date_snapshot"
+NB_TENTATIVES = 5
+DELAI_REPRISE_MAX = 60.0 # Secondes d'attente au plus entre deux tentatives
+
+
+class EcrivainDiffere:
+    """
+    File d'écritures fusionnées par (type, date), vidée par un thread dédié.
+
+    Args:
+        taille_max (int): Nombre maximal d'écritures distinctes en attente. Au-delà, une nouvelle
+            date est refusée (soumettre retourne False) ; une date déjà en attente est toujours remplacée.
+        delai_lot (float): Attente en secondes après la première écriture, pour regrouper les suivantes.
+        taille_lot (int): Nombre maximal d'écritures enregistrées par lot.
+    """
+
+    def __init__(self, taille_max=256, delai_lot=0.5, taille_lot=100):
+        self.taille_max = taille_max
+        self.delai_lot = delai_lot
+        self.taille_lot = taille_lot
+        self._en_attente = OrderedDict() # (type, date) -> données
+        self._condition = threading.Condition()
+        self._lot_en_cours = False
+        self._arret = False
+        self._tentatives = {} # (type, date) -> nombre d'échecs
+        self._abandonnees = set()
+        self._pause = 0.0 # Attente avant le prochain lot, après un échec
+        self.nb_lots = 0
+        self.nb_ecritures = 0
+        self.nb_fusionnees = 0
+        self._thread = threading.Thread(target=self._boucle, name="ecrivain-differe", daemon=True)
+        self._thread.start()
+
+    def soumettre(self, type_ecriture, date_ecriture, donnees):
+        """Dépose une écriture sans attendre. Retourne False si la file est pleine."""
+        cle = (type_ecriture, date_ecriture)
+        with self._condition:
+            if cle in self._en_attente:
+                self.nb_fusionnees += 1
+            elif len(self._en_attente) >= self.taille_max:
+                print(f"WARNING: File d'écriture pleine, écriture {type_ecriture} du {date_ecriture} ignorée.")
+                return False
+            self._en_attente[cle] = donnees
+            self._tentatives.pop(cle, None)
+            self._abandonnees.discard(cle)
+            self._condition.notify()
+        return True
+
+    @fonction_chronometree("ecrivain.soumettre_snapshot")
+    def soumettre_snapshot(self, snapshot_date, df_portfolio_state, target_currency):
+        """Snapshot du journal (copie du DataFrame : la session peut le modifier ensuite)."""
+        if df_portfolio_state is None or df_portfolio_state.empty:
+            return False
+        return self.soumettre(SNAPSHOT, snapshot_date, (df_portfolio_state.copy(), target_currency))
+
+    @fonction_chronometree("ecrivain.soumettre_totaux")
+    def soumettre_totaux(self, date_obj, acquisition_value, current_value, h52_value, lt_value, currency):
+        """Totaux quotidiens du portefeuille (mêmes arguments que save_daily_totals)."""
+        return self.soumettre(TOTAUX, date_obj, {
+            "Date": date_obj,
+            "Valeur Acquisition": acquisition_value,
+            "Valeur Actuelle": current_value,
+            "Valeur H52": h52_value,
+            "Valeur LT": lt_value,
+            "Devise": currency,
+        })
+
+    def en_attente(self, type_ecriture, date_ecriture):
+        """Indique si une écriture est en attente pour ce type et cette date."""
+        with self._condition:
+            return (type_ecriture, date_ecriture) in self._en_attente
+
+    def abandonnee(self, type_ecriture, date_ecriture):
+        """Indique si l'écriture de ce type et de cette date a été abandonnée après NB_TENTATIVES échecs."""
+        with self._condition:
+            return (type_ecriture, date_ecriture) in self._abandonnees
+
+    def vider(self, timeout=30.0):
+        """Attend que toutes les écritures en attente soient enregistrées. Retourne True si c'est le cas."""
+        limite = time.monotonic() + timeout
+        with self._condition:
+            self._condition.notify_all()
+            while self._en_attente or self._lot_en_cours:
+                reste = limite - time.monotonic()
+                if reste <= 0 or not self._thread.is_alive():
+                    return False
+                self._condition.wait(reste)
+        return True
+
+    def arreter(self, timeout=30.0):
+        """Vide la file puis arrête le thread d'écriture."""
+        vide = self.vider(timeout)
+        with self._condition:
+            self._arret = True
+            self._condition.notify_all()
+        self._thread.join(timeout)
+        return vide
+
+    def _boucle(self):
+        while True:
+            with self._condition:
+                while not self._en_attente and not self._arret:
+                    self._condition.wait()
+                if self._arret and not self._en_attente:
+                    return
+            # Laisse les écritures suivantes (autres sessions, reruns) rejoindre le lot
+            time.sleep(max(self.delai_lot, self._pause))
+            with self._condition:
+                lot = []
+                while self._en_attente and len(lot) < self.taille_lot:
+                    lot.append(self._en_attente.popitem(last=False))
+                self._lot_en_cours = True
+            echecs = lot
+            try:
+                echecs = self._enregistrer(lot)
+            except Exception as e:
+                print(f"ERREUR lors de l'écriture différée: {e}")
+            finally:
+                with self._condition:
+                    self._remettre_en_file(echecs)
+                    for cle, _ in lot:
+                        if cle not in self._en_attente:
+                            self._tentatives.pop(cle, None)
+                    self._lot_en_cours = False
+                    self.nb_lots += 1
+                    self.nb_ecritures += len(lot) - len(echecs)
+                    self._condition.notify_all()
+
+    def _remettre_en_file(self, echecs):
+        """Remet en tête de file les écritures en échec (appelé sous self._condition)."""
+        nb_echecs_max = 0
+        for cle, donnees in reversed(echecs):
+            if cle in self._en_attente:
+                continue # Remplacée par une écriture plus récente
+            nb_echecs = self._tentatives.get(cle, 0) + 1
+            if nb_echecs >= NB_TENTATIVES:
+                print(f"ERREUR: écriture {cle[0]} du {cle[1]} abandonnée après {nb_echecs} échecs.")
+                ERREURS_ECRITURE_JOURNAL.inc(operation="abandon")
+                self._tentatives.pop(cle, None)
+                self._abandonnees.add(cle)
+                continue
+            self._tentatives[cle] = nb_echecs
+            self._en_attente[cle] = donnees
+            self._en_attente.move_to_end(cle, last=False)
+            nb_echecs_max = max(nb_echecs_max, nb_echecs)
+        self._pause = min(self.delai_lot * 2 ** nb_echecs_max, DELAI_REPRISE_MAX) if nb_echecs_max else 0.0
+
+    @staticmethod
+    def _enregistrer(lot):
+        """
+        Enregistre un lot : une transaction par type d'écriture (et par devise pour les snapshots).
+        Retourne les écritures des transactions en échec.
+        """
+        from portfolio_journal import save_portfolio_snapshots_bulk
+        from historical_data_manager import save_daily_totals_bulk
+
+        groupes = {} # (type, devise) -> [((type, date), données)]
+        for cle, donnees in lot:
+            devise = donnees[1] if cle[0] == SNAPSHOT else None
+            groupes.setdefault((cle[0], devise), []).append((cle, donnees))
+
+        echecs = []
+        for (type_ecriture, devise), ecritures in groupes.items():
+            try:
+                if type_ecriture == SNAPSHOT:
+                    frames = [df.assign(**{COLONNE_DATE_SNAPSHOT: date_ecriture}) for (_, date_ecriture), (df, _) in ecritures]
+                    save_portfolio_snapshots_bulk(pd.concat(frames, ignore_index=True), devise,
+                                                  colonne_date=COLONNE_DATE_SNAPSHOT, lever_erreurs=True)
+                elif type_ecriture == TOTAUX:
+                    save_daily_totals_bulk(pd.DataFrame([donnees for _, donnees in ecritures]), lever_erreurs=True)
+            except Exception as e:
+                print(f"ERREUR lors de l'écriture différée ({type_ecriture}), nouvelle tentative: {e}")
+                echecs += ecritures
+        return echecs
+
+
+_ecrivain = None
+_verrou = threading.Lock()
+
+
+def ecrivain():
+    """Écrivain différé partagé par le processus (créé au premier appel, vidé à l'arrêt)."""
+    global _ecrivain
+    if _ecrivain is None:
+        with _verrou:
+            if _ecrivain is None:
+                _ecrivain = EcrivainDiffere()
+                atexit.register(_ecrivain.arreter)
+    return _ecrivain